@@ -3,19 +3,16 @@ RCGame.py
 
 Author: John Kinder
 Description: A Rubik's Cube display using pygame.
+Importing this module only sets up the layout. get_app() makes the App,
+which opens the window (painting its background straight away) when run,
+and loads the sticker images and fonts the first time they are drawn.
 '''
 
 import pygame, sys
+from collections import OrderedDict
+from cube_gesture import DragGesture
 from rubiks_cube import RubiksCube
-
-pygame.init()
-
-# Allow a single argument of debug in order to see printed
-# processing information
-debug = False
-if len(sys.argv) > 1:
-    if sys.argv[1] == 'debug':
-        debug = True
+from sprite_atlas import Atlas
 
 # Some constants
 WHITE_BG = (255,255,255)    # Background color
@@ -25,10 +22,11 @@ SCREEN_WIDTH = 600
 SCREEN_HEIGHT = 725
 START_X = 150               # X start position of the cube
 START_Y = 100               # Y start position of the cube
-# Image sizes - Small for displaying adjacent sides
-IMAGE_SIZE = 100
-SMALL_IMAGE_SIZE = 20
 CUBE_SIZE = 300
+# Width of each adjacent side in the grey area
+SMALL_CUBE_SIZE = 60
+# Largest cube size taken from the command line
+MAX_SIDE_CELLS = 20
 # Center of the display with Y eliminating the lower section for adjacent sides
 X_CENTER = SCREEN_WIDTH / 2
 Y_CENTER = (START_Y * 2 + CUBE_SIZE) / 2
@@ -37,208 +35,247 @@ Y_CENTER = (START_Y * 2 + CUBE_SIZE) / 2
 BOTTOM_GREY_RECT = pygame.Rect(0, START_Y * 2 + CUBE_SIZE - 20, SCREEN_WIDTH,
                           SCREEN_HEIGHT - (START_Y * 2 + CUBE_SIZE + 10))
 
-gameDisplay = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption('Rubiks Cube')
-
-# Flag to indicate whether or not to do something
-process_event = False
-
-
-'''
-Below are for shifting a column or row on the cube.
-We capture the postions up to CAPTURE_SIZE while MOUSEMOTION and RIGHT_BTN_DOWN.
-Analysis is done on the postions to determine either a vertical or horizontal shift
-and the column or row.
-'''
-RIGHT_BTN_DOWN = False
-positions = []
-capture_count = 0
-CAPTURE_SIZE = 25
-
-'''
-The 3 x 3 list returns colornames for each element.
-Matching the image loaded to those and creating small
-images to use in the grey adjacent sides display area.
-'''
-colors_dict = {}
-for color in ['white', 'blue', 'yellow', 'orange', 'green', 'red']:
-    image = '{}.png'.format(color)
-    small_image = 'small_{}'.format(color)
-    colors_dict[color] = pygame.image.load(image)
-    colors_dict[small_image] = pygame.image.load(image)
-    colors_dict[small_image] = pygame.transform.scale(colors_dict[small_image],
-                                            (SMALL_IMAGE_SIZE, SMALL_IMAGE_SIZE))
-
-
-
-def display_adjacent_sides():
-    '''For displaying the up, down, left, and right adjacent side, and the back side.'''
-    for i, direction in enumerate(['up', 'left', 'right', 'down', 'back']):
-        color_list = cube.get_adjacent(direction)
-        if i == 0:      # up direction
-            start_x = X_CENTER - ((SMALL_IMAGE_SIZE * 3 / 2) + 100)
-            start_y = START_Y * 2 + CUBE_SIZE
-            message_display('Top', 10, start_x + (SMALL_IMAGE_SIZE * 1.5), start_y - 10)
-        elif i == 1:    # left direction
-            start_x = START_X - 100
-            start_y = START_Y * 2 + CUBE_SIZE + SMALL_IMAGE_SIZE * 3
-            message_display('Left', 10,start_x + (SMALL_IMAGE_SIZE * 1.5), start_y - 10)
-        elif i == 2:    # right direction
-            start_x = (START_X - 100 + CUBE_SIZE) - SMALL_IMAGE_SIZE * 3
-            start_y = START_Y * 2 + CUBE_SIZE + SMALL_IMAGE_SIZE * 3
-            message_display('Right', 10, start_x + (SMALL_IMAGE_SIZE * 1.5), start_y - 10)
-        elif i == 3:
-            # down direction
-            start_x = X_CENTER - ((SMALL_IMAGE_SIZE * 3 / 2) + 100)
-            start_y = (START_Y * 2 + CUBE_SIZE) + SMALL_IMAGE_SIZE * 6
-            message_display('Bottom', 10, start_x + (SMALL_IMAGE_SIZE * 1.5), start_y - 10)
-        else:   # back
-            start_x = (START_X  + 50 + CUBE_SIZE) - SMALL_IMAGE_SIZE * 3
-            start_y = START_Y * 2 + CUBE_SIZE + SMALL_IMAGE_SIZE * 3
-            message_display('Back', 10, start_x + (SMALL_IMAGE_SIZE * 1.5), start_y - 10)
-
-        x = start_x
-        y = start_y
-        for i in range(3):
-            for j in range(3):
-                color = 'small_{}'.format(color_list[i][j])
-                img = colors_dict[color]
-                put_square(img, x, y)
-                x += SMALL_IMAGE_SIZE
-            y += SMALL_IMAGE_SIZE
-            x = start_x
-
-
-def put_square(image_name, x, y):
-    '''blit the image at the given coordinates'''
-    gameDisplay.blit(image_name, (x, y))
-
-
-def text_objects(text, text_font):
-    '''Builds a text object'''
-    text_surface = text_font.render(text, True, BLACK)
-    return text_surface, text_surface.get_rect()
-
-
-def message_display(text, text_size, x_cord, y_cord):
-    '''Displays a text object'''
-    text_font = pygame.font.Font('freesansbold.ttf', text_size)
-    text_surface, text_rect = text_objects(text, text_font)
-    text_rect.center = ((x_cord, y_cord))
-    gameDisplay.blit(text_surface, text_rect)
-
-
-def draw_display():
-    '''Draws the display area within the white background.'''
-    side, orientation, side_colors = cube.get_view()
-    gameDisplay.fill(WHITE_BG)
-    gameDisplay.fill(GREY_BG, rect=BOTTOM_GREY_RECT)
-    msg_string = 'Side: {} - Top Left: {}'.format(side, orientation)
-    message_display(msg_string, 20, X_CENTER, 10)
-    message_display('Up', 20, X_CENTER, START_Y - 20)
-    message_display('Down', 20, X_CENTER, START_Y + CUBE_SIZE + 15)
-    message_display('Left', 20, START_X - 25, Y_CENTER)
-    message_display('Right', 20, START_X + CUBE_SIZE + 30, Y_CENTER)
-    msg_string = 'Hold down the right mouse button and drag across a row or column, then release to shift the cells.'
-    message_display(msg_string, 12, X_CENTER, SCREEN_HEIGHT - 18)
-    # Loop through the rows and columns keeping up with the screen position to use.
-    start_x = START_X
-    start_y = START_Y
-    for i in range(3):
-        for j in range(3):
-            img = colors_dict[side_colors[i][j]]
-            put_square(img, start_x, start_y)
-            start_x += IMAGE_SIZE
-        start_y += IMAGE_SIZE
-        start_x = START_X
-    display_adjacent_sides()
-    # Check for all squares on each side being the same color
-    all_matched = cube.check_matched()
-    if all_matched:
-        message_display('ALL MATCHED!', 50, X_CENTER, 50)
-    pygame.display.update()
-
-
-def check_motions():
-    '''Called when the right mouse button is released.
-    Checks the motion mouse positions gathered to determine
-    if we are to shift a column or row, or do nothing'''
-    x_positions = [positions[x][0] for x in range(CAPTURE_SIZE)]
-    y_positions = [positions[x][1] for x in range(CAPTURE_SIZE)]
-    x_min = min(x_positions)
-    x_max = max(x_positions)
-    y_min = min(y_positions)
-    y_max = max(y_positions)
-
-    # Expecting first and last captures to be within the CUBE
-    if x_min < START_X or x_max > (START_X + CUBE_SIZE):
-        return False
-    if y_min < START_Y or y_max > (START_Y + CUBE_SIZE):
-        return False
-    # Determine the shift direction
-    direction = None
-    if (x_max - x_min) < (y_max - y_min):
-        if y_positions[0] < y_positions[CAPTURE_SIZE - 1]:
-            direction = 'down'
-        else:
-            direction = 'up'
-    elif (y_max - y_min) < (x_max - x_min):
-        if x_positions[0] < x_positions[CAPTURE_SIZE - 1]:
-            direction = 'right'
+# Most redraws per second. The loop sleeps in pygame.event.wait() while idle.
+MAX_FPS = 60
+
+# Top left screen position and label of each adjacent side in the grey area.
+ADJACENT_LAYOUT = (
+    ('up', 'Top', X_CENTER - ((SMALL_CUBE_SIZE / 2) + 100), START_Y * 2 + CUBE_SIZE),
+    ('left', 'Left', START_X - 100, START_Y * 2 + CUBE_SIZE + SMALL_CUBE_SIZE),
+    ('right', 'Right', (START_X - 100 + CUBE_SIZE) - SMALL_CUBE_SIZE,
+     START_Y * 2 + CUBE_SIZE + SMALL_CUBE_SIZE),
+    ('down', 'Bottom', X_CENTER - ((SMALL_CUBE_SIZE / 2) + 100),
+     (START_Y * 2 + CUBE_SIZE) + SMALL_CUBE_SIZE * 2),
+    ('back', 'Back', (START_X + 50 + CUBE_SIZE) - SMALL_CUBE_SIZE,
+     START_Y * 2 + CUBE_SIZE + SMALL_CUBE_SIZE),
+)
+# Area of the 'Side: ... Top Left: ...' line at the top of the window.
+HEADER_RECT = pygame.Rect(0, 0, SCREEN_WIDTH, 22)
+TEXT_CACHE_SIZE = 64
+
+
+def parse_args(args):
+    '''Returns the cube size and tracer for the command line arguments.
+    A leading number picks the cube size, e.g. 4 for a 4 x 4 x 4 (3 if not given).
+    Allow an argument of debug in order to see printed processing information
+    (moves, frames and mouse gestures), or debug trace.jsonl to log them as JSON.'''
+    args = list(args)
+    side_cells = 3
+    if args and args[0].isdigit():
+        side_cells = int(args.pop(0))
+        if not 2 <= side_cells <= MAX_SIDE_CELLS:
+            sys.exit('cube size must be 2 to {}'.format(MAX_SIDE_CELLS))
+    tracer = None
+    if args and args[0] == 'debug':
+        from cube_trace import JsonlSink, Tracer, print_sink
+        tracer = Tracer(sink=JsonlSink(args[1]) if len(args) > 1 else print_sink)
+    return side_cells, tracer
+
+
+class App:
+    '''The game: its cube, window and what was last drawn in it.
+    Nothing touches the display until open_window() (or run()), and the
+    sticker atlases and fonts are loaded when first drawn.'''
+    def __init__(self, side_cells=3, tracer=None):
+        self.side_cells = side_cells
+        self.tracer = tracer
+        # Image sizes, side_cells of them across a side - Small for displaying adjacent sides
+        self.image_size = CUBE_SIZE // side_cells
+        self.small_image_size = SMALL_CUBE_SIZE // side_cells
+        self.cube = RubiksCube(tracer, size=side_cells)
+        self.display = None
+
+        '''
+        Below is for shifting a column or row on the cube.
+        Positions seen while the right button is held down are fed to drag, which
+        decides on release between a vertical or horizontal shift and the column or row.
+        '''
+        self.drag = DragGesture(START_X, START_Y, self.image_size, side_cells)
+
+        '''
+        The side_cells x side_cells tuples hold color names for each element.
+        The cells are drawn from an atlas of the color images per size, the small
+        one being for the grey adjacent sides display area.
+        '''
+        self.__atlas = None
+        self.__small_atlas = None
+
+        '''
+        For dirty-region drawing we keep the color shown in every cell on the last frame,
+        keyed by ('front' or adjacent direction, row, col), plus the last header and matched
+        state. Only cells whose color changed get blitted and passed to display.update.
+        The cube hands back the same tuple of rows until a side changes, so shown_faces
+        lets a side that did not change be skipped without looking at its cells.
+        '''
+        self.shown_colors = {}
+        self.shown_faces = {}
+        self.shown_view = None
+        self.shown_matched = None
+
+        '''
+        Fonts are kept per size, and rendered text surfaces per (text, size, color).
+        The text cache is least recently used first out, so changing strings like the
+        'Side: ... Top Left: ...' header cannot grow it without bound.
+        '''
+        self.fonts = {}
+        self.text_cache = OrderedDict()
+
+        if tracer:
+            self.draw_display = tracer.traced_render(self.draw_display)
+
+    def open_window(self):
+        '''Open the window and paint its backgrounds, before any images or fonts
+        are loaded. Only the display and font modules are initialized.
+        Returns the display surface.'''
+        if self.display is None:
+            pygame.display.init()
+            pygame.font.init()
+            self.display = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption('Rubiks Cube')
+            self.display.fill(WHITE_BG)
+            self.display.fill(GREY_BG, rect=BOTTOM_GREY_RECT)
+            pygame.display.update()
+        return self.display
+
+    @property
+    def atlas(self):
+        '''The sticker atlas for the front side, loaded on first use.'''
+        if self.__atlas is None:
+            self.__atlas = Atlas(self.image_size)
+        return self.__atlas
+
+    @property
+    def small_atlas(self):
+        '''The sticker atlas for the adjacent sides, loaded on first use.'''
+        if self.__small_atlas is None:
+            self.__small_atlas = Atlas(self.small_image_size)
+        return self.__small_atlas
+
+    def display_adjacent_sides(self, blits, dirty_rects):
+        '''For displaying the up, down, left, and right adjacent side, and the back side.
+        Queues blits for the cells that changed and adds their rects to dirty_rects.'''
+        small_atlas = self.small_atlas
+        for direction, _, start_x, start_y in ADJACENT_LAYOUT:
+            color_list = self.cube.get_adjacent(direction)
+            if self.shown_faces.get(direction) is color_list:
+                continue
+            self.shown_faces[direction] = color_list
+            y = start_y
+            for i in range(self.side_cells):
+                x = start_x
+                for j in range(self.side_cells):
+                    self.put_cell((direction, i, j), color_list[i][j], x, y, small_atlas,
+                                  blits, dirty_rects)
+                    x += self.small_image_size
+                y += self.small_image_size
+
+    def put_cell(self, key, color, x, y, cell_atlas, blits, dirty_rects):
+        '''Queue a blit of the color for a cell if it differs from the last frame'''
+        if self.shown_colors.get(key) != color:
+            self.shown_colors[key] = color
+            blits.append((cell_atlas.surface, (x, y), cell_atlas.areas[color]))
+            dirty_rects.append(pygame.Rect(x, y, cell_atlas.size, cell_atlas.size))
+
+    def get_font(self, text_size):
+        '''Returns the font for a size, loading freesansbold.ttf only once per size.'''
+        text_font = self.fonts.get(text_size)
+        if text_font is None:
+            text_font = self.fonts[text_size] = pygame.font.Font('freesansbold.ttf', text_size)
+        return text_font
+
+    def text_objects(self, text, text_size, color=BLACK):
+        '''Returns a rendered text surface and its rect, reusing recent renders.'''
+        key = (text, text_size, color)
+        text_cache = self.text_cache
+        text_surface = text_cache.get(key)
+        if text_surface is None:
+            text_surface = self.get_font(text_size).render(text, True, color)
+            text_cache[key] = text_surface
+            if len(text_cache) > TEXT_CACHE_SIZE:
+                text_cache.popitem(last=False)
         else:
-            direction = 'left'
-    # Determination of direction not made... just return
-    if not direction:
-        return False
-
-    # Determine column for vertical shift
-    if direction in ['up', 'down']:
-        col = None
-        x_avg = sum(x_positions) / CAPTURE_SIZE
-        current_x = START_X
-        for i in range(3):
-            if x_avg > current_x and x_avg < (current_x + IMAGE_SIZE):
-                col = i
-                break
-            current_x += IMAGE_SIZE
-        if col != None:
-            if debug:
-                print('{}\nShift col {} - {}\n{}'.format('=' * 20, col, direction, '=' * 20))
-            cube.shift_v(direction, col)
-            return True
-    # Determine row for horizontal shift
-    if direction in ['left', 'right']:
-        row = None
-        y_avg = sum(y_positions) / CAPTURE_SIZE
-        current_y = START_Y
-        for i in range(3):
-            if y_avg > current_y and y_avg < (current_y + IMAGE_SIZE):
-                row = i
-                break
-            current_y += IMAGE_SIZE
-        if row != None:
-            if debug:
-                print('{}\nShift row {} - {}\n{}'.format('=' * 20, row, direction, '=' * 20))
-            cube.shift_h(direction, row)
-            return True
-    return False
-
-
-cube = RubiksCube(debug)
-# Initial Screen presentation
-draw_display()
-
-# Loop until the screens top right 'x' is clicked.
-while True:
-    for event in pygame.event.get():
+            text_cache.move_to_end(key)
+        return text_surface, text_surface.get_rect()
+
+    def message_display(self, text, text_size, x_cord, y_cord):
+        '''Displays a text object'''
+        text_surface, text_rect = self.text_objects(text, text_size)
+        text_rect.center = ((x_cord, y_cord))
+        self.display.blit(text_surface, text_rect)
+
+    def draw_background(self, all_matched):
+        '''Paints the backgrounds and fixed labels, forgetting what the cells showed.'''
+        self.display.fill(WHITE_BG)
+        self.display.fill(GREY_BG, rect=BOTTOM_GREY_RECT)
+        self.message_display('Up', 20, X_CENTER, START_Y - 20)
+        self.message_display('Down', 20, X_CENTER, START_Y + CUBE_SIZE + 15)
+        self.message_display('Left', 20, START_X - 25, Y_CENTER)
+        self.message_display('Right', 20, START_X + CUBE_SIZE + 30, Y_CENTER)
+        msg_string = 'Hold down the right mouse button and drag across a row or column, then release to shift the cells.'
+        self.message_display(msg_string, 12, X_CENTER, SCREEN_HEIGHT - 18)
+        for _, label, start_x, start_y in ADJACENT_LAYOUT:
+            self.message_display(label, 10, start_x + SMALL_CUBE_SIZE / 2, start_y - 10)
+        # Check for all squares on each side being the same color
+        if all_matched:
+            self.message_display('ALL MATCHED!', 50, X_CENTER, 50)
+        self.shown_colors.clear()
+        self.shown_faces.clear()
+
+    def draw_display(self):
+        '''Draws the display area within the white background.
+        Everything is painted on the first frame or when the matched state changes,
+        otherwise only the header and the cells that changed are redrawn.
+        Returns the rects updated, or None when the whole window was.'''
+        self.open_window()
+        side, orientation, side_colors = self.cube.get_view()
+        all_matched = self.cube.check_matched()
+        full_repaint = all_matched != self.shown_matched
+        if full_repaint:
+            self.draw_background(all_matched)
+            self.shown_matched = all_matched
+            self.shown_view = None
+        dirty_rects = []
+        if (side, orientation) != self.shown_view:
+            self.display.fill(WHITE_BG, rect=HEADER_RECT)
+            msg_string = 'Side: {} - Top Left: {}'.format(side, orientation)
+            self.message_display(msg_string, 20, X_CENTER, 10)
+            dirty_rects.append(HEADER_RECT)
+            self.shown_view = (side, orientation)
+        # Loop through the rows and columns keeping up with the screen position to use.
+        blits = []
+        if self.shown_faces.get('front') is not side_colors:
+            self.shown_faces['front'] = side_colors
+            atlas = self.atlas
+            start_y = START_Y
+            for i in range(self.side_cells):
+                start_x = START_X
+                for j in range(self.side_cells):
+                    self.put_cell(('front', i, j), side_colors[i][j], start_x, start_y, atlas,
+                                  blits, dirty_rects)
+                    start_x += self.image_size
+                start_y += self.image_size
+        self.display_adjacent_sides(blits, dirty_rects)
+        if blits:
+            self.display.blits(blits, False)
+        if full_repaint:
+            pygame.display.update()
+            return None
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+        return dirty_rects
+
+    def handle_event(self, event):
+        '''Act on one event. Returns True if the display needs redrawing.'''
+        cube = self.cube
+        drag = self.drag
         if event.type == pygame.QUIT:
             print('Good Bye')
             sys.exit(0)
         if event.type == pygame.MOUSEBUTTONDOWN:
-            (left_pressed, _, right_pressed) = pygame.mouse.get_pressed()
-            x, y = pygame.mouse.get_pos()
-            # Left button to move the current view
-            if left_pressed:
+            x, y = event.pos
+            # Left button (1) to move the current view. The button comes from
+            # the event, as it may have been released by the time it is handled.
+            if event.button == 1:
                 if y < START_Y and x > START_X and x < (START_X + CUBE_SIZE):
                     cube.move_up()
                 elif y > (START_Y + CUBE_SIZE) and y < (START_Y * 2 + CUBE_SIZE) \
@@ -249,36 +286,85 @@ while True:
                 elif x > (START_X + CUBE_SIZE) and y > START_Y and y < (START_Y + CUBE_SIZE):
                     cube.move_right()
                 else:
-                    break
-                process_event = True
-            # If right button, start gathering the positions
-            elif right_pressed:
-                RIGHT_BTN_DOWN = True
-                x, y = pygame.mouse.get_pos()
-                positions.append((x,y))
-                capture_count += 1
-        # Collect x, y positions on MOUSEMOTION while right button held down
-        if event.type == pygame.MOUSEMOTION and RIGHT_BTN_DOWN and capture_count < CAPTURE_SIZE:
-            x, y = pygame.mouse.get_pos()
-            positions.append((x,y))
-            capture_count += 1
+                    return False
+                return True
+            # If right button (3), start a drag
+            if event.button == 3:
+                drag.start(*event.pos)
+        # Follow the drag on MOUSEMOTION while right button held down
+        elif event.type == pygame.MOUSEMOTION:
+            drag.add(*event.pos)
+        # u undoes the last shift or view move, r redoes it
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_u:
+                return cube.undo() is not None
+            if event.key == pygame.K_r:
+                return cube.redo() is not None
         # Mouse released... see if we have valid request to shift a row or column
-        if event.type == pygame.MOUSEBUTTONUP:
-            if RIGHT_BTN_DOWN:
-                if debug:
-                    print('Capture count:', capture_count)
-                move_made = False
-                if capture_count == CAPTURE_SIZE:
-                    move_made = check_motions()
-                # In any case, clear all the positions / captures
-                positions.clear()
-                capture_count = 0
-                RIGHT_BTN_DOWN = False
-                if move_made:
-                    process_event = True
-
-    if process_event:
-        draw_display()
-        process_event = False
-
+        elif event.type == pygame.MOUSEBUTTONUP and drag.active:
+            move = drag.finish(*event.pos)
+            if self.tracer:
+                self.tracer.emit('gesture', samples=drag.count, move=move and list(move))
+            if move:
+                getattr(cube, move[0])(*move[1:])
+                return True
+        return False
 
+    def run(self):
+        '''Loop until the screens top right 'x' is clicked.
+        Blocks until there are events, handles all that are queued, then redraws
+        at most MAX_FPS times a second.'''
+        self.open_window()
+        clock = pygame.time.Clock()
+        # Initial Screen presentation
+        self.draw_display()
+        while True:
+            events = [pygame.event.wait()]
+            events.extend(pygame.event.get())
+            redraw = False
+            for event in coalesce(events, self.drag.active):
+                if self.handle_event(event):
+                    redraw = True
+            if redraw:
+                self.draw_display()
+                clock.tick(MAX_FPS)
+
+
+def coalesce(events, dragging=False):
+    '''Drop every MOUSEMOTION that is straight away followed by another one, so
+    a burst of motion is handled once, at its last position.
+    While a right button drag is on (dragging when the events start, or from
+    its MOUSEBUTTONDOWN until a MOUSEBUTTONUP) every position is kept, since
+    the drag recognizer averages across all of them.'''
+    kept = []
+    last = len(events) - 1
+    for i, event in enumerate(events):
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+            dragging = True
+        elif event.type == pygame.MOUSEBUTTONUP:
+            dragging = False
+        elif event.type == pygame.MOUSEMOTION and not dragging and i != last \
+                and events[i + 1].type == pygame.MOUSEMOTION:
+            continue
+        kept.append(event)
+    return kept
+
+
+_app = None
+
+
+def get_app(args=None):
+    '''Returns the App, made on first call from args (the command line
+    arguments after the script name if None).'''
+    global _app
+    if _app is None:
+        _app = App(*parse_args(sys.argv[1:] if args is None else args))
+    return _app
+
+
+def main():
+    get_app().run()
+
+
+if __name__ == '__main__':
+    main()
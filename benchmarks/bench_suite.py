@@ -0,0 +1,160 @@
+'''
+bench_suite.py
+
+Author: John Kinder
+Description: Micro-benchmarks for the RubiksCube hot paths and one
+RCGame.draw_display frame (under SDL's dummy video driver).
+For each benchmark it reports operations per second (best of several
+timeit runs) and, from tracemalloc, the peak bytes allocated by one call
+and the blocks still held after 1000 calls.
+Results can be saved as JSON and compared with a stored baseline; any
+benchmark slower than the baseline by more than the threshold fails the run.
+Timings only compare on the same machine, so the baseline is not part of
+the tree: save one with --save-baseline (before a change) on the machine
+the comparison runs on.
+
+usage: python benchmarks/bench_suite.py [--out results.json]
+                                        [--baseline benchmarks/baseline.json]
+                                        [--threshold 0.25] [--save-baseline]
+'''
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rubiks_cube import RubiksCube
+
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+
+def core_benchmarks():
+    '''(name, function) pairs for the pure Python cube.'''
+    cube = RubiksCube(seed=1)
+    rows = [('left', 0), ('right', 2), ('left', 1)]
+    columns = [('up', 2), ('down', 0), ('up', 1)]
+    return [
+        ('shift_h', lambda: cube.shift_h(*rows[0])),
+        ('shift_v', lambda: cube.shift_v(*columns[0])),
+        # Outer rows / columns are the ones that also turn a side (__shift_side).
+        ('shift_outer_row_col', lambda: (cube.shift_h(*rows[1]), cube.shift_v(*columns[1]))),
+        ('shift_middle_row_col', lambda: (cube.shift_h(*rows[2]), cube.shift_v(*columns[2]))),
+        ('get_view', cube.get_view),
+        ('get_adjacent_back', lambda: cube.get_adjacent('back')),
+        ('check_matched', cube.check_matched),
+        ('construct_shuffled', RubiksCube),
+    ]
+
+
+def game_benchmarks():
+    '''(name, function) pairs for RCGame, or [] without pygame.'''
+    try:
+        import pygame   # noqa: F401
+    except ImportError:
+        return []
+    os.chdir(ROOT)      # RCGame loads the color images from the current directory
+    import RCGame
+    app = RCGame.get_app([])
+    app.open_window()
+
+    def full_frame():
+        app.shown_matched = None
+        app.draw_display()
+
+    def frame_after_shift():
+        app.cube.shift_h('left', 0)
+        app.draw_display()
+
+    return [('draw_display_full', full_frame), ('draw_display_after_shift', frame_after_shift)]
+
+
+def _held_blocks(function):
+    '''Blocks still allocated after 1000 calls (tracemalloc must be running).'''
+    snapshot = tracemalloc.take_snapshot()
+    for _ in range(1000):
+        function()
+    return sum(stat.count_diff for stat in
+               tracemalloc.take_snapshot().compare_to(snapshot, 'lineno'))
+
+
+def measure(function, repeat=7):
+    '''Returns ops/sec, peak bytes for one call, blocks held after 1000 calls.'''
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    tracemalloc.start()
+    try:
+        function()
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        # Less what taking the snapshots holds on its own.
+        held = _held_blocks(function) - _held_blocks(lambda: None)
+    finally:
+        tracemalloc.stop()
+    return {'ops_per_sec': number / best, 'alloc_peak_bytes': peak - before,
+            'alloc_blocks_held': held}
+
+
+def compare(results, baseline, threshold):
+    '''Returns the names of benchmarks more than threshold slower than baseline.'''
+    slower = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['ops_per_sec'] / baseline[name]['ops_per_sec']
+        mark = ''
+        if ratio < 1 - threshold:
+            slower.append(name)
+            mark = '  REGRESSION'
+        print('{:28s} {:7.2f}x baseline{}'.format(name, ratio, mark))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the RubiksCube hot paths.')
+    parser.add_argument('--out', help='write results to this JSON file')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline JSON to compare with')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown as a fraction (default 0.25)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the baseline instead of comparing')
+    args = parser.parse_args(argv)
+
+    results = {}
+    print('{:28s} {:>14s} {:>12s} {:>8s}'.format('benchmark', 'ops/sec', 'peak bytes', 'held'))
+    for name, function in core_benchmarks() + game_benchmarks():
+        result = results[name] = measure(function)
+        print('{:28s} {:14,.0f} {:12,d} {:8,d}'.format(
+            name, result['ops_per_sec'], result['alloc_peak_bytes'],
+            result['alloc_blocks_held']))
+    report = {'python': platform.python_version(), 'machine': platform.machine(),
+              'results': results}
+    if args.out:
+        with open(args.out, 'w') as out:
+            json.dump(report, out, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as out:
+            json.dump(report, out, indent=2)
+        return 0
+    if not os.path.exists(args.baseline):
+        print('\nno baseline at {}, store one with --save-baseline'.format(args.baseline))
+        return 0
+    with open(args.baseline) as source:
+        baseline = json.load(source)['results']
+    print()
+    if compare(results, baseline, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
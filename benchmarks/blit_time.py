@@ -0,0 +1,96 @@
+'''
+blit_time.py
+
+Author: John Kinder
+Description: Blit throughput for the 54 stickers of a frame (9 large, 45 small),
+at their places in the RCGame window, under SDL's dummy video driver:
+- before: one blit() per sticker from the PNGs as loaded, unconverted
+- after: one blits() call per frame from the converted sprite atlases
+Also times building an atlas from the PNGs against reading the cached copy.
+
+usage: python benchmarks/blit_time.py [frames]
+'''
+
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)   # the color images are in the repository root
+frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+import pygame
+
+import RCGame
+from rubiks_cube import COLORS
+from sprite_atlas import Atlas
+
+app = RCGame.get_app([])
+LARGE = app.image_size
+SMALL = app.small_image_size
+# (size, x, y) of every sticker in the window
+PLACES = [(LARGE, RCGame.START_X + j * LARGE, RCGame.START_Y + i * LARGE)
+          for i in range(3) for j in range(3)]
+PLACES += [(SMALL, start_x + j * SMALL, start_y + i * SMALL)
+           for _, _, start_x, start_y in RCGame.ADJACENT_LAYOUT
+           for i in range(3) for j in range(3)]
+
+
+def frame_cells(frame):
+    '''(color, size, x, y) for the 54 stickers of a frame, colors varying by frame.'''
+    return [(COLORS[(i + frame) % len(COLORS)], size, x, y)
+            for i, (size, x, y) in enumerate(PLACES)]
+
+
+def time_single(display, frames):
+    '''Stickers per second blitting unconverted PNG surfaces one at a time.'''
+    images = {}
+    for color in COLORS:
+        image = pygame.image.load('{}.png'.format(color))
+        images[color, LARGE] = image
+        images[color, SMALL] = pygame.transform.scale(image, (SMALL, SMALL))
+    all_cells = [frame_cells(frame) for frame in range(len(COLORS))]
+    start = time.perf_counter()
+    for frame in range(frames):
+        for color, size, x, y in all_cells[frame % len(COLORS)]:
+            display.blit(images[color, size], (x, y))
+    return frames * 54 / (time.perf_counter() - start)
+
+
+def time_atlas(display, frames, cache_dir):
+    '''Stickers per second with one blits() call per frame from the atlases.'''
+    atlases = {size: Atlas(size, cache_dir=cache_dir) for size in (LARGE, SMALL)}
+    all_blits = [[(atlases[size].surface, (x, y), atlases[size].areas[color])
+                  for color, size, x, y in frame_cells(frame)]
+                 for frame in range(len(COLORS))]
+    start = time.perf_counter()
+    for frame in range(frames):
+        display.blits(all_blits[frame % len(COLORS)], False)
+    return frames * 54 / (time.perf_counter() - start)
+
+
+def time_build(cache_dir):
+    '''Milliseconds to make both atlases, the first time and from the cache.'''
+    times = []
+    for _ in range(2):
+        start = time.perf_counter()
+        Atlas(LARGE, cache_dir=cache_dir)
+        Atlas(SMALL, cache_dir=cache_dir)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+if __name__ == '__main__':
+    display = app.open_window()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold, warm = time_build(cache_dir)
+        single = time_single(display, frames)
+        batched = time_atlas(display, frames, cache_dir)
+    print('{} frames of 54 stickers'.format(frames))
+    print('blit per sticker, unconverted: {:12,.0f} stickers/s'.format(single))
+    print('blits() from atlas:            {:12,.0f} stickers/s'.format(batched))
+    print('speedup:                       {:12.2f}x'.format(batched / single))
+    print('atlas build {:.2f} ms, from cache {:.2f} ms'.format(cold, warm))
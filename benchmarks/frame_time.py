@@ -0,0 +1,47 @@
+'''
+frame_time.py
+
+Author: John Kinder
+Description: Times RCGame.draw_display under SDL's dummy video driver, with
+the font / text cache and with it emptied before every frame (which is what
+building a Font per message_display call used to cost).
+Each frame is a full repaint, so every label is drawn.
+
+usage: python benchmarks/frame_time.py [frames]
+'''
+
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)   # RCGame loads the color images from the current directory
+frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+import RCGame
+
+app = RCGame.get_app([])
+app.open_window()
+
+
+def time_frames(clear_cache):
+    '''Average milliseconds per full repaint.'''
+    start = time.perf_counter()
+    for _ in range(frames):
+        if clear_cache:
+            app.fonts.clear()
+            app.text_cache.clear()
+        app.cube.move_right()
+        app.shown_matched = None
+        app.draw_display()
+    return (time.perf_counter() - start) * 1000 / frames
+
+
+uncached = time_frames(True)
+cached = time_frames(False)
+print('{} frames'.format(frames))
+print('no text cache: {:8.3f} ms/frame'.format(uncached))
+print('text cache:    {:8.3f} ms/frame'.format(cached))
+print('speedup:       {:8.2f}x'.format(uncached / cached))
@@ -0,0 +1,55 @@
+'''
+idle_cpu.py
+
+Author: John Kinder
+Description: Measures the CPU the game uses while nobody touches it.
+Starts RCGame.py (or another copy of it, e.g. an older version pulled out of
+git) under SDL's dummy video driver, lets it settle, then reads its user +
+system CPU time from /proc over the measuring window, so Linux only.
+
+usage: python benchmarks/idle_cpu.py [seconds] [game.py]
+'''
+
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SETTLE = 2.0
+
+
+def cpu_seconds(pid):
+    '''User + system CPU time of a process so far, from /proc/<pid>/stat.'''
+    with open('/proc/{}/stat'.format(pid)) as stat:
+        fields = stat.read().rsplit(')', 1)[1].split()
+    # utime and stime are fields 14 and 15, counting the pid as field 1.
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def idle_cpu(game, seconds):
+    '''Percent of one core the game uses over seconds once started.'''
+    # ROOT goes first on the caller's PYTHONPATH, which may be where pygame is.
+    path = os.pathsep.join(filter(None, (ROOT, os.environ.get('PYTHONPATH'))))
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', PYTHONPATH=path)
+    process = subprocess.Popen([sys.executable, game], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(SETTLE)
+        if process.poll() is not None:
+            raise RuntimeError('{} exited with {}'.format(game, process.returncode))
+        start_cpu = cpu_seconds(process.pid)
+        start = time.perf_counter()
+        time.sleep(seconds)
+        used = cpu_seconds(process.pid) - start_cpu
+        return 100 * used / (time.perf_counter() - start)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    game = sys.argv[2] if len(sys.argv) > 2 else os.path.join(ROOT, 'RCGame.py')
+    print('{}: {:.1f}% of a core idle over {:.0f} s'.format(
+        os.path.basename(game), idle_cpu(game, seconds), seconds))
@@ -0,0 +1,49 @@
+'''
+render_time.py
+
+Author: John Kinder
+Description: States per second drawn by cube_render.Renderer under SDL's
+dummy video driver, onto contact sheets and as a frame sequence, plus the
+time to write a sheet as PNG.
+
+usage: python benchmarks/render_time.py [states]
+'''
+
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)   # the color images are in the repository root
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+import pygame
+
+from cube_render import Renderer
+from rubiks_cube import RubiksCube
+
+renderer = Renderer()
+cubes = [RubiksCube(seed=number) for number in range(count)]
+states = [cube.get_state() for cube in cubes]
+
+start = time.perf_counter()
+sheets = list(renderer.sheets(states))
+sheet_rate = count / (time.perf_counter() - start)
+
+start = time.perf_counter()
+for _ in renderer.frames(cubes):
+    pass
+frame_rate = count / (time.perf_counter() - start)
+
+with tempfile.TemporaryDirectory() as out_dir:
+    start = time.perf_counter()
+    pygame.image.save(sheets[0], os.path.join(out_dir, 'sheet.png'))
+    save_ms = (time.perf_counter() - start) * 1000
+
+print('{} states, tiles {} x {}'.format(count, *renderer.tile_size))
+print('sheets:      {:10,.0f} states/s ({} sheets)'.format(sheet_rate, len(sheets)))
+print('frames:      {:10,.0f} states/s (RubiksCube views)'.format(frame_rate))
+print('sheet PNG:   {:10.1f} ms for {} x {}'.format(save_ms, *sheets[0].get_size()))
@@ -0,0 +1,134 @@
+'''
+server_load.py
+
+Author: John Kinder
+Description: Load generator for cube_server.py on localhost.
+Starts the server in its own process (or uses --connect / --unix to reach a
+running one), opens clients connections with sessions cubes each, then every
+session keeps one apply request of batch random move codes in flight for
+seconds. Reports request latency (p50 / p99) and moves per second.
+
+usage: python benchmarks/server_load.py [--clients 50] [--sessions 20]
+           [--batch 10] [--seconds 5] [--connect host:port | --unix path]
+'''
+
+import argparse
+import ast
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rubiks_cube import MOVE_LIST
+
+
+class Client:
+    '''One connection, matching replies to requests by id.'''
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.waiting = {}
+        self.next_id = 0
+        self.reading = asyncio.ensure_future(self.__read())
+
+    async def __read(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            reply = json.loads(line)
+            self.waiting.pop(reply['id']).set_result(reply)
+
+    async def request(self, **fields):
+        '''Send a request, returns the reply. Raises RuntimeError on an error reply.'''
+        self.next_id += 1
+        fields['id'] = self.next_id
+        future = self.waiting[self.next_id] = asyncio.get_running_loop().create_future()
+        self.writer.write(json.dumps(fields).encode() + b'\n')
+        reply = await future
+        if not reply['ok']:
+            raise RuntimeError(reply['error'])
+        return reply
+
+    def close(self):
+        self.reading.cancel()
+        self.writer.close()
+
+
+async def run_session(client, seed, batch, stop_at, latencies):
+    '''Create a cube and apply random batches until stop_at. Returns moves made.'''
+    session = (await client.request(op='create', seed=seed))['session']
+    rng = random.Random(seed)
+    codes = range(len(MOVE_LIST))
+    moves = 0
+    perf_counter = time.perf_counter
+    while perf_counter() < stop_at:
+        start = perf_counter()
+        await client.request(op='apply', session=session, codes=rng.choices(codes, k=batch))
+        latencies.append(perf_counter() - start)
+        moves += batch
+    await client.request(op='matched', session=session)
+    return moves
+
+
+async def load(args, connect):
+    clients = [Client(*await connect()) for _ in range(args.clients)]
+    latencies = []
+    start = time.perf_counter()
+    stop_at = start + args.seconds
+    moves = await asyncio.gather(*(
+        run_session(client, number * args.sessions + i, args.batch, stop_at, latencies)
+        for number, client in enumerate(clients) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        client.close()
+    latencies.sort()
+    sessions = args.clients * args.sessions
+    print('{} clients x {} sessions = {} sessions, {} moves per request, {:.1f} s'.format(
+        args.clients, args.sessions, sessions, args.batch, elapsed))
+    print('requests: {:12,d} ({:,.0f}/s)'.format(len(latencies), len(latencies) / elapsed))
+    print('moves:    {:12,d} ({:,.0f}/s)'.format(sum(moves), sum(moves) / elapsed))
+    print('latency:  p50 {:.2f} ms, p99 {:.2f} ms, max {:.2f} ms'.format(
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000, latencies[-1] * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test cube_server.py.')
+    parser.add_argument('--clients', type=int, default=50, help='connections (default 50)')
+    parser.add_argument('--sessions', type=int, default=20,
+                        help='cubes per connection (default 20)')
+    parser.add_argument('--batch', type=int, default=10, help='moves per request (default 10)')
+    parser.add_argument('--seconds', type=float, default=5.0, help='how long (default 5)')
+    parser.add_argument('--connect', metavar='HOST:PORT', help='use a running server')
+    parser.add_argument('--unix', metavar='PATH', help='use a running server on a Unix socket')
+    args = parser.parse_args()
+
+    server = None
+    if args.unix:
+        connect = lambda: asyncio.open_unix_connection(args.unix)
+    else:
+        if args.connect:
+            host, port = args.connect.rsplit(':', 1)
+        else:
+            server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'cube_server.py'),
+                                       '--port', '0'], stdout=subprocess.PIPE, text=True)
+            # 'listening on (host, port)'
+            host, port = ast.literal_eval(server.stdout.readline().split(' ', 2)[2])[:2]
+        connect = lambda: asyncio.open_connection(host, int(port))
+    try:
+        asyncio.run(load(args, connect))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
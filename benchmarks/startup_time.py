@@ -0,0 +1,79 @@
+'''
+startup_time.py
+
+Author: John Kinder
+Description: Cold start times, each step timed on its own in a fresh Python
+process under SDL's dummy video driver (the best of repeat runs, after one
+untimed run so the .pyc files are written):
+- import rubiks_cube, and the first solved and shuffled RubiksCube
+- import RCGame, then the window open, then the first frame drawn
+Given another tree (e.g. an older version pulled out of git) it is timed
+the same way, an RCGame without get_app() being timed as its one import.
+
+usage: python benchmarks/startup_time.py [repeat] [other tree]
+'''
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import sys, time
+times = []
+last = [time.perf_counter()]
+def mark(name):
+    now = time.perf_counter()
+    times.append((name, (now - last[0]) * 1000))
+    last[0] = now
+import rubiks_cube
+mark('import rubiks_cube')
+rubiks_cube.RubiksCube(solved=True)
+mark('first solved cube')
+rubiks_cube.RubiksCube()
+mark('first shuffled cube')
+import pygame
+mark('import pygame')
+import RCGame
+mark('import RCGame')
+if hasattr(RCGame, 'get_app'):
+    app = RCGame.get_app([])
+    app.open_window()
+    mark('window open')
+    app.draw_display()
+    mark('first frame')
+for name, ms in times:
+    print('{}\\t{:.3f}'.format(name, ms))
+'''
+
+
+def run_probe(tree):
+    '''Returns [(step, ms)] from one fresh process started in tree.'''
+    # tree goes first on the caller's PYTHONPATH, which may be where pygame is.
+    path = os.pathsep.join(filter(None, (tree, os.environ.get('PYTHONPATH'))))
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', PYTHONPATH=path,
+               PYGAME_HIDE_SUPPORT_PROMPT='1')
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    # RCGame loads the color images from the current directory, and an old
+    # one reads its arguments from the command line.
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=tree, env=env,
+                            stdout=subprocess.PIPE, check=True, text=True).stdout
+    return [(name, float(ms)) for name, ms in
+            (line.split('\t') for line in output.splitlines())]
+
+
+def startup_times(tree, repeat):
+    '''Best ms per step over repeat runs.'''
+    run_probe(tree)
+    runs = [run_probe(tree) for _ in range(repeat)]
+    return [(name, min(run[i][1] for run in runs)) for i, (name, _) in enumerate(runs[0])]
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    trees = [ROOT] + sys.argv[2:3]
+    for tree in trees:
+        print('{} (best of {}, ms per step):'.format(tree, repeat))
+        for name, ms in startup_times(os.path.abspath(tree), repeat):
+            print('  {:22} {:9.2f}'.format(name, ms))
@@ -0,0 +1,102 @@
+'''
+Cube Batch
+Author: John Kinder
+
+Requirements: NumPy
+
+Description: Vectorized move engine for many cubes at once.
+Holds N cubes as an (N, 54) uint8 array of color codes using the same
+sticker layout as RubiksCube (side * 9 + row * 3 + col).
+
+Moves are integer codes into MOVES, one per
+(side, top_left, direction, index) shift that RubiksCube.shift_h /
+shift_v can make. Use move_code() to look one up.
+
+Externally available:
+- CubeBatch(count) Batch of solved cubes.
+- CubeBatch.from_states(states) / CubeBatch.from_cubes(cubes)
+- apply(move) Same move on every cube, or one move per cube from an array.
+- apply_sequence(moves) Moves of shape (length,) or (N, length).
+- check_matched() Boolean mask of solved cubes.
+- import_cube(i, cube) / export_cube(i) Single state interop with RubiksCube.
+'''
+
+import numpy as np
+
+from rubiks_cube import PERMUTATIONS, SOLVED_STATE, RubiksCube
+
+# Move codes are positions in MOVES. PERM_TABLE[code] is the 54 entry gather.
+MOVES = tuple(PERMUTATIONS)
+MOVE_CODES = {key: code for code, key in enumerate(MOVES)}
+PERM_TABLE = np.array([PERMUTATIONS[key] for key in MOVES], dtype=np.intp)
+SOLVED = np.frombuffer(SOLVED_STATE, dtype=np.uint8)
+
+
+def move_code(side, top_left, direction, index):
+    '''Returns the move code for a shift_h ('left', 'right') or
+    shift_v ('up', 'down') made while viewing side with top_left.'''
+    return MOVE_CODES[(side, top_left, direction, index)]
+
+
+class CubeBatch:
+    '''N cubes held as one (N, 54) uint8 array.'''
+    def __init__(self, count):
+        '''Start with count solved cubes.'''
+        self.states = np.tile(SOLVED, (count, 1))
+
+    def __len__(self):
+        return len(self.states)
+
+    @classmethod
+    def from_states(cls, states):
+        '''Build a batch from an (N, 54) array of color codes (copied).'''
+        states = np.array(states, dtype=np.uint8)
+        if states.ndim != 2 or states.shape[1] != 54:
+            raise ValueError('states must have shape (N, 54)')
+        batch = cls.__new__(cls)
+        batch.states = states
+        return batch
+
+    @classmethod
+    def from_cubes(cls, cubes):
+        '''Build a batch from RubiksCube instances.'''
+        return cls.from_states([np.frombuffer(cube.get_state(), dtype=np.uint8)
+                                for cube in cubes])
+
+    def apply(self, move):
+        '''Apply a single move code to every cube, or an (N,) array of
+        move codes, one per cube.'''
+        move = np.asarray(move)
+        if move.ndim == 0:
+            self.states = self.states[:, PERM_TABLE[move]]
+        else:
+            if move.shape != (len(self.states),):
+                raise ValueError('expected one move per cube')
+            self.states = np.take_along_axis(self.states, PERM_TABLE[move], axis=1)
+
+    def apply_sequence(self, moves):
+        '''Apply a (length,) sequence of move codes to every cube, or an
+        (N, length) array with a sequence per cube.'''
+        moves = np.asarray(moves)
+        if moves.ndim == 1:
+            # Compose the sequence into one permutation, then gather once.
+            perm = np.arange(54)
+            for move in moves:
+                perm = perm[PERM_TABLE[move]]
+            self.states = self.states[:, perm]
+        else:
+            for column in moves.T:
+                self.apply(column)
+
+    def check_matched(self):
+        '''Returns a boolean mask, True where all sides match.'''
+        sides = self.states.reshape(-1, 6, 9)
+        return (sides == sides[:, :, :1]).all(axis=(1, 2))
+
+    def import_cube(self, i, cube):
+        '''Copy the stickers of a RubiksCube into row i.'''
+        self.states[i] = np.frombuffer(cube.get_state(), dtype=np.uint8)
+
+    def export_cube(self, i, side=0, orientation=0):
+        '''Returns row i as a new RubiksCube viewing side / orientation.'''
+        return RubiksCube.from_state(self.states[i].tobytes(), side, orientation)
@@ -0,0 +1,112 @@
+'''
+cube_cli.py
+
+Author: John Kinder
+Description: Headless batch runner for RubiksCube. No pygame needed.
+Runs a move script, or a number of random scrambles, and writes one
+JSON object per cube (JSON Lines) to stdout.
+
+usage: python ./cube_cli.py [script]            (script file, or - for stdin)
+       python ./cube_cli.py --scrambles N [--length 20] [--seed S]
+
+Move script: one cube per line, moves separated by spaces. Blank lines and
+lines starting with # are skipped.
+    L0 R2   shift_h left / right on row 0, 1 or 2
+    U1 D0   shift_v up / down on column 0, 1 or 2
+    VU VD VL VR   move_up / move_down / move_left / move_right (view only)
+
+Each output line holds:
+    cube      line number in the script, or scramble number
+    moves     number of moves applied
+    solved    check_matched() after the moves
+    side, top_left   the view after the moves
+    state     the 54 color codes as a string of digits (see rubiks_cube.COLORS)
+'''
+
+import argparse
+import json
+import random
+import sys
+
+from rubiks_cube import RubiksCube
+
+# Script token => (method name, arguments)
+MOVE_TOKENS = {'VU': ('move_up',), 'VD': ('move_down',),
+               'VL': ('move_left',), 'VR': ('move_right',)}
+for _index in (0, 1, 2):
+    MOVE_TOKENS['L{}'.format(_index)] = ('shift_h', 'left', _index)
+    MOVE_TOKENS['R{}'.format(_index)] = ('shift_h', 'right', _index)
+    MOVE_TOKENS['U{}'.format(_index)] = ('shift_v', 'up', _index)
+    MOVE_TOKENS['D{}'.format(_index)] = ('shift_v', 'down', _index)
+del _index
+STATE_DIGITS = bytes.maketrans(bytes(range(10)), b'0123456789')
+
+
+def result(number, cube, moves):
+    '''One output record for a cube.'''
+    side, top_left, _ = cube.get_view()
+    return {'cube': number, 'moves': moves, 'solved': cube.check_matched(),
+            'side': side, 'top_left': top_left,
+            'state': cube.get_state().translate(STATE_DIGITS).decode()}
+
+
+def run_script(lines, start_shuffled=False):
+    '''Yields a result per non-blank script line. Cubes start solved unless
+    start_shuffled. Raises ValueError naming the line of a bad token.'''
+    for number, line in enumerate(lines, 1):
+        tokens = line.split()
+        if not tokens or tokens[0].startswith('#'):
+            continue
+        cube = RubiksCube(solved=not start_shuffled)
+        for token in tokens:
+            move = MOVE_TOKENS.get(token)
+            if move is None:
+                raise ValueError('line {}: unknown move {!r}'.format(number, token))
+            getattr(cube, move[0])(*move[1:])
+        yield result(number, cube, len(tokens))
+
+
+def run_scrambles(count, length, seed=None):
+    '''Yields a result per RubiksCube.scramble() of length shifts, starting solved.'''
+    rng = random.Random(seed)
+    for number in range(count):
+        cube = RubiksCube(solved=True)
+        cube.scramble(length, rng=rng)
+        yield result(number, cube, length)
+
+
+def write_results(results):
+    '''Stream results to stdout as JSON Lines.'''
+    write = sys.stdout.write
+    for record in results:
+        write(json.dumps(record))
+        write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run RubiksCube moves without a display.')
+    parser.add_argument('script', nargs='?', default='-',
+                        help='move script file, or - for stdin (default)')
+    parser.add_argument('--scrambles', type=int, metavar='N',
+                        help='run N random scrambles instead of a script')
+    parser.add_argument('--length', type=int, default=20,
+                        help='moves per random scramble (default 20)')
+    parser.add_argument('--seed', type=int, help='random seed for --scrambles')
+    parser.add_argument('--shuffled', action='store_true',
+                        help='start script cubes shuffled instead of solved')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.scrambles is not None:
+            write_results(run_scrambles(args.scrambles, args.length, args.seed))
+        elif args.script == '-':
+            write_results(run_script(sys.stdin, args.shuffled))
+        else:
+            with open(args.script) as lines:
+                write_results(run_script(lines, args.shuffled))
+    except ValueError as err:
+        parser.exit(2, '{}: error: {}\n'.format(parser.prog, err))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,361 @@
+'''
+cube_explorer.py
+
+Author: John Kinder
+Requirements: NumPy
+Description: Breadth-first distance distributions from solved under the
+game's own moves: shift_h / shift_v of rows and columns 0 - 2 (middle
+slices included) from a fixed view, or any subset of them.
+A state is tracked as the pieces of the kinds asked for (corners, edges,
+centers), each kind as a permutation of the positions the moves reach and,
+unless the moves never change it, their orientations. The last twist / flip
+is left out when the moves keep the sum fixed, as are odd permutations when
+no move makes one. Each coordinate is ranked, and the ranks combined into
+one index, so every state has its own number in 0 .. size - 1.
+
+Two ways to explore:
+- dense, when size is at most max_states: 2 bits per index (unseen, this
+  depth, next depth, done), scanned a chunk at a time, so memory is
+  size / 4 bytes whatever the depth. Exact for subgroups like corners only
+  (8! * 3^7 = 88,179,840 states) or two faces (--moves "L0 R0 U2 D2", U and R).
+- sparse, for the full cube: only the last two depths are kept, as sorted
+  arrays of coordinates. The moves come in inverse pairs, so the next depth
+  is the neighbors of this one minus this depth and the one before. Needs a
+  max_depth, the levels grow about tenfold each.
+Each depth reached can be checkpointed, and a run given the same checkpoint
+path picks up from there.
+
+usage: python ./cube_explorer.py [corners|edges|centers|corners+edges|cube]
+           [--moves "L0 R0 U2 D2"] [--max-depth D] [--checkpoint run.npz]
+           [--max-states N]
+
+Externally available:
+- Explorer(pieces, moves, max_states) .size, .dense, explore(max_depth,
+  checkpoint, report) Returns the number of states at each depth.
+- PIECES The piece kind names, and the kinds in each.
+'''
+
+import argparse
+import hashlib
+import os
+import time
+from math import factorial
+
+import numpy as np
+
+from cube_cli import MOVE_TOKENS
+from cube_solver import CORNERS, EDGES, _cubie_move, _parity, _rank_rows
+from rubiks_cube import PERMUTATIONS
+
+PIECES = {'corners': ('corners',), 'edges': ('edges',), 'centers': ('centers',),
+          'corners+edges': ('corners', 'edges'),
+          'cube': ('corners', 'edges', 'centers')}
+KINDS = {'corners': CORNERS, 'edges': EDGES,
+         'centers': tuple((side * 9 + 4,) for side in range(6))}
+# Every shift from side 0, top left 0.
+SHIFT_TOKENS = tuple(token for token, move in MOVE_TOKENS.items() if move[0].startswith('shift'))
+# Largest index range explored densely (2 bits each, so 2 GiB), and the
+# largest coordinate given a move table rather than ranked on the fly.
+MAX_STATES = 1 << 33
+MAX_TABLE = 1 << 18
+# Packed bytes per dense scan chunk (4 states each), and states per sparse chunk.
+CHUNK_BYTES = 1 << 20
+SPARSE_CHUNK = 1 << 18
+CHECKPOINT_VERSION = 1
+
+# 2 bit marks of the dense store, and the byte lookup table ending a depth:
+# this depth becomes done, next depth becomes this depth.
+UNSEEN, CURRENT, NEXT, DONE = 0, 1, 2, 3
+_ADVANCE = np.array([sum((DONE, DONE, CURRENT, DONE)[(byte >> shift) & 3] << shift
+                         if (byte >> shift) & 3 else 0 for shift in (0, 2, 4, 6))
+                     for byte in range(256)], dtype=np.uint8)
+
+
+def _unrank_rows(values, k):
+    '''The permutations of 0 .. k-1 with the given lexicographic ranks, (N, k).'''
+    perms = np.empty((len(values), k), dtype=np.int8)
+    for i in range(k - 1, -1, -1):
+        values, perms[:, i] = np.divmod(values, k - i)
+    # Lehmer digits to values, last first.
+    for i in range(k - 2, -1, -1):
+        perms[:, i + 1:] += perms[:, i + 1:] >= perms[:, i:i + 1]
+    return perms
+
+
+class _Permutation:
+    '''Which piece is at each of k positions. With even, only even permutations
+    are numbered: the lowest Lehmer digit follows from the others.'''
+    def __init__(self, sources, even):
+        self.k = len(sources[0])
+        self.sources = sources
+        self.even = even
+        self.size = factorial(self.k) // (2 if even else 1)
+
+    def apply(self, values, move):
+        if self.even:
+            values = values * 2
+            digits = values.copy()
+            parity = np.zeros(len(values), dtype=np.int64)
+            for i in range(2, self.k + 1):
+                digits, digit = np.divmod(digits, i)
+                parity += digit
+            values += parity & 1
+        ranks = _rank_rows(_unrank_rows(values, self.k)[:, self.sources[move]])
+        return ranks // 2 if self.even else ranks
+
+
+class _Orientation:
+    '''Orientation (0 .. base-1) of the piece at each of k positions, base k digits.
+    With fixed_sum the last digit is left out, making the total 0 mod base.'''
+    def __init__(self, base, sources, changes, fixed_sum):
+        self.base = base
+        self.sources = sources
+        self.changes = changes
+        self.fixed_sum = fixed_sum
+        self.k = len(sources[0])
+        self.size = base ** (self.k - 1 if fixed_sum else self.k)
+
+    def apply(self, values, move):
+        base = self.base
+        stored = self.k - 1 if self.fixed_sum else self.k
+        digits = np.empty((len(values), self.k), dtype=np.int64)
+        for i in range(stored - 1, -1, -1):
+            values, digits[:, i] = np.divmod(values, base)
+        if self.fixed_sum:
+            digits[:, -1] = -digits[:, :-1].sum(axis=1) % base
+        moved = (digits[:, self.sources[move]] + self.changes[move]) % base
+        return moved[:, :stored] @ (base ** np.arange(stored - 1, -1, -1))
+
+
+class Explorer:
+    '''Depth by depth distances from solved for the piece kinds in pieces
+    (a PIECES name) under the shift tokens in moves (as cube_cli takes them,
+    all 12 shifts if None).'''
+    def __init__(self, pieces='corners', moves=None, max_states=MAX_STATES):
+        if pieces not in PIECES:
+            raise ValueError('pieces must be one of {}'.format(', '.join(PIECES)))
+        tokens = tuple(SHIFT_TOKENS if moves is None else moves)
+        for token in tokens:
+            if token not in SHIFT_TOKENS:
+                raise ValueError('unknown shift {!r}'.format(token))
+        self.pieces = pieces
+        self.tokens = tokens
+        perms = [PERMUTATIONS[(0, 0) + MOVE_TOKENS[token][1:]] for token in tokens]
+        self.coordinates = []
+        actions = [[] for _ in tokens]
+        for kind in PIECES[pieces]:
+            positions = KINDS[kind]
+            moved = [_cubie_move(positions, perm) for perm in perms]
+            # The positions some move changes, the rest are left out.
+            orbit = [t for t in range(len(positions))
+                     if any(source[t] != t or change[t] for source, change in moved)]
+            if not orbit:
+                continue
+            local = {t: n for n, t in enumerate(orbit)}
+            sources = [np.array([local[source[t]] for t in orbit]) for source, _ in moved]
+            changes = [np.array([change[t] for t in orbit]) for _, change in moved]
+            even = not any(_parity(list(source)) for source in sources)
+            self.coordinates.append(_Permutation(sources, even))
+            base = len(positions[0])
+            if base > 1 and any(change.any() for change in changes):
+                fixed_sum = all(change.sum() % base == 0 for change in changes)
+                self.coordinates.append(_Orientation(base, sources, changes, fixed_sum))
+            for m, (source, change) in enumerate(zip(sources, changes)):
+                actions[m].append((tuple(source), tuple(change)))
+        # Moves that do the same to the tracked pieces (or nothing) count once.
+        self.moves = []
+        seen = {tuple((tuple(range(len(source))), (0,) * len(source))
+                      for source, _ in actions[0])} if actions else set()
+        for m, action in enumerate(actions):
+            if tuple(action) not in seen:
+                seen.add(tuple(action))
+                self.moves.append(m)
+        self.tables = [np.stack([coordinate.apply(np.arange(coordinate.size), m)
+                                 for m in self.moves], axis=1).astype(np.int32)
+                       if coordinate.size <= MAX_TABLE else None
+                       for coordinate in self.coordinates]
+        self.size = 1
+        for coordinate in self.coordinates:
+            self.size *= coordinate.size
+        self.dense = self.size <= max_states
+        self.signature = hashlib.sha256(repr((CHECKPOINT_VERSION, pieces, tokens, self.dense))
+                                        .encode()).hexdigest()[:32]
+
+    def __move(self, column, values, m):
+        '''Values of coordinate column after move m (an index into self.moves).'''
+        table = self.tables[column]
+        if table is not None:
+            return table[values, m]
+        return self.coordinates[column].apply(values, self.moves[m])
+
+    def explore(self, max_depth=None, checkpoint=None, report=None):
+        '''Count the states at each depth, up to max_depth or until none are
+        left. Saves each depth to checkpoint (a .npz path) and resumes from it.
+        report(depth, count) is called as each depth is finished.
+        Returns the list of counts.'''
+        if not self.dense and max_depth is None:
+            raise ValueError('{:,} states is too many to store, give a max depth'
+                             .format(self.size))
+        if not self.dense:
+            for m in range(len(self.moves)):
+                if not any(self.__same_move(m, other) for other in range(len(self.moves))):
+                    raise ValueError('depth limited search needs the inverse of every move')
+        if self.dense:
+            return self.__explore_dense(max_depth, checkpoint, report)
+        return self.__explore_sparse(max_depth, checkpoint, report)
+
+    def __same_move(self, m, other):
+        '''True if move other undoes move m on the tracked pieces (tried on a sample).'''
+        rng = np.random.default_rng(0)
+        values = [rng.integers(0, coordinate.size, 256) for coordinate in self.coordinates]
+        return all((self.__move(column, self.__move(column, values[column], m), other)
+                    == values[column]).all() for column in range(len(values)))
+
+    def __strides(self):
+        strides = []
+        stride = 1
+        for coordinate in reversed(self.coordinates):
+            strides.append(np.int64(stride))
+            stride *= coordinate.size
+        return strides[::-1]
+
+    def __load(self, checkpoint):
+        '''The arrays saved at checkpoint, or None to start from scratch.'''
+        if checkpoint is None or not os.path.exists(checkpoint):
+            return None
+        saved = np.load(checkpoint)
+        if str(saved['signature']) != self.signature:
+            raise ValueError('{} is a checkpoint of another exploration'.format(checkpoint))
+        return saved
+
+    def __save(self, checkpoint, **arrays):
+        '''Write the arrays to checkpoint, renamed into place when complete.'''
+        if checkpoint is None:
+            return
+        tmp_path = '{}.{}.tmp'.format(checkpoint, os.getpid())
+        with open(tmp_path, 'wb') as out:
+            np.savez(out, signature=np.array(self.signature), **arrays)
+        os.replace(tmp_path, checkpoint)
+
+    def __explore_dense(self, max_depth, checkpoint, report):
+        saved = self.__load(checkpoint)
+        if saved is None:
+            marks = np.zeros((self.size + 3) // 4, dtype=np.uint8)
+            marks[0] = CURRENT                  # solved is index 0
+            counts = [1]
+            self.__save(checkpoint, marks=marks, counts=np.array(counts))
+        else:
+            marks = saved['marks'].copy()
+            counts = saved['counts'].tolist()
+        if report:
+            for depth, count in enumerate(counts):
+                if count:
+                    report(depth, count)
+        strides = self.__strides()
+        shifts = np.array([0, 2, 4, 6], dtype=np.uint8)
+        while counts[-1] and (max_depth is None or len(counts) <= max_depth):
+            count = 0
+            for start in range(0, len(marks), CHUNK_BYTES):
+                chunk = marks[start:start + CHUNK_BYTES]
+                if not chunk.any():
+                    continue
+                fields = (chunk[:, None] >> shifts) & 3
+                index = np.flatnonzero(fields.ravel() == CURRENT) + start * 4
+                if not index.size:
+                    continue
+                values = []
+                rest = index
+                for stride in strides:
+                    value, rest = np.divmod(rest, stride)
+                    values.append(value)
+                for m in range(len(self.moves)):
+                    reached = sum(self.__move(column, values[column], m) * stride
+                                  for column, stride in enumerate(strides))
+                    byte, field = np.divmod(reached, 4)
+                    reached = reached[(marks[byte] >> (field * 2).astype(np.uint8)) & 3 == UNSEEN]
+                    reached = np.unique(reached)
+                    byte, field = np.divmod(reached, 4)
+                    np.bitwise_or.at(marks, byte, (NEXT << (field * 2)).astype(np.uint8))
+                    count += len(reached)
+            for start in range(0, len(marks), CHUNK_BYTES):
+                chunk = marks[start:start + CHUNK_BYTES]
+                chunk[:] = _ADVANCE[chunk]
+            counts.append(count)
+            self.__save(checkpoint, marks=marks, counts=np.array(counts))
+            if report and count:
+                report(len(counts) - 1, count)
+        return counts[:-1] if not counts[-1] else counts
+
+    def __explore_sparse(self, max_depth, checkpoint, report):
+        columns = len(self.coordinates)
+        saved = self.__load(checkpoint)
+        if saved is None:
+            before = np.zeros((0, columns), dtype=np.int64)
+            current = np.zeros((1, columns), dtype=np.int64)
+            counts = [1]
+            self.__save(checkpoint, before=before, current=current, counts=np.array(counts))
+        else:
+            before = saved['before']
+            current = saved['current']
+            counts = saved['counts'].tolist()
+        if report:
+            for depth, count in enumerate(counts):
+                if count:
+                    report(depth, count)
+        row = np.dtype((np.void, 8 * columns))
+
+        def rows(states):
+            return np.ascontiguousarray(states, dtype=np.int64).view(row).ravel()
+
+        while counts[-1] and len(counts) <= max_depth:
+            found = []
+            for start in range(0, len(current), SPARSE_CHUNK):
+                chunk = current[start:start + SPARSE_CHUNK]
+                for m in range(len(self.moves)):
+                    found.append(rows(np.stack([self.__move(column, chunk[:, column], m)
+                                                for column in range(columns)], axis=1)))
+                found = [np.unique(np.concatenate(found))]
+            reached = np.setdiff1d(found[0], np.concatenate((rows(before), rows(current))),
+                                   assume_unique=True)
+            before, current = current, reached.view(np.int64).reshape(-1, columns)
+            counts.append(len(current))
+            self.__save(checkpoint, before=before, current=current, counts=np.array(counts))
+            if report and counts[-1]:
+                report(len(counts) - 1, counts[-1])
+        return counts[:-1] if not counts[-1] else counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Count the states at each distance from solved.')
+    parser.add_argument('pieces', nargs='?', default='corners', choices=list(PIECES),
+                        help='pieces to track (default corners, cube is everything)')
+    parser.add_argument('--moves', help='shifts to use, as in cube_cli scripts, '
+                        'e.g. "L0 R0 U2 D2" (default all 12)')
+    parser.add_argument('--max-depth', type=int, help='stop after this depth')
+    parser.add_argument('--checkpoint', metavar='PATH',
+                        help='.npz file saved after each depth and resumed from')
+    parser.add_argument('--max-states', type=int, default=MAX_STATES,
+                        help='largest index range stored 2 bits per state '
+                        '(default {:,})'.format(MAX_STATES))
+    args = parser.parse_args(argv)
+    try:
+        explorer = Explorer(args.pieces, args.moves.split() if args.moves else None,
+                            args.max_states)
+        print('{}: {} moves, {:,} indexes, {}'.format(
+            args.pieces, len(explorer.moves), explorer.size,
+            'dense' if explorer.dense else 'depth limited'))
+        start = time.perf_counter()
+        total = [0]
+
+        def report(depth, count):
+            total[0] += count
+            print('{:5d} {:16,d} {:16,d} {:9.1f} s'.format(
+                depth, count, total[0], time.perf_counter() - start), flush=True)
+
+        explorer.explore(args.max_depth, args.checkpoint, report)
+    except ValueError as err:
+        parser.exit(2, '{}: error: {}\n'.format(parser.prog, err))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+'''
+cube_farm.py
+
+Author: John Kinder
+Requirements: NumPy (and the solver tables for --solve)
+Description: Generates (and optionally solves) scramble corpora on all cores.
+The job is split into shards of scramble numbers. Worker processes write
+their results straight into one multiprocessing.shared_memory buffer:
+- states: (count, 54) uint8, the scrambled color codes
+- counts: (count, 2) uint16, scramble moves and solution moves (shift_h /
+  shift_v calls, NO_SOLUTION if not solved or not asked to solve)
+Scramble i is drawn from its own generator seeded with (seed, i), so the
+results are the same whatever the number of workers or shards.
+
+usage: python ./cube_farm.py N [--seed S] [--length 20] [--solve]
+                               [--workers W] [--out corpus.npz]
+'''
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from rubiks_cube import RubiksCube
+
+NO_SOLUTION = 0xFFFF
+
+
+def _layout(buffer, count):
+    '''NumPy views of the states and counts in a shared buffer.'''
+    states = np.ndarray((count, 54), dtype=np.uint8, buffer=buffer)
+    counts = np.ndarray((count, 2), dtype=np.uint16, buffer=buffer, offset=count * 54)
+    return states, counts
+
+
+def scramble(number, seed, length):
+    '''Scramble number of a job: RubiksCube.scramble() with a generator
+    seeded with (seed, number).'''
+    cube = RubiksCube(solved=True)
+    cube.scramble(length, rng=random.Random('{}/{}'.format(seed, number)))
+    return cube
+
+
+def _work(name, count, start, stop, seed, length, solve):
+    '''Worker: fill records start .. stop - 1 of the shared buffer.'''
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        states, counts = _layout(memory.buf, count)
+        for number in range(start, stop):
+            cube = scramble(number, seed, length)
+            states[number] = np.frombuffer(cube.get_state(), dtype=np.uint8)
+            counts[number, 0] = length
+            counts[number, 1] = NO_SOLUTION
+            if solve:
+                moves = cube.solve()
+                if moves is not None:
+                    counts[number, 1] = sum(1 for move in moves if move[0].startswith('shift'))
+        # Drop the views before closing, they hold the buffer.
+        del states, counts
+    finally:
+        memory.close()
+    return stop - start
+
+
+def run(count, seed=0, length=20, solve=False, workers=None, shard_size=None):
+    '''Run a job. Returns (states, counts) arrays, copied out of shared memory.'''
+    workers = workers or os.cpu_count() or 1
+    shard_size = shard_size or max(1, min(1024, -(-count // (workers * 4))))
+    memory = shared_memory.SharedMemory(create=True, size=max(1, count * 58))
+    try:
+        if solve:
+            # Build the table cache once here, rather than racing in every worker.
+            from cube_solver import load_tables
+            load_tables()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            jobs = [pool.submit(_work, memory.name, count, start,
+                                min(start + shard_size, count), seed, length, solve)
+                    for start in range(0, count, shard_size)]
+            for job in jobs:
+                job.result()
+        states, counts = _layout(memory.buf, count)
+        result = states.copy(), counts.copy()
+        del states, counts
+        return result
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate and solve scrambles on all cores.')
+    parser.add_argument('count', type=int, help='number of scrambles')
+    parser.add_argument('--seed', type=int, default=0, help='job seed (default 0)')
+    parser.add_argument('--length', type=int, default=20,
+                        help='moves per scramble (default 20)')
+    parser.add_argument('--solve', action='store_true', help='also solve every scramble')
+    parser.add_argument('--workers', type=int, help='worker processes (default all cores)')
+    parser.add_argument('--out', help='save states and counts to this .npz file')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    states, counts = run(args.count, args.seed, args.length, args.solve, args.workers)
+    elapsed = time.perf_counter() - started
+    print('{} scrambles in {:.2f} s ({:.0f}/s)'.format(
+        args.count, elapsed, args.count / elapsed if elapsed else 0))
+    if args.solve:
+        solved = counts[:, 1] != NO_SOLUTION
+        print('solved {} of {}, average {:.1f} moves'.format(
+            solved.sum(), args.count, counts[solved, 1].mean() if solved.any() else 0))
+    if args.out:
+        np.savez(args.out, states=states, counts=counts)
+
+
+if __name__ == '__main__':
+    main()
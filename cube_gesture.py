@@ -0,0 +1,92 @@
+'''
+cube_gesture.py
+
+Author: John Kinder
+Description: Streaming recognizer for the right button drags that shift a
+row or column. No pygame needed, so it can be fed synthetic positions.
+Each position updates a running summary (count, min / max, sums, first and
+last point); nothing is stored per sample. On release the summary decides
+in constant time:
+- the drag has to stay on the cube and be at least MIN_DRAG of a cell long,
+- the longer of its width and height gives horizontal or vertical, the
+  first and last points the direction,
+- the average position across the drag gives the row or column.
+Drags of any speed, any number of samples and across any number of cells
+give one shift.
+
+Externally available:
+- DragGesture(left, top, cell_size, cells) start(x, y), add(x, y), finish().
+'''
+
+# Shortest drag, as a fraction of a cell, that counts as a shift.
+MIN_DRAG = 0.5
+
+
+class DragGesture:
+    '''Running summary of one drag over a grid of cells x cells squares of
+    cell_size pixels, with its top left corner at (left, top).'''
+    def __init__(self, left, top, cell_size, cells=3):
+        self.left = left
+        self.top = top
+        self.cell_size = cell_size
+        self.cells = cells
+        self.active = False
+        self.count = 0
+
+    def start(self, x, y):
+        '''Begin a drag at (x, y).'''
+        self.active = True
+        self.count = 1
+        self.first = self.last = (x, y)
+        self.x_min = self.x_max = self.x_sum = x
+        self.y_min = self.y_max = self.y_sum = y
+
+    def add(self, x, y):
+        '''Add a position to the drag. Ignored unless a drag was started.'''
+        if not self.active:
+            return
+        self.count += 1
+        self.last = (x, y)
+        self.x_sum += x
+        self.y_sum += y
+        if x < self.x_min:
+            self.x_min = x
+        elif x > self.x_max:
+            self.x_max = x
+        if y < self.y_min:
+            self.y_min = y
+        elif y > self.y_max:
+            self.y_max = y
+
+    def finish(self, x=None, y=None):
+        '''End the drag, at (x, y) if given. Returns the move it makes, as
+        ('shift_h', 'left' / 'right', row) or ('shift_v', 'up' / 'down', col),
+        or None if it is not a shift.'''
+        if not self.active:
+            return None
+        if x is not None:
+            self.add(x, y)
+        self.active = False
+        size = self.cell_size * self.cells
+        if self.x_min < self.left or self.x_max > self.left + size:
+            return None
+        if self.y_min < self.top or self.y_max > self.top + size:
+            return None
+        width = self.x_max - self.x_min
+        height = self.y_max - self.y_min
+        if max(width, height) < MIN_DRAG * self.cell_size or width == height:
+            return None
+        if height > width:
+            index = self.__cell(self.x_sum / self.count - self.left)
+            direction = 'down' if self.first[1] < self.last[1] else 'up'
+            return None if index is None else ('shift_v', direction, index)
+        index = self.__cell(self.y_sum / self.count - self.top)
+        direction = 'right' if self.first[0] < self.last[0] else 'left'
+        return None if index is None else ('shift_h', direction, index)
+
+    def __cell(self, offset):
+        '''Row / column at offset pixels into the grid, None on a border.'''
+        index = int(offset // self.cell_size)
+        if offset == index * self.cell_size or not 0 <= index < self.cells:
+            return None
+        return index
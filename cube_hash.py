@@ -0,0 +1,144 @@
+'''
+cube_hash.py
+
+Author: John Kinder
+Description: Canonical keys for cube states and a fixed-size transposition
+table keyed by them, so search and batch tools can remember results per
+state in bounded memory.
+
+The key only depends on the 54 stickers, never on the side / top left in
+view. With symmetry=True, states that are whole-cube rotations of each
+other (24 of them) share a key.
+
+Externally available:
+- state_key(state, symmetry=False) 64 bit key of 54 color codes.
+- canonical_state(state) The smallest of the 24 rotations of a state.
+- ROTATIONS The 24 whole-cube rotations as sticker permutations.
+- TranspositionTable(size, probe) Open addressing table of integer values.
+'''
+
+from array import array
+from hashlib import blake2b
+from operator import itemgetter
+
+from rubiks_cube import PERMUTATIONS
+
+
+def _build_rotations():
+    '''Whole-cube rotations, made by shifting all three rows (or columns)
+    together, closed under composition.'''
+    turns = []
+    for direction in ('left', 'up'):
+        perm = tuple(range(54))
+        for index in (0, 1, 2):
+            step = PERMUTATIONS[(0, 0, direction, index)]
+            perm = tuple(perm[i] for i in step)
+        turns.append(perm)
+    rotations = {tuple(range(54))}
+    frontier = list(rotations)
+    while frontier:
+        perm = frontier.pop()
+        for turn in turns:
+            rotated = tuple(perm[i] for i in turn)
+            if rotated not in rotations:
+                rotations.add(rotated)
+                frontier.append(rotated)
+    return sorted(rotations)
+
+
+ROTATIONS = _build_rotations()
+_ROTATION_GATHERS = [itemgetter(*perm) for perm in ROTATIONS]
+
+
+def canonical_state(state):
+    '''Returns the smallest (as bytes) of the 24 whole-cube rotations of state.'''
+    return min(bytes(gather(state)) for gather in _ROTATION_GATHERS)
+
+
+def state_key(state, symmetry=False):
+    '''64 bit key of 54 color codes. With symmetry, rotations of the
+    whole cube give the same key.'''
+    if symmetry:
+        state = canonical_state(state)
+    return int.from_bytes(blake2b(bytes(state), digest_size=8).digest(), 'little')
+
+
+class TranspositionTable:
+    '''Fixed-size table from state keys to integer values (distances, move
+    counts, scores ...). Open addressing: a key may sit in any of probe slots
+    after its home slot. When they are all taken, the entry from an older
+    generation (see new_generation) or else the one stored with the smallest
+    depth is replaced.'''
+    def __init__(self, size=1 << 20, probe=4):
+        '''size is rounded up to a power of two.'''
+        self.__mask = (1 << max(0, size - 1).bit_length()) - 1
+        self.__probe = probe
+        slots = self.__mask + 1
+        self.__keys = array('Q', bytes(8 * slots))
+        self.__used = array('B', bytes(slots))          # 1 where a key is stored
+        self.__values = array('q', bytes(8 * slots))
+        self.__depths = array('B', bytes(slots))
+        self.__generations = array('B', bytes(slots))
+        self.__generation = 0
+        self.__count = 0
+
+    def __len__(self):
+        return self.__count
+
+    def __contains__(self, key):
+        return self.__find(key) is not None
+
+    def __find(self, key):
+        '''Slot holding key, or None.'''
+        keys = self.__keys
+        used = self.__used
+        mask = self.__mask
+        for i in range(self.__probe):
+            slot = (key + i) & mask
+            if not used[slot]:
+                return None
+            if keys[slot] == key:
+                return slot
+        return None
+
+    def get(self, key, default=None):
+        '''Returns the value stored for key, or default.'''
+        slot = self.__find(key)
+        return default if slot is None else self.__values[slot]
+
+    def put(self, key, value, depth=0):
+        '''Store value for key. depth (0 - 255) says how much work the value
+        stands for; deeper entries are kept in preference to shallow ones.'''
+        keys = self.__keys
+        used = self.__used
+        mask = self.__mask
+        victim = None
+        best = None
+        for i in range(self.__probe):
+            slot = (key + i) & mask
+            if not used[slot] or keys[slot] == key:
+                victim = slot
+                break
+            rank = (self.__generations[slot] == self.__generation, self.__depths[slot])
+            if best is None or rank < best:
+                victim = slot
+                best = rank
+        if not used[victim]:
+            used[victim] = 1
+            self.__count += 1
+        keys[victim] = key
+        self.__values[victim] = value
+        self.__depths[victim] = min(depth, 255)
+        self.__generations[victim] = self.__generation
+
+    def new_generation(self):
+        '''Mark everything stored so far as older, e.g. when a new search starts,
+        so it is replaced first.'''
+        self.__generation = (self.__generation + 1) & 0xFF
+
+    def clear(self):
+        '''Remove every entry.'''
+        for table in (self.__keys, self.__used, self.__values, self.__depths,
+                      self.__generations):
+            table[:] = array(table.typecode, bytes(table.itemsize * len(table)))
+        self.__count = 0
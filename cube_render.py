@@ -0,0 +1,239 @@
+'''
+cube_render.py
+
+Author: John Kinder
+Requirements: PyGame (NumPy to read cube_farm.py .npz corpora)
+Description: Offscreen renderer for cube reports. Draws each state as a
+tile with the front side in the middle of the adjacent sides, as the game
+lays them out under its main view:
+            up
+      left front right back
+           down
+Tiles go onto contact sheets (one large pygame.Surface each) or out one at
+a time as a frame sequence. No window is opened, only pygame.display is
+initialized (SDL_VIDEODRIVER=dummy works headless), and the stickers are
+blitted with one blits() call per tile from a sprite_atlas.Atlas, so
+thousands of states a second are drawn. Writing the PNGs costs more.
+
+States can be RubiksCube instances (drawn from their current view), the
+color codes as get_state() returns them (bytes, bytearray or a NumPy uint8
+row, drawn from side 0 with its first top left) or (codes, side, top_left).
+
+usage: python ./cube_render.py corpus.npz|states.jsonl|- [--out sheet.png]
+           [--columns 20] [--rows 25] [--cell 8] [--frames directory]
+The states come from a cube_farm.py --out file, or cube_cli.py output
+(JSON Lines, - for stdin), e.g.
+    python ./cube_cli.py --scrambles 1000 | python ./cube_render.py - --out report.png
+writes report-000.png and report-001.png, 500 tiles each.
+
+Externally available:
+- Renderer(size, cell, gap, image_dir, cache_dir) .tile_size, draw(target, state, x, y),
+  new_surface(width, height), frames(states), sheet(states, columns),
+  sheets(states, columns, rows).
+- read_states(path) The states in a .npz corpus or JSON Lines file.
+'''
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from math import isqrt
+
+import pygame
+
+from rubiks_cube import COLORS, RubiksCube, cube_tables
+from sprite_atlas import CACHE_DIR, Atlas
+
+BACKGROUND = (128, 128, 128)
+# Width of each sticker, between the sides and around a tile, in pixels.
+CELL = 8
+GAP = 2
+MARGIN = 4
+COLUMNS = 20
+ROWS = 25
+# cube_cli.py state digits => color codes
+DIGIT_CODES = bytes.maketrans(b'012345', bytes(range(len(COLORS))))
+# Where each side goes in a tile, in sides across and down.
+TILE_LAYOUT = (('up', 1, 0), ('left', 0, 1), ('front', 1, 1), ('right', 2, 1),
+               ('back', 3, 1), ('down', 1, 2))
+
+
+class Renderer:
+    '''Draws states of one cube size as tiles, cell pixels per sticker.
+    The sticker images come from image_dir through an atlas cached in cache_dir.'''
+    def __init__(self, size=3, cell=CELL, gap=GAP, image_dir='.', cache_dir=CACHE_DIR):
+        pygame.display.init()
+        self.size = size
+        self.cell = cell
+        self.__tables = cube_tables(size)
+        self.__step = size * cell + gap
+        self.tile_size = (MARGIN * 2 + 4 * self.__step - gap,
+                          MARGIN * 2 + 3 * self.__step - gap)
+        # Every surface is made in this format, so blits are plain copies.
+        self.__format = pygame.Surface((1, 1), 0, 32)
+        atlas = Atlas(cell, image_dir, cache_dir)
+        self.__surface = atlas.surface.convert(self.__format)
+        # Source rect of each color code.
+        self.__areas = [atlas.areas[color] for color in COLORS]
+        self.__places = {}
+
+    def __view_places(self, side, top_left):
+        '''(x, y, sticker) in a tile for every sticker drawn seen from side with
+        top_left, made once per view.'''
+        places = self.__places.get((side, top_left))
+        if places is None:
+            tables = self.__tables
+            places = []
+            for direction, across, down in TILE_LAYOUT:
+                if direction == 'front':
+                    face_side, face_top_left = side, top_left
+                else:
+                    face_side, face_top_left = tables.adjacent_views[
+                        (side, top_left, direction)]
+                base = face_side * tables.cells
+                y = MARGIN + down * self.__step
+                for row in tables.views[face_top_left]:
+                    x = MARGIN + across * self.__step
+                    for sticker in row:
+                        places.append((x, y, base + sticker))
+                        x += self.cell
+                    y += self.cell
+            places = self.__places[(side, top_left)] = tuple(places)
+        return places
+
+    def __unpack(self, state):
+        '''(codes, side, top_left) for a state in any of the accepted forms.'''
+        if isinstance(state, RubiksCube):
+            side, top_left, _ = state.get_view()
+            codes = state.get_state()
+        elif isinstance(state, tuple):
+            codes, side, top_left = state
+        else:
+            codes, side, top_left = state, 0, self.__tables.top_lefts[0]
+        if not isinstance(codes, (bytes, bytearray)):
+            codes = bytes(codes)
+        if len(codes) != self.__tables.stickers:
+            raise ValueError('{} stickers is not a {} x {} x {} cube'.format(
+                len(codes), self.size, self.size, self.size))
+        return codes, side, top_left
+
+    def new_surface(self, width, height):
+        '''A surface in the renderer's pixel format, filled with BACKGROUND.'''
+        surface = pygame.Surface((width, height), 0, self.__format)
+        surface.fill(BACKGROUND)
+        return surface
+
+    def draw(self, target, state, x=0, y=0):
+        '''Draw the tile for state with its top left at x, y on target.
+        Only the stickers are drawn, over whatever background target has.'''
+        codes, side, top_left = self.__unpack(state)
+        surface = self.__surface
+        areas = self.__areas
+        target.blits([(surface, (x + dx, y + dy), areas[codes[sticker]])
+                      for dx, dy, sticker in self.__view_places(side, top_left)], False)
+
+    def frames(self, states):
+        '''Yields a tile surface per state. It is the same surface each time,
+        redrawn, so save or copy it before taking the next one.'''
+        tile = self.new_surface(*self.tile_size)
+        for state in states:
+            self.draw(tile, state)
+            yield tile
+
+    def sheet(self, states, columns=COLUMNS):
+        '''Returns one surface with a tile per state, columns tiles across.'''
+        states = list(states)
+        rows = max(1, -(-len(states) // columns))
+        width, height = self.tile_size
+        sheet = self.new_surface(width * min(columns, max(1, len(states))), height * rows)
+        for number, state in enumerate(states):
+            self.draw(sheet, state, number % columns * width, number // columns * height)
+        return sheet
+
+    def sheets(self, states, columns=COLUMNS, rows=ROWS):
+        '''Yields sheets of up to columns x rows tiles until states runs out,
+        never holding more than one sheet's states.'''
+        states = iter(states)
+        while True:
+            chunk = list(itertools.islice(states, columns * rows))
+            if not chunk:
+                return
+            yield self.sheet(chunk, columns)
+
+
+def read_states(path):
+    '''Yields the states in a cube_farm.py .npz file (as bytes), or in
+    cube_cli.py JSON Lines (as (codes, side, top_left)), - being stdin.'''
+    if path.endswith('.npz'):
+        import numpy as np
+        with np.load(path) as corpus:
+            states = corpus['states']
+        for row in states:
+            yield row.tobytes()
+        return
+    source = sys.stdin if path == '-' else open(path)
+    try:
+        for line in source:
+            if line.strip():
+                record = json.loads(line)
+                yield (record['state'].encode().translate(DIGIT_CODES),
+                       record.get('side', 0), record.get('top_left', 0))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+def _size_of(states):
+    '''The cube size of the first state, and all the states again.'''
+    states = iter(states)
+    first = next(states, None)
+    if first is None:
+        return 3, iter(())
+    codes = first.get_state() if isinstance(first, RubiksCube) else \
+        first[0] if isinstance(first, tuple) else first
+    size = isqrt(len(codes) // 6)
+    return size, itertools.chain((first,), states)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Draw cube states onto contact sheets.')
+    parser.add_argument('states', help='cube_farm.py .npz or cube_cli.py JSON Lines (- for stdin)')
+    parser.add_argument('--out', default='sheet.png',
+                        help='sheet file name, numbered when there are more (default sheet.png)')
+    parser.add_argument('--columns', type=int, default=COLUMNS,
+                        help='tiles across a sheet (default {})'.format(COLUMNS))
+    parser.add_argument('--rows', type=int, default=ROWS,
+                        help='tiles down a sheet (default {})'.format(ROWS))
+    parser.add_argument('--cell', type=int, default=CELL,
+                        help='sticker width in pixels (default {})'.format(CELL))
+    parser.add_argument('--frames', metavar='DIRECTORY',
+                        help='write one image per state here instead of sheets')
+    args = parser.parse_args(argv)
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    # The color images are next to this file.
+    image_dir = os.path.dirname(os.path.abspath(__file__))
+
+    size, states = _size_of(read_states(args.states))
+    renderer = Renderer(size, args.cell, image_dir=image_dir)
+    if args.frames:
+        os.makedirs(args.frames, exist_ok=True)
+        count = 0
+        for frame in renderer.frames(states):
+            pygame.image.save(frame, os.path.join(args.frames, 'frame-{:06d}.png'.format(count)))
+            count += 1
+        print('{} frames in {}'.format(count, args.frames))
+        return
+    name, extension = os.path.splitext(args.out)
+    written = []
+    for number, sheet in enumerate(renderer.sheets(states, args.columns, args.rows)):
+        written.append('{}-{:03d}{}'.format(name, number, extension))
+        pygame.image.save(sheet, written[-1])
+    if len(written) == 1:
+        os.replace(written[0], args.out)
+        written[0] = args.out
+    print('\n'.join(written))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+'''
+cube_server.py
+
+Author: John Kinder
+Description: asyncio server hosting many RubiksCube sessions for players or
+bots. No pygame needed. Clients connect over TCP or a Unix socket and send
+one JSON object per line; each gets one JSON line back with the same id:
+    {"id": 1, "op": "create", "seed": 5}  =>  {"id": 1, "ok": true, "session": 1}
+    {"id": 2, "op": "apply", "session": 1, "moves": [["shift_h", "left", 0]]}
+    {"id": 3, "op": "oops"}  =>  {"id": 3, "ok": false, "error": "unknown op 'oops'"}
+
+Ops (session is the number create returned):
+    create      [seed, solved, size]  New cube, shuffled unless solved, size
+                                      up to MAX_CUBE_SIZE.
+    close       session               Forget a session.
+    scramble    session [moves, seed] Random shifts, returns them.
+    apply       session moves | codes A list of up to MAX_APPLY moves as
+                                      apply_moves() takes them, or of one byte
+                                      move codes (see MOVE_LIST). The whole
+                                      list is checked first, so a bad one
+                                      leaves the cube as it was.
+    view        session               side, top_left and the colors.
+    adjacent    session direction     colors of 'up', 'down', 'left', 'right', 'back'.
+    matched     session               solved, solved_faces, out_of_place.
+apply answers with the moves made, solved, side and top_left.
+
+Requests are not answered one at a time. Each connection just queues the
+lines it reads, and once per event loop tick everything queued from all
+connections is run and the replies for each connection written with one
+write(). Busy clients pipelining requests then cost one wakeup and one
+send per tick instead of one per request. A request that fails, even
+one that cannot be parsed, only gets its own error reply. Sessions belong
+to the connection that created them: other connections get 'no session'
+for them, and they are closed with it.
+
+usage: python ./cube_server.py [--host 127.0.0.1] [--port 8642] [--unix path]
+(see benchmarks/server_load.py for a load generator)
+
+Externally available:
+- CubeServer(max_sessions) handle(request), serve(reader, writer), sessions.
+- start_server(server, host, port, path) Returns the asyncio server.
+'''
+
+import argparse
+import asyncio
+import json
+
+from rubiks_cube import RubiksCube, cube_tables
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8642
+MAX_SESSIONS = 100000
+# Biggest cube create makes, each size's move tables being built on first use.
+MAX_CUBE_SIZE = 10
+MAX_SCRAMBLE = 10000
+MAX_APPLY = 10000
+# Longest request line accepted, and the reply bytes buffered for a
+# connection before it stops reading more requests from it.
+MAX_LINE = 1 << 20
+HIGH_WATER = 1 << 20
+ADJACENT_DIRECTIONS = ('up', 'down', 'left', 'right', 'back')
+
+
+class RequestError(Exception):
+    '''A request that gets an error reply.'''
+
+
+def _int(request, name, default=None):
+    value = request.get(name, default)
+    if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+        raise RequestError('{} must be a number'.format(name))
+    return value
+
+
+class CubeServer:
+    '''The sessions and the ops on them, plus the per tick batching.
+    handle() can be called directly without any sockets.'''
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.__next_session = 1
+        self.__pending = []         # (connection, request line) queued this tick
+        self.__scheduled = False
+        self.__ops = {'create': self.__create, 'close': self.__close,
+                      'scramble': self.__scramble, 'apply': self.__apply,
+                      'view': self.__view, 'adjacent': self.__adjacent,
+                      'matched': self.__matched}
+
+    def handle(self, request, owned=None):
+        '''Run one request dict, returns the reply dict. Sessions created are
+        added to the owned set if given.'''
+        reply = {'id': request.get('id') if isinstance(request, dict) else None}
+        try:
+            if not isinstance(request, dict):
+                raise RequestError('request must be a JSON object')
+            op = self.__ops.get(request.get('op'))
+            if op is None:
+                raise RequestError('unknown op {!r}'.format(request.get('op')))
+            reply.update(op(request, owned))
+            reply['ok'] = True
+        except RequestError as err:
+            reply['ok'] = False
+            reply['error'] = str(err)
+        except (TypeError, ValueError) as err:
+            reply['ok'] = False
+            reply['error'] = 'bad request: {}'.format(err)
+        return reply
+
+    def __cube(self, request, owned):
+        '''The cube of the request's session, which has to be one of owned
+        when the request came from a connection.'''
+        session = request.get('session')
+        cube = self.sessions.get(session) if isinstance(session, int) else None
+        if cube is None or (owned is not None and session not in owned):
+            raise RequestError('no session {!r}'.format(session))
+        return cube
+
+    def __create(self, request, owned):
+        if len(self.sessions) >= self.max_sessions:
+            raise RequestError('too many sessions')
+        size = _int(request, 'size', 3)
+        if not 2 <= size <= MAX_CUBE_SIZE:
+            raise RequestError('size must be 2 to {}'.format(MAX_CUBE_SIZE))
+        cube = RubiksCube(solved=bool(request.get('solved')), seed=_int(request, 'seed'),
+                          size=size)
+        session = self.__next_session
+        self.__next_session += 1
+        self.sessions[session] = cube
+        if owned is not None:
+            owned.add(session)
+        return {'session': session}
+
+    def __close(self, request, owned):
+        self.__cube(request, owned)
+        del self.sessions[request['session']]
+        if owned is not None:
+            owned.discard(request['session'])
+        return {}
+
+    def __scramble(self, request, owned):
+        cube = self.__cube(request, owned)
+        n_moves = _int(request, 'moves', 20)
+        if not 0 <= n_moves <= MAX_SCRAMBLE:
+            raise RequestError('moves must be 0 to {}'.format(MAX_SCRAMBLE))
+        moves = cube.scramble(n_moves, _int(request, 'seed'))
+        return {'moves': moves}
+
+    def __apply(self, request, owned):
+        cube = self.__cube(request, owned)
+        codes = _move_codes(request, cube_tables(cube.get_size()))
+        cube.apply_codes(codes)
+        side, top_left, _ = cube.get_view()
+        return {'moves': len(codes), 'solved': cube.check_matched(),
+                'side': side, 'top_left': top_left}
+
+    def __view(self, request, owned):
+        side, top_left, colors = self.__cube(request, owned).get_view()
+        return {'side': side, 'top_left': top_left, 'colors': colors}
+
+    def __adjacent(self, request, owned):
+        cube = self.__cube(request, owned)
+        direction = request.get('direction')
+        if direction not in ADJACENT_DIRECTIONS:
+            raise RequestError('direction must be one of {}'.format(
+                ', '.join(ADJACENT_DIRECTIONS)))
+        return {'colors': cube.get_adjacent(direction)}
+
+    def __matched(self, request, owned):
+        cube = self.__cube(request, owned)
+        return {'solved': cube.check_matched(), 'solved_faces': cube.solved_faces(),
+                'out_of_place': cube.out_of_place()}
+
+    async def serve(self, reader, writer):
+        '''Read one connection's request lines until it closes, then drop its sessions.'''
+        connection = (writer, set())
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    break       # line over MAX_LINE
+                if not line:
+                    break
+                self.__pending.append((connection, line))
+                if not self.__scheduled:
+                    self.__scheduled = True
+                    asyncio.get_running_loop().call_soon(self.__run_pending)
+                if writer.transport.get_write_buffer_size() > HIGH_WATER:
+                    await writer.drain()
+        except ConnectionError:
+            pass                # the client went away
+        finally:
+            for session in connection[1]:
+                self.sessions.pop(session, None)
+            writer.close()
+
+    def __run_pending(self):
+        '''Run every request queued this tick, one write() per connection.'''
+        pending = self.__pending
+        self.__pending = []
+        self.__scheduled = False
+        replies = {}
+        dumps = json.JSONEncoder(separators=(',', ':')).encode
+        for (writer, owned), line in pending:
+            # Whatever goes wrong with one request (RecursionError for deep
+            # nesting included), it must not lose the others' replies.
+            try:
+                request = json.loads(line)
+            except (ValueError, RecursionError):
+                reply = dumps({'id': None, 'ok': False, 'error': 'not JSON'})
+            else:
+                try:
+                    reply = dumps(self.handle(request, owned))
+                except Exception as err:
+                    reply = dumps({'id': None, 'ok': False,
+                                   'error': 'failed: {}'.format(type(err).__name__)})
+            replies.setdefault(writer, []).append(reply)
+        for writer, lines in replies.items():
+            if not writer.is_closing():
+                lines.append('')
+                writer.write('\n'.join(lines).encode())
+
+
+def _move_codes(request, tables):
+    '''The move codes of an apply request's codes or moves list, all checked
+    before any is made.'''
+    if 'codes' in request:
+        codes = request['codes']
+        if not isinstance(codes, list) or len(codes) > MAX_APPLY:
+            raise RequestError('codes must be a list of up to {} move codes'.format(MAX_APPLY))
+        count = len(tables.move_list)
+        for code in codes:
+            if not isinstance(code, int) or isinstance(code, bool) or not 0 <= code < count:
+                raise RequestError('move codes must be 0 to {}'.format(count - 1))
+        return bytes(codes)
+    moves = request.get('moves')
+    if not isinstance(moves, list) or len(moves) > MAX_APPLY:
+        raise RequestError('moves must be a list of up to {} [name, arguments...]'.format(
+            MAX_APPLY))
+    codes = bytearray()
+    for number, move in enumerate(moves):
+        code = None
+        if isinstance(move, list) and all(isinstance(part, str) or
+                                          (isinstance(part, int) and not isinstance(part, bool))
+                                          for part in move):
+            code = tables.move_codes.get(tuple(move))
+        if code is None:
+            raise RequestError('moves[{}] is not a move'.format(number))
+        codes.append(code)
+    return bytes(codes)
+
+
+async def start_server(server, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+    '''Listen on a Unix socket at path, or else TCP host:port (0 for any free port).'''
+    if path is not None:
+        return await asyncio.start_unix_server(server.serve, path, limit=MAX_LINE)
+    return await asyncio.start_server(server.serve, host, port, limit=MAX_LINE)
+
+
+async def _serve_forever(args):
+    listener = await start_server(CubeServer(args.max_sessions), args.host, args.port,
+                                  args.unix)
+    for sock in listener.sockets:
+        print('listening on {}'.format(sock.getsockname()), flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve RubiksCube sessions as line JSON.')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help='address to listen on (default {})'.format(DEFAULT_HOST))
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help='TCP port, 0 for any free one (default {})'.format(DEFAULT_PORT))
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead')
+    parser.add_argument('--max-sessions', type=int, default=MAX_SESSIONS,
+                        help='most sessions at once (default {})'.format(MAX_SESSIONS))
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
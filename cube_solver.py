@@ -0,0 +1,482 @@
+'''
+Cube Solver
+Author: John Kinder
+
+Requirements: NumPy
+
+Description: Two-phase (Kociemba style) solver for RubiksCube.
+The cubie layout (corners, edges and their orientations) is derived from
+the sticker permutations in rubiks_cube.py rather than typed in by hand.
+Phase 1 brings the cube into the subgroup <U, D, R2, L2, F2, B2> using
+twist / flip / slice coordinates, phase 2 solves it using only those moves.
+Both phases are IDA* searches guided by pruning tables that are built once
+and memory-mapped on later runs through table_cache.
+
+Externally available:
+- solve(cube, max_length) Returns a move list for RubiksCube.apply_moves().
+- solve_state(state, side, orientation, max_length) Same, from 54 color codes.
+- load_tables() / generate_tables() The cached and freshly built tables.
+'''
+
+from itertools import combinations, permutations
+
+import numpy as np
+
+import table_cache
+from rubiks_cube import ADJACENCY, PERMUTATIONS
+
+TABLE_VERSION = 1
+
+# Sides forming the phase 2 axis, and the sides used to orient middle layer edges.
+UD_SIDES = (4, 5)
+FB_SIDES = (0, 2)
+VIEW_MOVES = ('move_up', 'move_down', 'move_left', 'move_right')
+
+
+def _compose(first, second):
+    '''Sticker permutation for doing first, then second.'''
+    return tuple(first[i] for i in second)
+
+
+def _build_turns():
+    '''One quarter turn permutation per side, taken from the outer row / column
+    shifts. Returns {side: (quarter, half, inverse quarter)}.'''
+    turns = {}
+    for (_, _, _, index), perm in PERMUTATIONS.items():
+        if index == 1:
+            continue
+        side = next(s for s in range(6)
+                    if all(perm[s * 9 + c] != s * 9 + c for c in (0, 1, 2, 3, 5, 6, 7, 8)))
+        if side not in turns:
+            half = _compose(perm, perm)
+            turns[side] = (perm, half, _compose(half, perm))
+    return turns
+
+
+TURNS = _build_turns()
+# Face moves are (side, power) with power 1, 2 or 3 quarter turns.
+MOVES = tuple((side, power) for side in range(6) for power in (1, 2, 3))
+PHASE2_MOVES = tuple(i for i, (side, power) in enumerate(MOVES)
+                     if side in UD_SIDES or power == 2)
+OPPOSITE = {side: next(s for s in range(6) if s != side and s not in ADJACENCY[side][0])
+            for side in range(6)}
+
+
+def _build_cubies():
+    '''Group stickers into corner and edge positions by which face turns move them.
+    Corner slots start with the U / D sticker and run in a consistent cyclic order,
+    edge slots start with the U / D sticker, or the F / B one in the middle layer.'''
+    groups = {}
+    for i in range(54):
+        faces = frozenset(s for s, turn in TURNS.items() if turn[0][i] != i)
+        if len(faces) > 1:
+            groups.setdefault(faces, []).append(i)
+    corners = sorted(tuple(g) for g in groups.values() if len(g) == 3)
+    edges = sorted(tuple(g) for g in groups.values() if len(g) == 2)
+
+    def first(stickers, sides):
+        return sorted(stickers, key=lambda i: i // 9 not in sides)
+
+    edges = [tuple(first(e, UD_SIDES if any(i // 9 in UD_SIDES for i in e) else FB_SIDES))
+             for e in edges]
+    # Corners: fix the order of the first, then carry it to the rest through the
+    # turns, which never change the handedness of a corner.
+    orders = {0: tuple(first(corners[0], UD_SIDES))}
+    corner_of = {i: n for n, corner in enumerate(corners) for i in corner}
+    while len(orders) < len(corners):
+        for turn in TURNS.values():
+            for q, order in list(orders.items()):
+                sources = [turn[0][i] for i in order]
+                p = corner_of[sources[0]]
+                if p not in orders:
+                    k = next(k for k, i in enumerate(sources) if i // 9 in UD_SIDES)
+                    orders[p] = tuple(sources[k:] + sources[:k])
+    corners = [orders[n] for n in range(len(corners))]
+    return corners, edges
+
+
+CORNERS, EDGES = _build_cubies()
+UD_EDGES = tuple(n for n, e in enumerate(EDGES) if e[0] // 9 in UD_SIDES)
+SLICE_EDGES = tuple(n for n, e in enumerate(EDGES) if e[0] // 9 not in UD_SIDES)
+SLICE_COMBINATIONS = list(combinations(range(12), 4))
+SLICE_INDEX = {c: n for n, c in enumerate(SLICE_COMBINATIONS)}
+SOLVED_SLICE = SLICE_INDEX[SLICE_EDGES]
+
+
+def _cubie_move(positions, perm):
+    '''For a sticker permutation, returns (source position, orientation change)
+    for each target position.'''
+    position_of = {i: (n, slot) for n, stickers in enumerate(positions)
+                   for slot, i in enumerate(stickers)}
+    source = []
+    change = []
+    for stickers in positions:
+        p, _ = position_of[perm[stickers[0]]]
+        source.append(p)
+        # Slot of this position receiving the source's slot 0 sticker.
+        change.append(next(t for t, i in enumerate(stickers) if perm[i] == positions[p][0]))
+    return source, change
+
+
+def _build_cubie_moves():
+    corner_moves = []
+    edge_moves = []
+    for side, power in MOVES:
+        perm = TURNS[side][power - 1]
+        corner_moves.append(_cubie_move(CORNERS, perm))
+        edge_moves.append(_cubie_move(EDGES, perm))
+    return corner_moves, edge_moves
+
+
+CORNER_MOVES, EDGE_MOVES = _build_cubie_moves()
+
+
+def _apply(cubie, move):
+    '''Apply a face move index to a cubie state (cp, co, ep, eo) of lists.'''
+    cp, co, ep, eo = cubie
+    c_src, c_chg = CORNER_MOVES[move]
+    e_src, e_chg = EDGE_MOVES[move]
+    return ([cp[p] for p in c_src], [(co[p] + d) % 3 for p, d in zip(c_src, c_chg)],
+            [ep[p] for p in e_src], [eo[p] ^ d for p, d in zip(e_src, e_chg)])
+
+
+def _twist(co):
+    value = 0
+    for c in co[:7]:
+        value = value * 3 + c
+    return value
+
+
+def _flip(eo):
+    value = 0
+    for e in eo[:11]:
+        value = value * 2 + e
+    return value
+
+
+def _slice(ep):
+    return SLICE_INDEX[tuple(q for q, e in enumerate(ep) if e in SLICE_EDGES)]
+
+
+def _rank(perm):
+    '''Lexicographic rank of a permutation of 0 .. n-1.'''
+    value = 0
+    n = len(perm)
+    for i in range(n):
+        value = value * (n - i) + sum(1 for j in range(i + 1, n) if perm[j] < perm[i])
+    return value
+
+
+def _phase2_coords(cubie):
+    cp, _, ep, _ = cubie
+    return (_rank(cp), _rank([UD_EDGES.index(ep[q]) for q in UD_EDGES]),
+            _rank([SLICE_EDGES.index(ep[q]) for q in SLICE_EDGES]))
+
+
+def _rank_rows(perms):
+    '''Vectorized lexicographic rank of each row of an (N, n) permutation array.'''
+    n = perms.shape[1]
+    value = np.zeros(len(perms), dtype=np.int64)
+    for i in range(n):
+        value = value * (n - i) + (perms[:, i + 1:] < perms[:, i:i + 1]).sum(axis=1)
+    return value
+
+
+def _orientation_table(size, length, base, moves):
+    '''Move table for the twist (base 3) or flip (base 2) coordinate.'''
+    values = np.arange(size)
+    digits = np.zeros((size, length), dtype=np.int64)
+    for i in range(length - 2, -1, -1):
+        digits[:, i] = values % base
+        values //= base
+    # The last orientation makes the total a multiple of base.
+    digits[:, -1] = (-digits[:, :-1].sum(axis=1)) % base
+    table = np.zeros((size, len(moves)), dtype=np.int16)
+    weights = base ** np.arange(length - 2, -1, -1)
+    for m, (source, change) in enumerate(moves):
+        moved = (digits[:, source] + change) % base
+        table[:, m] = moved[:, :-1] @ weights
+    return table
+
+
+def _slice_table():
+    occupied = np.zeros((len(SLICE_COMBINATIONS), 12), dtype=bool)
+    for n, combination in enumerate(SLICE_COMBINATIONS):
+        occupied[n, list(combination)] = True
+    lookup = np.zeros(1 << 12, dtype=np.int16)
+    for n, combination in enumerate(SLICE_COMBINATIONS):
+        lookup[sum(1 << q for q in combination)] = n
+    table = np.zeros((len(SLICE_COMBINATIONS), len(MOVES)), dtype=np.int16)
+    bits = 1 << np.arange(12)
+    for m, (source, _) in enumerate(EDGE_MOVES):
+        table[:, m] = lookup[occupied[:, source] @ bits]
+    return table
+
+
+def _permutation_table(cubie_moves, positions):
+    '''Phase 2 move table for the permutation of the cubies at positions.'''
+    perms = np.array(list(permutations(range(len(positions)))), dtype=np.int8)
+    local = {q: n for n, q in enumerate(positions)}
+    table = np.zeros((len(perms), len(PHASE2_MOVES)), dtype=np.int32)
+    for column, m in enumerate(PHASE2_MOVES):
+        source, _ = cubie_moves[m]
+        table[:, column] = _rank_rows(perms[:, [local[source[q]] for q in positions]])
+    return table
+
+
+def _bfs(move_a, move_b, start):
+    '''Distance table over the combined index a * len(move_b) + b.'''
+    size_b = move_b.shape[0]
+    dist = np.full(move_a.shape[0] * size_b, -1, dtype=np.int8)
+    dist[start] = 0
+    frontier = np.array([start], dtype=np.int64)
+    depth = 0
+    while frontier.size:
+        a, b = np.divmod(frontier, size_b)
+        reached = (move_a[a].astype(np.int64) * size_b + move_b[b]).ravel()
+        reached = np.unique(reached[dist[reached] < 0])
+        depth += 1
+        dist[reached] = depth
+        frontier = reached
+    return dist
+
+
+def generate_tables():
+    '''Build every move and pruning table, yielding (name, array) pairs.'''
+    twist_move = _orientation_table(3 ** 7, 8, 3, CORNER_MOVES)
+    flip_move = _orientation_table(2 ** 11, 12, 2, EDGE_MOVES)
+    slice_move = _slice_table()
+    corner_move = _permutation_table(CORNER_MOVES, tuple(range(8)))
+    ud_edge_move = _permutation_table(EDGE_MOVES, UD_EDGES)
+    slice_edge_move = _permutation_table(EDGE_MOVES, SLICE_EDGES)
+    yield 'twist_move', twist_move
+    yield 'flip_move', flip_move
+    yield 'slice_move', slice_move
+    yield 'corner_move', corner_move
+    yield 'ud_edge_move', ud_edge_move
+    yield 'slice_edge_move', slice_edge_move
+    yield 'twist_slice_prune', _bfs(twist_move, slice_move, SOLVED_SLICE)
+    yield 'flip_slice_prune', _bfs(flip_move, slice_move, SOLVED_SLICE)
+    yield 'corner_prune', _bfs(corner_move, slice_edge_move, 0)
+    yield 'ud_edge_prune', _bfs(ud_edge_move, slice_edge_move, 0)
+
+
+_TABLES = None
+
+
+def load_tables():
+    '''Returns the solver tables, memory-mapped through table_cache.'''
+    global _TABLES
+    if _TABLES is None:
+        _TABLES = table_cache.load('solver', TABLE_VERSION, generate_tables)
+    return _TABLES
+
+
+# ALLOWED[last side][side]: skip turning the same face twice in a row, and fix
+# the order of opposite faces. Index 6 stands for "no move yet".
+ALLOWED = [[last == 6 or not (side == last or (side == OPPOSITE[last] and side < last))
+            for side in range(6)] for last in range(7)]
+# Longest phase 2 tried for each phase 1 solution. Deeper phase 2 searches cost far
+# more than trying the next phase 1 solution.
+PHASE2_LIMIT = 12
+
+
+class _Search:
+    '''One two-phase search. Move tables are copied to lists for fast lookups,
+    the pruning tables are read through memoryviews of the mapped files.'''
+    _lists = None
+
+    def __init__(self, tables, max_length):
+        if _Search._lists is None:
+            _Search._lists = {name: tables[name].tolist() for name in
+                              ('twist_move', 'flip_move', 'slice_move', 'corner_move',
+                               'ud_edge_move', 'slice_edge_move')}
+        lists = _Search._lists
+        self.twist_move = lists['twist_move']
+        self.flip_move = lists['flip_move']
+        self.slice_move = lists['slice_move']
+        self.corner_move = lists['corner_move']
+        self.ud_edge_move = lists['ud_edge_move']
+        self.slice_edge_move = lists['slice_edge_move']
+        self.twist_slice_prune = memoryview(tables['twist_slice_prune'])
+        self.flip_slice_prune = memoryview(tables['flip_slice_prune'])
+        self.corner_prune = memoryview(tables['corner_prune'])
+        self.ud_edge_prune = memoryview(tables['ud_edge_prune'])
+        self.max_length = max_length
+        self.path = []
+
+    def solve(self, cubie):
+        cp, co, ep, eo = cubie
+        twist, flip, slice_ = _twist(co), _flip(eo), _slice(ep)
+        start = max(self.twist_slice_prune[twist * 495 + slice_],
+                    self.flip_slice_prune[flip * 495 + slice_])
+        for depth in range(start, self.max_length + 1):
+            if self.phase1(cubie, twist, flip, slice_, depth, 6):
+                return self.path
+        return None
+
+    def phase1(self, cubie, twist, flip, slice_, depth, last):
+        if depth == 0:
+            # Phase 1 ending in a phase 2 move would repeat a shorter phase 1.
+            if self.path and self.path[-1] in PHASE2_MOVES:
+                return False
+            state = cubie
+            for move in self.path:
+                state = _apply(state, move)
+            corner, ud_edge, slice_edge = _phase2_coords(state)
+            limit = min(self.max_length - len(self.path), PHASE2_LIMIT)
+            start = max(self.corner_prune[corner * 24 + slice_edge],
+                        self.ud_edge_prune[ud_edge * 24 + slice_edge])
+            for depth2 in range(start, limit + 1):
+                if self.phase2(corner, ud_edge, slice_edge, depth2, last):
+                    return True
+            return False
+        allowed = ALLOWED[last]
+        twist_slice_prune = self.twist_slice_prune
+        flip_slice_prune = self.flip_slice_prune
+        twist_row = self.twist_move[twist]
+        flip_row = self.flip_move[flip]
+        slice_row = self.slice_move[slice_]
+        for move, (side, _) in enumerate(MOVES):
+            if not allowed[side]:
+                continue
+            new_twist = twist_row[move]
+            new_flip = flip_row[move]
+            new_slice = slice_row[move]
+            if (twist_slice_prune[new_twist * 495 + new_slice] >= depth
+                    or flip_slice_prune[new_flip * 495 + new_slice] >= depth):
+                continue
+            self.path.append(move)
+            if self.phase1(cubie, new_twist, new_flip, new_slice, depth - 1, side):
+                return True
+            self.path.pop()
+        return False
+
+    def phase2(self, corner, ud_edge, slice_edge, depth, last):
+        if depth == 0:
+            return corner == 0 and ud_edge == 0 and slice_edge == 0
+        allowed = ALLOWED[last]
+        corner_prune = self.corner_prune
+        ud_edge_prune = self.ud_edge_prune
+        corner_row = self.corner_move[corner]
+        ud_edge_row = self.ud_edge_move[ud_edge]
+        slice_edge_row = self.slice_edge_move[slice_edge]
+        for column, move in enumerate(PHASE2_MOVES):
+            side = MOVES[move][0]
+            if not allowed[side]:
+                continue
+            new_corner = corner_row[column]
+            new_slice_edge = slice_edge_row[column]
+            if corner_prune[new_corner * 24 + new_slice_edge] >= depth:
+                continue
+            new_ud_edge = ud_edge_row[column]
+            if ud_edge_prune[new_ud_edge * 24 + new_slice_edge] >= depth:
+                continue
+            self.path.append(move)
+            if self.phase2(new_corner, new_ud_edge, new_slice_edge, depth - 1, side):
+                return True
+            self.path.pop()
+        return False
+
+
+def _cubie_state(state):
+    '''Corner and edge permutation / orientation of 54 color codes, relative to
+    the current centers. Raises ValueError for an impossible sticker pattern.'''
+    centers = [state[side * 9 + 4] for side in range(6)]
+    if sorted(centers) != list(range(6)):
+        raise ValueError('centers must show six different colors')
+    side_of = {color: side for side, color in enumerate(centers)}
+    colors = [side_of[color] for color in state]
+
+    def locate(positions, reference):
+        home = {frozenset(i // 9 for i in stickers): n for n, stickers in enumerate(positions)}
+        perm = []
+        orientation = []
+        for stickers in positions:
+            found = [colors[i] for i in stickers]
+            if frozenset(found) not in home:
+                raise ValueError('no such cubie: {}'.format(found))
+            perm.append(home[frozenset(found)])
+            orientation.append(next(k for k, c in enumerate(found) if c in reference(found)))
+        if sorted(perm) != list(range(len(positions))):
+            raise ValueError('cubies appear more than once')
+        return perm, orientation
+
+    cp, co = locate(CORNERS, lambda found: UD_SIDES)
+    ep, eo = locate(EDGES, lambda found: UD_SIDES if set(found) & set(UD_SIDES) else FB_SIDES)
+    if sum(co) % 3 or sum(eo) % 2 or (_parity(cp) != _parity(ep)):
+        raise ValueError('state cannot be reached by turning the cube')
+    return cp, co, ep, eo
+
+
+def _parity(perm):
+    return sum(1 for i in range(len(perm)) for j in range(i + 1, len(perm))
+               if perm[j] < perm[i]) % 2
+
+
+def _view_after(side, orientation, name):
+    new_side = ADJACENCY[side][orientation][name[5:]]
+    return new_side, ADJACENCY[side][orientation][new_side]
+
+
+def _view_shifts():
+    '''{(side, top_left): {quarter turn permutation: shift}} for outer rows / columns.'''
+    shifts = {}
+    for (side, top_left, direction, index), perm in PERMUTATIONS.items():
+        if index != 1:
+            method = 'shift_h' if direction in ('left', 'right') else 'shift_v'
+            shifts.setdefault((side, top_left), {})[perm] = (method, direction, index)
+    return shifts
+
+
+VIEW_SHIFTS = _view_shifts()
+
+
+def _view_path(start, goal):
+    '''Shortest list of view moves from one (side, top_left) to another.'''
+    paths = {start: []}
+    queue = [start]
+    for view in queue:
+        if view == goal:
+            return paths[view]
+        for name in VIEW_MOVES:
+            after = _view_after(view[0], view[1], name)
+            if after not in paths:
+                paths[after] = paths[view] + [(name,)]
+                queue.append(after)
+    return None
+
+
+def to_shifts(moves, side, orientation):
+    '''Translate face moves into shift_h / shift_v calls made from the view
+    side / orientation. Faces that cannot be reached from the view (the front and
+    back) get a view move first, and the view is put back at the end.'''
+    result = []
+    view = (side, orientation)
+    for move in moves:
+        face, power = MOVES[move]
+        turn = TURNS[face][0] if power != 3 else TURNS[face][2]
+        if turn not in VIEW_SHIFTS[view]:
+            name = next(n for n in VIEW_MOVES
+                        if turn in VIEW_SHIFTS[_view_after(view[0], view[1], n)])
+            result.append((name,))
+            view = _view_after(view[0], view[1], name)
+        result.extend([VIEW_SHIFTS[view][turn]] * (2 if power == 2 else 1))
+    result.extend(_view_path(view, (side, orientation)))
+    return result
+
+
+def solve_state(state, side=0, orientation=0, max_length=30):
+    '''Returns a move list that solves the 54 color codes when applied from the
+    view side / orientation, or None if nothing within max_length face turns.'''
+    cubie = _cubie_state(state)
+    moves = _Search(load_tables(), max_length).solve(cubie)
+    if moves is None:
+        return None
+    return to_shifts(moves, side, orientation)
+
+
+def solve(cube, max_length=30):
+    '''Returns a move list that solves cube, for RubiksCube.apply_moves().'''
+    side, orientation, _ = cube.get_view()
+    return solve_state(cube.get_state(), side, orientation, max_length)
@@ -0,0 +1,134 @@
+'''
+cube_trace.py
+
+Author: John Kinder
+Description: Debug tracing for RubiksCube and RCGame.
+A Tracer keeps the last capacity events in a ring buffer and hands each one
+to an optional sink as it happens. Events are dicts, ready for json.dumps:
+- move        a shift_*, move_*, undo, redo or scramble call: method, args,
+              the view before it (side, top_left) and ms taken.
+- side_shift  an outer row / column shift also turning a side: side and
+              direction ('left' or 'right', as in RIGHT_SHIFT / LEFT_SHIFT).
+- render      one RCGame.draw_display frame: rects updated (or 'all') and ms.
+- gesture     RCGame mouse drags and the shift they came to.
+Every event also has event (its name) and t (seconds since the tracer started).
+
+The hooks are installed by replacing methods, RubiksCube.set_tracer() and
+Tracer.traced_render(), so nothing is checked or timed without a tracer.
+
+Externally available:
+- Tracer(capacity, sink) emit(), events, dump(path).
+- print_sink(record) One readable line per event on stdout (RCGame debug).
+- JsonlSink(path) Writes one JSON object per event to a file.
+'''
+
+import json
+import time
+from collections import deque
+from functools import lru_cache
+
+from rubiks_cube import cube_tables
+
+
+@lru_cache(maxsize=None)
+def side_shifts(side, top_left, direction, index, size=3):
+    '''The (side, 'left' / 'right') turned along with a row / column shift.'''
+    tables = cube_tables(size)
+    perm = tables.permutations[(side, top_left, direction, index)]
+    turned = []
+    for turned_side in range(6):
+        base = turned_side * tables.cells
+        for name, shift in (('left', tables.left_shift), ('right', tables.right_shift)):
+            if all(perm[base + to_cell] == base + from_cell for from_cell, to_cell in shift):
+                turned.append((turned_side, name))
+    return tuple(turned)
+
+
+def print_sink(record):
+    '''Print an event as one line: name, fields and time taken.'''
+    fields = ' '.join('{}={}'.format(key, value) for key, value in record.items()
+                      if key not in ('event', 't', 'ms'))
+    if 'ms' in record:
+        print('{:10s} {} ({:.3f} ms)'.format(record['event'], fields, record['ms']))
+    else:
+        print('{:10s} {}'.format(record['event'], fields))
+
+
+class JsonlSink:
+    '''Writes each event as a line of JSON to path.'''
+    def __init__(self, path):
+        self.path = path
+        self.__file = open(path, 'a')
+
+    def __call__(self, record):
+        self.__file.write(json.dumps(record))
+        self.__file.write('\n')
+
+    def flush(self):
+        self.__file.flush()
+
+    def close(self):
+        self.__file.close()
+
+
+class Tracer:
+    '''Ring buffer of the last capacity events, each also passed to sink.'''
+    def __init__(self, capacity=4096, sink=None):
+        self.events = deque(maxlen=capacity)
+        self.sink = sink
+        self.__start = time.perf_counter()
+
+    def emit(self, event, **fields):
+        '''Record an event, returns its dict.'''
+        record = {'event': event, 't': round(time.perf_counter() - self.__start, 6)}
+        record.update(fields)
+        self.events.append(record)
+        if self.sink is not None:
+            self.sink(record)
+        return record
+
+    def dump(self, path):
+        '''Write the events in the ring buffer to path as JSON Lines.'''
+        with open(path, 'w') as out:
+            for record in self.events:
+                out.write(json.dumps(record))
+                out.write('\n')
+
+    def traced_move(self, method, name, view, size=3):
+        '''Wrap a RubiksCube method. view() returns the (side, top_left) in view,
+        size is the cube's.'''
+        perf_counter = time.perf_counter
+        shift = name.startswith('shift')
+        permutations = cube_tables(size).permutations
+
+        def traced(*args, **kwargs):
+            side, top_left = view()
+            start = perf_counter()
+            result = method(*args, **kwargs)
+            elapsed = perf_counter() - start
+            fields = {'method': name, 'side': side, 'top_left': top_left}
+            if name == 'scramble':
+                fields['moves'] = len(result)
+            elif args:
+                fields['args'] = list(args)
+            elif name in ('undo', 'redo'):
+                fields['move'] = list(result) if result else None
+            self.emit('move', ms=round(elapsed * 1000, 4), **fields)
+            if shift and (side, top_left) + tuple(args) in permutations:
+                for turned_side, direction in side_shifts(side, top_left, *args, size=size):
+                    self.emit('side_shift', side=turned_side, direction=direction)
+            return result
+        return traced
+
+    def traced_render(self, draw):
+        '''Wrap a draw function returning the rects it updated (None for all).'''
+        perf_counter = time.perf_counter
+
+        def traced(*args, **kwargs):
+            start = perf_counter()
+            rects = draw(*args, **kwargs)
+            elapsed = perf_counter() - start
+            self.emit('render', rects='all' if rects is None else len(rects),
+                      ms=round(elapsed * 1000, 4))
+            return rects
+        return traced
@@ -0,0 +1,148 @@
+'''
+move_log.py
+
+Author: John Kinder
+Description: Streaming file format for long move sequences, one byte per move.
+A log file is:
+- 8 byte magic 'RCMOVES', a version byte and the starting cube as
+  RubiksCube.to_bytes() (STATE_BYTES bytes for a 3 x 3 x 3,
+  state_bytes(size) for the others).
+- One move code per byte (see rubiks_cube.MOVE_LIST, or the move_list of
+  cube_tables(size)) up to the end of the file.
+The move count is just the file size less the header, so appends never
+rewrite anything. Readers memory-map the file, so multi-gigabyte logs can be
+replayed without loading them.
+
+Externally available:
+- MoveWriter(path, cube=None) Appends moves, creating the file from cube.
+- MoveReader(path) Memory-mapped reader: len(), codes(), moves(), replay().
+'''
+
+import mmap
+import os
+
+from rubiks_cube import SIZED_FORMAT, RubiksCube, cube_tables, state_bytes
+
+MAGIC = b'RCMOVES\0'
+VERSION = 1
+# Largest cube whose 4 * size + 4 move codes fit in a byte.
+MAX_SIZE = 63
+# Codes replayed per slice of the mapped file.
+REPLAY_CHUNK = 1 << 20
+
+
+def _read_header(source, path):
+    '''Reads the header from the start of source (a file or a map of one).
+    Returns the CubeTables of the cube size and the starting cube as to_bytes().'''
+    header = source.read(len(MAGIC) + 3)
+    if len(header) < len(MAGIC) + 3 or header[:len(MAGIC)] != MAGIC:
+        raise ValueError('{} is not a move log'.format(path))
+    if header[len(MAGIC)] != VERSION:
+        raise ValueError('{} is move log version {}, expected {}'.format(
+            path, header[len(MAGIC)], VERSION))
+    state_format, size = header[len(MAGIC) + 1:]
+    if state_format != SIZED_FORMAT:
+        size = 3
+    if size > MAX_SIZE:
+        raise ValueError('{} is not a move log'.format(path))
+    state = header[len(MAGIC) + 1:] + source.read(state_bytes(size) - 2)
+    try:
+        RubiksCube.from_bytes(state)
+    except ValueError:
+        raise ValueError('{} is not a move log'.format(path)) from None
+    return cube_tables(size), state
+
+
+class MoveWriter:
+    '''Appends moves to a log. A new file needs the starting cube.'''
+    def __init__(self, path, cube=None):
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            if cube is None:
+                raise ValueError('a new move log needs the starting cube')
+            if cube.get_size() > MAX_SIZE:
+                raise ValueError('move logs are for cubes up to {0} x {0} x {0}'.format(MAX_SIZE))
+            self.__tables = cube_tables(cube.get_size())
+            with open(path, 'wb') as out:
+                out.write(MAGIC + bytes((VERSION,)) + cube.to_bytes())
+        else:
+            with open(path, 'rb') as source:
+                self.__tables = _read_header(source, path)[0]
+        self.__file = open(path, 'ab')
+
+    def append(self, moves):
+        '''Append moves, given as move tuples like ('shift_h', 'left', 0) or as
+        move codes (an iterable of ints, bytes or a bytearray).'''
+        if isinstance(moves, (bytes, bytearray, memoryview)):
+            data = moves
+        else:
+            move_codes = self.__tables.move_codes
+            data = bytes(move if isinstance(move, int) else move_codes[tuple(move)]
+                         for move in moves)
+        if data and max(data) >= len(self.__tables.move_list):
+            raise ValueError('unknown move code {}'.format(max(data)))
+        self.__file.write(data)
+
+    def flush(self):
+        self.__file.flush()
+
+    def close(self):
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MoveReader:
+    '''Reads a log through a memory map of the file.'''
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as source:
+            self.__map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__tables, self.__start = _read_header(self.__map, path)
+        self.__header_size = len(MAGIC) + 1 + len(self.__start)
+
+    def __len__(self):
+        return len(self.__map) - self.__header_size
+
+    def start_cube(self, debug=False):
+        '''A new cube in the state the log starts from.'''
+        return RubiksCube.from_bytes(self.__start, debug)
+
+    def codes(self, start=0, stop=None):
+        '''Zero-copy memoryview of the move codes start .. stop - 1.'''
+        stop = len(self) if stop is None else min(stop, len(self))
+        header_size = self.__header_size
+        return memoryview(self.__map)[header_size + start:header_size + stop]
+
+    def moves(self, start=0, stop=None):
+        '''Yields the moves as tuples like ('shift_h', 'left', 0).'''
+        move_list = self.__tables.move_list
+        stop = len(self) if stop is None else min(stop, len(self))
+        for chunk_start in range(start, stop, REPLAY_CHUNK):
+            with self.codes(chunk_start, min(chunk_start + REPLAY_CHUNK, stop)) as codes:
+                for code in codes:
+                    yield move_list[code]
+
+    def replay(self, cube=None, start=0, stop=None):
+        '''Make moves start .. stop - 1 on cube (by default the starting cube,
+        in which case start should be 0). Returns the cube.'''
+        if cube is None:
+            cube = self.start_cube()
+        stop = len(self) if stop is None else min(stop, len(self))
+        for chunk_start in range(start, stop, REPLAY_CHUNK):
+            with self.codes(chunk_start, min(chunk_start + REPLAY_CHUNK, stop)) as codes:
+                cube.apply_codes(codes)
+        return cube
+
+    def close(self):
+        self.__map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
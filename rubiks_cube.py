@@ -2,11 +2,15 @@
 Rubiks Cube
 Author: John Kinder
 
-Requirements: PyGame
+Requirements: None (pygame is only needed by RCGame.py).
 
 Description: A Computer version of Rubik's Cube.
-Creates an instance with the colored squares for each 3 x 3 side.
-Shuffles the rows / columns prior to initial view being presented.
+Creates an instance with the colored squares for each 3 x 3 side, or
+size x size with RubiksCube(size=N). The tables for each size (views,
+adjacency, side turns and every shift) are generated once by cube_tables(),
+the shifts of each view when a cube first looks from it.
+Shuffles the rows / columns prior to initial view being presented,
+unless created with solved=True. Pass seed to make the shuffle repeatable.
 Externally available methods:
 To move the current view:
 - move_right()
@@ -15,335 +19,918 @@ To move the current view:
 - move_down()
 
 To shift cells:
-- shift_h(direction['left','right'], row[0,1,2])
-- shift_v(direction['up','down'], column[0,1,2])
+- shift_h(direction['left','right'], row[0 .. size - 1])
+- shift_v(direction['up','down'], column[0 .. size - 1])
+- scramble(n_moves, seed, rng) Random shifts, returns the moves made.
+
+History (shift_h, shift_v and move_* calls, up to history_depth of them):
+- undo() / redo() Returns the move undone / redone, or None.
+- get_history() / clear_history()
+
+Debugging (see cube_trace):
+- set_tracer(tracer) / get_tracer() Send move events to a Tracer, None to stop.
 
 Viewing:
 - get_adjacent(['up','down','left','right','back'])
-    Returns 3x3 list of colors for the side given.
+    Returns size x size tuples of colors for the side given, cached until it changes.
 - check_matched: Returns True if all sides colors match. False otherwise.
+- solved_faces() / out_of_place() / color_counts(side) Progress measures,
+    recounted only for the sides a shift changed, when next asked for.
+
+State:
+- get_state() Returns the 54 stickers as bytes of color codes (see COLORS).
+- get_size() Returns the rows / columns per side.
+- copy() Returns an independent cube with the same stickers and view.
+- state_key(symmetry) / same_state(other, symmetry) Compare stickers, ignoring the view.
+- to_bytes() / RubiksCube.from_bytes(data) Stickers and view in STATE_BYTES bytes
+    (3 x 3 x 3), or SIZED_FORMAT with the size for the others, state_bytes(size) in all.
+- apply_codes(codes) Makes moves given as one byte move codes (see MOVE_LIST).
+- set_state(state) Replaces the 54 stickers.
+- RubiksCube.from_state(state, side, orientation) Builds a cube without shuffling.
+
+Solving (needs NumPy, 3 x 3 x 3 only, as are state_key and symmetry):
+- solve() Returns a list of moves such as ('shift_h', 'left', 0) or ('move_up',).
+- apply_moves(moves) Makes each move in a list like the one solve() returns.
 '''
 
-from collections import defaultdict
+from math import isqrt
+from operator import itemgetter
+
+# Color codes used for the compact sticker state. Side N starts out
+# filled with COLORS[N], so a solved cube has code N on every cell of side N.
+COLORS = ('red', 'blue', 'green', 'yellow', 'white', 'orange')
+COLOR_CODES = {color: code for code, color in enumerate(COLORS)}
+SOLVED_STATE = bytes(side for side in range(6) for _ in range(9))
+
+# There are 4 possible top left positions of a Rubiks Cube.
+# Each size x size side cell is labeled 0 through size * size - 1, so the 4
+# corners are 0, size - 1, size * (size - 1) and size * size - 1
+# (0, 2, 6 and 8 on a 3 x 3).
+# The view of a side for each top left is a tuple of rows holding the cell
+# offset (row * size + col) shown at each place.
+def _corners(size):
+    return (0, size - 1, size * (size - 1), size * size - 1)
+
+
+def _views(size):
+    '''{top_left: rows of cell offsets} for a size x size side.'''
+    last = size - 1
+    top_left, top_right, bottom_left, bottom_right = _corners(size)
+    return {
+        top_left: tuple(tuple(row * size + col for col in range(size)) for row in range(size)),
+        top_right: tuple(tuple(col * size + last - row for col in range(size))
+                         for row in range(size)),
+        bottom_left: tuple(tuple((last - col) * size + row for col in range(size))
+                           for row in range(size)),
+        bottom_right: tuple(tuple((last - row) * size + last - col for col in range(size))
+                            for row in range(size)),
+    }
+
+
+def _turn(size, direction):
+    '''Cell offsets moved by a quarter turn of an outer side, as
+    (from_cell, to_cell) pairs: 'right' is clockwise, 'left' counter clockwise.'''
+    last = size - 1
+    pairs = []
+    for row in range(size):
+        for col in range(size):
+            if direction == 'right':
+                to_row, to_col = col, last - row
+            else:
+                to_row, to_col = last - col, row
+            if (to_row, to_col) != (row, col):
+                pairs.append((row * size + col, to_row * size + to_col))
+    return tuple(pairs)
+
+
+# How each side (0 - 5) relates to those adjacent to it and what the
+# top left cell would be if you move to one of the available adjacent sides.
+# ADJACENCY[side][top_left] maps 'left', 'right', 'up', 'down' to the
+# adjacent side, and an adjacent side number to its top left.
+# This is written with the 3 x 3 corner labels (0, 2, 6, 8); CubeTables
+# relabels the corners for the other sizes, the sides connect the same way.
+ADJACENCY = {
+    0: {0: {1: 0, 3: 0, 4: 0, 5: 0, 'left': 3, 'right': 1, 'up': 4, 'down': 5},
+        2: {1: 2, 3: 2, 4: 2, 5: 2, 'left': 4, 'right': 5, 'up': 1, 'down': 3},
+        6: {1: 6, 3: 6, 4: 6, 5: 6, 'left': 5, 'right': 4, 'up': 3, 'down': 1},
+        8: {1: 8, 3: 8, 4: 8, 5: 8, 'left': 1, 'right': 3, 'up': 5, 'down': 4}},
+    1: {0: {0: 0, 2: 0, 4: 6, 5: 2, 'left': 0, 'right': 2, 'up': 4, 'down': 5},
+        2: {0: 2, 2: 2, 4: 0, 5: 8, 'left': 4, 'right': 5, 'up': 2, 'down': 0},
+        6: {0: 6, 2: 6, 4: 8, 5: 0, 'left': 5, 'right': 4, 'up': 0, 'down': 2},
+        8: {0: 8, 2: 8, 4: 2, 5: 6, 'left': 2, 'right': 0, 'up': 5, 'down': 4}},
+    2: {0: {1: 0, 3: 0, 4: 8, 5: 8, 'left': 1, 'right': 3, 'up': 4, 'down': 5},
+        2: {1: 2, 3: 2, 4: 6, 5: 6, 'left': 4, 'right': 5, 'up': 3, 'down': 1},
+        6: {1: 6, 3: 6, 4: 2, 5: 2, 'left': 5, 'right': 4, 'up': 1, 'down': 3},
+        8: {1: 8, 3: 8, 4: 0, 5: 0, 'left': 3, 'right': 1, 'up': 5, 'down': 4}},
+    3: {0: {0: 0, 2: 0, 4: 2, 5: 6, 'left': 2, 'right': 0, 'up': 4, 'down': 5},
+        2: {0: 2, 2: 2, 4: 8, 5: 0, 'left': 4, 'right': 5, 'up': 0, 'down': 2},
+        6: {0: 6, 2: 6, 4: 0, 5: 8, 'left': 5, 'right': 4, 'up': 2, 'down': 0},
+        8: {0: 8, 2: 8, 4: 6, 5: 2, 'left': 0, 'right': 2, 'up': 5, 'down': 4}},
+    4: {0: {0: 0, 1: 2, 2: 8, 3: 6, 'left': 3, 'right': 1, 'up': 2, 'down': 0},
+        2: {0: 2, 1: 8, 2: 6, 3: 0, 'left': 2, 'right': 0, 'up': 1, 'down': 3},
+        6: {0: 6, 1: 0, 2: 2, 3: 8, 'left': 0, 'right': 2, 'up': 3, 'down': 1},
+        8: {0: 8, 1: 6, 2: 0, 3: 2, 'left': 1, 'right': 3, 'up': 0, 'down': 2}},
+    5: {0: {0: 0, 1: 6, 2: 8, 3: 2, 'left': 3, 'right': 1, 'up': 0, 'down': 2},
+        2: {0: 2, 1: 0, 2: 6, 3: 8, 'left': 0, 'right': 2, 'up': 1, 'down': 3},
+        6: {0: 6, 1: 8, 2: 2, 3: 0, 'left': 2, 'right': 0, 'up': 3, 'down': 1},
+        8: {0: 8, 1: 2, 2: 0, 3: 6, 'left': 1, 'right': 3, 'up': 2, 'down': 0}},
+}
+
+
+# Smallest size whose shifts write only the lines of stickers they move.
+# Smaller cubes copy all their stickers in one gather, which is quicker
+# than writing their few short lines one by one.
+LINE_STEP_SIZE = 4
+
+
+class CubeTables:
+    '''Every table a cube of one size needs, generated from ADJACENCY, the
+    views and the side turns. Get them through cube_tables(size).
+    - size, cells (per side), stickers, solved_state, top_lefts
+    - views[top_left], adjacency[side][top_left], right_shift / left_shift
+    - permutations / gathers[(side, top_left, direction, index)] for every
+      row / column shift: new_state = gathers[key](state)
+    - steps[key], what a cube needs to make the shift in one lookup:
+      (target slices, gather, view mask, move code). The targets
+      and gather only cover the stickers it moves, the size stickers of the
+      row / column on each of 4 sides and the rows of a side turned by an
+      outer row / column, and apply_step() writes them in place. Below
+      LINE_STEP_SIZE the targets are None and gather is the one of every
+      sticker, which is quicker than a few short lines.
+    - view_masks[key], the sides a shift moves stickers on, for the match
+      check, the color counts and the cached faces
+    - view_after / adjacent_views[(side, top_left, direction)]
+    - move_list, move_codes, inverse_codes, scramble_rows, scramble_columns
+    The shift tables are filled a view at a time, by need_view(side, top_left)
+    when a cube first looks from it, or for all views by complete().'''
+    def __init__(self, size):
+        if size < 2:
+            raise ValueError('a cube needs at least 2 x 2 sides, not {}'.format(size))
+        self.size = size
+        self.cells = cells = size * size
+        self.indexes = range(size)
+        self.stickers = 6 * cells
+        self.solved_state = bytes(side for side in range(6) for _ in range(cells))
+        self.top_lefts = _corners(size)
+        self.views = _views(size)
+        self.right_shift = _turn(size, 'right')
+        self.left_shift = _turn(size, 'left')
+        relabel = dict(zip((0, 2, 6, 8), self.top_lefts))
+        self.adjacency = {
+            side: {relabel[top_left]: {key: relabel[value] if isinstance(key, int) else value
+                                       for key, value in links.items()}
+                   for top_left, links in views.items()}
+            for side, views in ADJACENCY.items()}
+        self.view_after = {}
+        self.adjacent_views = {}
+        for side in range(6):
+            for top_left in self.top_lefts:
+                for direction in ('up', 'down', 'left', 'right'):
+                    self.view_after[(side, top_left, direction)] = \
+                        self.__adjacent_view(side, top_left, direction)
+                for direction in ('up', 'down', 'left', 'right', 'back'):
+                    self.adjacent_views[(side, top_left, direction)] = \
+                        self.__adjacent_view(side, top_left, direction)
+
+        self.permutations = {}
+        self.gathers = {}
+        self.steps = {}
+        self.view_masks = {}
+        self.built_views = set()
+        self.__complete = False
+
+        # Every move the history records, by move code, and the code undoing each one.
+        self.scramble_rows = tuple(('shift_h', direction, row)
+                                   for direction in ('left', 'right') for row in range(size))
+        self.scramble_columns = tuple(('shift_v', direction, col)
+                                      for direction in ('up', 'down') for col in range(size))
+        self.move_list = self.scramble_rows + self.scramble_columns + (
+            ('move_up',), ('move_down',), ('move_left',), ('move_right',))
+        self.move_codes = {move: code for code, move in enumerate(self.move_list)}
+        self.inverse_codes = bytes(self.move_codes[_inverse(move)] for move in self.move_list)
+
+    def need_view(self, side, top_left):
+        '''Compile every row / column shift made looking at side with top_left,
+        if not done yet. A move then only copies the stickers it moves, a
+        line at a time: 4 * size of them, plus size * size for a turned side.'''
+        if (side, top_left) in self.built_views:
+            return
+        self.built_views.add((side, top_left))
+        cells = self.cells
+        size = self.size
+        for direction in ('left', 'right', 'up', 'down'):
+            for index in self.indexes:
+                key = (side, top_left, direction, index)
+                perm = self.__build_shift(side, top_left, direction, index)
+                self.permutations[key] = perm
+                self.gathers[key] = itemgetter(*perm)
+                # Bit mask of every side with a sticker moved, which also has
+                # the side an outer row / column shift turns.
+                self.view_masks[key] = views = sum(
+                    1 << turned for turned in range(6)
+                    if perm[turned * cells:(turned + 1) * cells] !=
+                    tuple(range(turned * cells, (turned + 1) * cells)))
+                shift = 'shift_h' if direction in ('left', 'right') else 'shift_v'
+                if size < LINE_STEP_SIZE:
+                    moved = (None, self.gathers[key])
+                else:
+                    moved = self.__moved(perm)
+                self.steps[key] = moved + (views, self.move_codes[(shift, direction, index)])
+
+    def __moved(self, perm):
+        '''(target slices, gather) of the stickers perm moves. The targets are
+        the row / column line on each side it passes, or each row of a turned
+        side; gather reads the line of sources for all of them at once.'''
+        cells = self.cells
+        size = self.size
+        targets = []
+        sources = []
+        for side in range(6):
+            base = side * cells
+            moved = [target for target in range(base, base + cells) if perm[target] != target]
+            if not moved:
+                continue
+            if _line(moved) and _line([perm[target] for target in moved]):
+                lines = [moved]
+            else:
+                lines = [range(start, start + size) for start in range(base, base + cells, size)]
+            for line in lines:
+                targets.append(_line(line))
+                sources.append(_line([perm[target] for target in line]))
+        return tuple(targets), itemgetter(*sources)
+
+    def complete(self):
+        '''Compile the shifts of every view, keyed in side, top left, direction,
+        index order. Returns self.'''
+        if not self.__complete:
+            self.__complete = True
+            for side in range(6):
+                for top_left in self.top_lefts:
+                    self.need_view(side, top_left)
+            order = sorted(self.permutations, key=lambda key: (
+                key[0], self.top_lefts.index(key[1]),
+                ('left', 'right', 'up', 'down').index(key[2]), key[3]))
+            for name in ('permutations', 'gathers', 'steps', 'view_masks'):
+                table = getattr(self, name)
+                setattr(self, name, {key: table[key] for key in order})
+        return self
+
+    def __adjacent_view(self, side, top_left, direction):
+        '''The (side, top left) seen looking up, down, left, right or to the back.'''
+        adjacency = self.adjacency
+        if direction == 'back':
+            right = adjacency[side][top_left]['right']
+            side, top_left = right, adjacency[side][top_left][right]
+            direction = 'right'
+        adjacent_side = adjacency[side][top_left][direction]
+        return adjacent_side, adjacency[side][top_left][adjacent_side]
 
-class RubiksCube:
-    '''Class for the game.'''
-    def __init__(self, debug=False):
-        '''Do all initializations and set the current view to side 0'''
-        self.__DEBUG = debug
-        self.__side = 0
-        self.__orientation = 0
-        self.__views = defaultdict(list)
-        self.__build_views()
-        self.__sides = defaultdict(dict)
-        for i in range(6):
-            self.__build_side(i)
-        self.__fill_squares()
-        self.__shuffle()
-
-    def __fill_squares(self):
-        '''Used by __init__ to populate each side with a color.
-        They are shuffled in another method.'''
-        for side, color in ((0, 'red'), (1, 'blue'), (2, 'green'), (3, 'yellow'),
-                            (4, 'white'), (5, 'orange')):
-            for row in range(3):
-                for col in range(3):
-                    self.__sides[side][(row, col)] = color
-
-    def __build_views(self):
-        '''There are 4 possible top left positions of a Rubiks Cube.
-        Each 3 x 3 side cell is labeled 0 through 8, so the 4 corners are:
-        0, 2, 6, and 8.
-        Each of the 3 x 3 arrays per side contain a tuple that relates
-        to the [row][column] position of the side in view depending on
-        top left.
-        Also builds shift_left and shift_right lists to re-position colors for
-        adjacent sides.'''
-        self.__views[0] = [[(0, 0), (0, 1), (0, 2)], [(1, 0), (1, 1), (1, 2)], [(2, 0), (2, 1), (2, 2)]]
-        self.__views[2] = [[(0, 2), (1, 2), (2, 2)], [(0, 1), (1, 1), (2, 1)], [(0, 0), (1, 0), (2, 0)]]
-        self.__views[6] = [[(2, 0), (1, 0), (0, 0)], [(2, 1), (1, 1), (0, 1)], [(2, 2), (1, 2), (0, 2)]]
-        self.__views[8] = [[(2, 2), (2, 1), (2, 0)], [(1, 2), (1, 1), (1, 0)], [(0, 2), (0, 1), (0, 0)]]
-
-    def __build_side(self, side):
-        '''Used by __init__ to set up how each side (0 - 5) relates to
-        those adjacent to it and what the top left cell would be
-        if you move to one of the available adjacent sides.'''
-        if side == 0:
-            self.__sides[side][0] = {1: 0, 3: 0, 4: 0, 5: 0,
-                                     'left': 3, 'right': 1, 'up': 4, 'down': 5}
-            self.__sides[side][2] = {1: 2, 3: 2, 4: 2, 5: 2,
-                                     'left': 4, 'right': 5, 'up': 1, 'down': 3}
-            self.__sides[side][6] = {1: 6, 3: 6, 4: 6, 5: 6,
-                                     'left': 5, 'right': 4, 'up': 3, 'down': 1}
-            self.__sides[side][8] = {1: 8, 3: 8, 4: 8, 5: 8,
-                                     'left': 1, 'right': 3, 'up': 5, 'down': 4}
-        elif side == 1:
-            self.__sides[side][0] = {0: 0, 2: 0, 4: 6, 5: 2,
-                                     'left': 0, 'right': 2, 'up': 4, 'down': 5}
-            self.__sides[side][2] = {0: 2, 2: 2, 4: 0, 5: 8,
-                                     'left': 4, 'right': 5, 'up': 2, 'down': 0}
-            self.__sides[side][6] = {0: 6, 2: 6, 4: 8, 5: 0,
-                                     'left': 5, 'right': 4, 'up': 0, 'down': 2}
-            self.__sides[side][8] = {0: 8, 2: 8, 4: 2, 5: 6,
-                                     'left': 2, 'right': 0, 'up': 5, 'down': 4}
-        elif side == 2:
-            self.__sides[side][0] = {1: 0, 3: 0, 4: 8, 5: 8,
-                                     'left': 1, 'right': 3, 'up': 4, 'down': 5}
-            self.__sides[side][2] = {1: 2, 3: 2, 4: 6, 5: 6,
-                                     'left': 4, 'right': 5, 'up': 3, 'down': 1}
-            self.__sides[side][6] = {1: 6, 3: 6, 4: 2, 5: 2,
-                                     'left': 5, 'right': 4, 'up': 1, 'down': 3}
-            self.__sides[side][8] = {1: 8, 3: 8, 4: 0, 5: 0,
-                                     'left': 3, 'right': 1, 'up': 5, 'down': 4}
-        elif side == 3:
-            self.__sides[side][0] = {0: 0, 2: 0, 4: 2, 5: 6,
-                                     'left': 2, 'right': 0, 'up': 4, 'down': 5}
-            self.__sides[side][2] = {0: 2, 2: 2, 4: 8, 5: 0,
-                                     'left': 4, 'right': 5, 'up': 0, 'down': 2}
-            self.__sides[side][6] = {0: 6, 2: 6, 4: 0, 5: 8,
-                                     'left': 5, 'right': 4, 'up': 2, 'down': 0}
-            self.__sides[side][8] = {0: 8, 2: 8, 4: 6, 5: 2,
-                                     'left': 0, 'right': 2, 'up': 5, 'down': 4}
-        elif side == 4:
-            self.__sides[side][0] = {0: 0, 1: 2, 2: 8, 3: 6,
-                                     'left': 3, 'right': 1, 'up': 2, 'down': 0}
-            self.__sides[side][2] = {0: 2, 1: 8, 2: 6, 3: 0,
-                                     'left': 2, 'right': 0, 'up': 1, 'down': 3}
-            self.__sides[side][6] = {0: 6, 1: 0, 2: 2, 3: 8,
-                                     'left': 0, 'right': 2, 'up': 3, 'down': 1}
-            self.__sides[side][8] = {0: 8, 1: 6, 2: 0, 3: 2,
-                                     'left': 1, 'right': 3, 'up': 0, 'down': 2}
-        elif side == 5:
-            self.__sides[side][0] = {0: 0, 1: 6, 2: 8, 3: 2,
-                                     'left': 3, 'right': 1, 'up': 0, 'down': 2}
-            self.__sides[side][2] = {0: 2, 1: 0, 2: 6, 3: 8,
-                                     'left': 0, 'right': 2, 'up': 1, 'down': 3}
-            self.__sides[side][6] = {0: 6, 1: 8, 2: 2, 3: 0,
-                                     'left': 2, 'right': 0, 'up': 3, 'down': 1}
-            self.__sides[side][8] = {0: 8, 1: 2, 2: 0, 3: 6,
-                                     'left': 1, 'right': 3, 'up': 2, 'down': 0}
-
-
-    def __get_color(self, side, top_left, row, col):
-        '''Return the current color of a side, row, col'''
-        view = self.__views[top_left]
-        current_row, current_col = view[row][col]
-        color = self.__sides[side][(current_row, current_col)]
-        return color
-
-
-    def __shift_side(self, side, direction):
+    def __shift_side(self, positions, side, direction):
         '''Used to shift the outter row, col combinations when the horizontal
-        row or vertical column being manipulated is 0 or 2'''
-        right_shift = ([(0, 0),(0, 2)],[(0, 1),(1, 2)],[(0, 2),(2, 2)],[(1, 0),(0, 1)],
-                      [(1, 2), (2, 1)], [(2, 0), (0, 0)], [(2, 1), (1, 0)], [(2, 2), (2, 0)])
-        left_shift = ([(0, 0),(2, 0)],[(0, 1),(1, 0)],[(0, 2),(0, 0)],[(1, 0),(2, 1)],
-                       [(1, 2), (0, 1)], [(2, 0), (2, 2)], [(2, 1), (1, 2)], [(2, 2), (0, 2)])
-        temp_dict = {}
-        if self.__DEBUG:
-            print('{} Shift Side {} - {} {}'.format('-' * 5, side, direction, '-' * 5))
-        # Same loop can be used for making these changes, so determine which direction
-        # and set to it
+        row or vertical column being manipulated is the first or last'''
+        base = side * self.cells
         if direction == 'left':
-            shift_tup = left_shift
+            shift_tup = self.left_shift
+        else:
+            shift_tup = self.right_shift
+        current = positions[base:base + self.cells]
+        for from_cell, to_cell in shift_tup:
+            positions[base + to_cell] = current[from_cell]
+
+    def __build_shift(self, side, top_left, direction, index):
+        '''Walk a row ('left', 'right') or column ('up', 'down') shift around the
+        cube from the given view, moving sticker positions instead of colors.
+        Returns a tuple where new_state[i] = old_state[perm[i]].'''
+        adjacency = self.adjacency
+        cells_per_side = self.cells
+        positions = list(range(self.stickers))
+        # The cell offsets of the row / column for each top left.
+        if direction in ('left', 'right'):
+            cells = {tl: view[index] for tl, view in self.views.items()}
         else:
-            shift_tup = right_shift
+            cells = {tl: tuple(row[index] for row in view) for tl, view in self.views.items()}
 
-        # We need a listing of the current colors for each cell
-        for cell in shift_tup:
-            cell = cell[0]
-            temp_dict[cell] = self.__sides[side][cell]
+        current_side = side
+        current_top_left = top_left
+        current_values = [positions[side * cells_per_side + cell] for cell in cells[top_left]]
+        # Shift the given row / column around the cube.
+        for _ in range(4):
+            next_side = adjacency[current_side][current_top_left][direction]
+            next_top_left = adjacency[current_side][current_top_left][next_side]
+            base = next_side * cells_per_side
+            new_values = []
+            for k, cell in enumerate(cells[next_top_left]):
+                new_values.append(positions[base + cell])
+                positions[base + cell] = current_values[k]
+            current_side = next_side
+            current_top_left = next_top_left
+            current_values = new_values
+
+        adjacent = adjacency[current_side][current_top_left]
+        if direction in ('left', 'right'):
+            # The first or last row, which require a top or bottom shift
+            if index == 0:
+                self.__shift_side(positions, adjacent['up'],
+                                  'left' if direction == 'right' else 'right')
+            elif index == self.size - 1:
+                self.__shift_side(positions, adjacent['down'], direction)
+        else:
+            # The first or last column, requiring a shift on the left or right
+            # For the sides, there is only a left or right shift, not up or down.
+            if index == 0:
+                self.__shift_side(positions, adjacent['left'],
+                                  'left' if direction == 'up' else 'right')
+            elif index == self.size - 1:
+                self.__shift_side(positions, adjacent['right'],
+                                  'right' if direction == 'up' else 'left')
+        return tuple(positions)
+
+
+def _line(offsets):
+    '''The slice of offsets, when they are evenly spaced, else None.'''
+    step = offsets[1] - offsets[0]
+    if step == 0 or any(b - a != step for a, b in zip(offsets, offsets[1:])):
+        return None
+    stop = offsets[-1] + step
+    return slice(offsets[0], stop if stop >= 0 else None, step)
+
+
+def apply_step(state, step):
+    '''Make a shift given as CubeTables.steps[key] on a bytearray in place.'''
+    if step[0] is None:
+        state[:] = step[1](state)
+        return
+    for target, value in zip(step[0], step[1](state)):
+        state[target] = value
+
+
+def _inverse(move):
+    '''The move undoing move: the same row / column the other way, or the
+    opposite view move.'''
+    opposite = {'left': 'right', 'right': 'left', 'up': 'down', 'down': 'up'}
+    if move[0].startswith('shift'):
+        return (move[0], opposite[move[1]], move[2])
+    return ('move_' + opposite[move[0][5:]],)
+
+
+_TABLES = {}
+
+
+def cube_tables(size=3):
+    '''The CubeTables for a size, built on first use.'''
+    tables = _TABLES.get(size)
+    if tables is None:
+        tables = _TABLES[size] = CubeTables(size)
+    return tables
+
+
+# The 3 x 3 tables, which the solver, batch and hashing modules work with.
+# The shifts of every view (PERMUTATIONS, GATHERS and VIEW_MASKS) are only
+# compiled when one of them is first imported, see __getattr__ below, so
+# importing this module and making a cube stay cheap.
+TABLES = cube_tables(3)
+VIEWS = TABLES.views
+RIGHT_SHIFT = TABLES.right_shift
+LEFT_SHIFT = TABLES.left_shift
+ADJACENT_VIEWS = TABLES.adjacent_views
+ALL_FACES = 0x3F
+MASK_SIDES = tuple(tuple(side for side in range(6) if mask >> side & 1)
+                   for mask in range(ALL_FACES + 1))
+
+# Methods that apply_moves() accepts.
+MOVE_METHODS = ('shift_h', 'shift_v', 'move_up', 'move_down', 'move_left', 'move_right')
+# Methods wrapped by RubiksCube.set_tracer().
+TRACED_METHODS = MOVE_METHODS + ('undo', 'redo', 'scramble')
+# Moves scramble() draws from, and how many a new cube is shuffled with.
+SCRAMBLE_ROWS = TABLES.scramble_rows
+SCRAMBLE_COLUMNS = TABLES.scramble_columns
+SHUFFLE_LENGTH = 20
+# Every move the history records, by move code, and the code undoing each one.
+# The codes are of moves from the current view, unlike the absolute
+# (side, top left, direction, index) keys of cube_batch.MOVE_CODES.
+MOVE_LIST = TABLES.move_list
+VIEW_MOVE_CODES = TABLES.move_codes
+INVERSE_CODES = TABLES.inverse_codes
+HISTORY_DEPTH = 1024
+
+
+def __getattr__(name):
+    '''The 3 x 3 shift tables of every view, compiled on first use.'''
+    field = {'PERMUTATIONS': 'permutations', 'GATHERS': 'gathers',
+             'VIEW_MASKS': 'view_masks'}.get(name)
+    if field is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    value = globals()[name] = getattr(TABLES.complete(), field)
+    return value
+
+
+def _debug_tracer(debug):
+    '''The tracer for a debug argument: None, a Tracer, or True for one
+    printing each event.'''
+    if debug is True:
+        from cube_trace import Tracer, print_sink
+        return Tracer(sink=print_sink)
+    return debug or None
+
+
+# to_bytes(): a format byte, then 54 stickers at 3 bits each and the view
+# (3 bits side, 2 bits top left index) packed little endian into 21 bytes.
+# Other sizes use SIZED_FORMAT, the size in the next byte and then the
+# stickers and view packed the same way.
+STATE_FORMAT = 1
+SIZED_FORMAT = 2
+STATE_BYTES = 22
+TOP_LEFTS = TABLES.top_lefts
+
+
+def state_bytes(size=3):
+    '''The length of to_bytes() for a size x size x size cube.'''
+    if size == 3:
+        return STATE_BYTES
+    return 2 + (3 * 6 * size * size + 12) // 8
 
-        for from_cell, to_cell in shift_tup:
-            self.__sides[side][to_cell] = temp_dict[from_cell]
-
-    def __shuffle(self):
-        '''Used by __init__ to make random row and column moves.'''
-        from random import choice
-        if self.__DEBUG:
-            print('{}\nSTARTING SHUFFLE\n{}'.format('*' * 30, '*' * 30))
-        for i in range(10):
-            row = choice([0,1,2])
-            direction = choice(['left','right'])
-            self.shift_h(direction, row)
-            col = choice([0,1,2])
-            direction = choice(['up', 'down'])
-            self.shift_v(direction, col)
-        if self.__DEBUG:
-            print('{}\nFINISHED SHUFFLE\n{}'.format('*' * 30, '*' * 30))
+
+class RubiksCube:
+    '''Class for the game.
+    The stickers are held in a bytearray of color codes, size * size per
+    side, at offset side * size * size + row * size + col (54 stickers,
+    side * 9 + row * 3 + col, on the usual 3 x 3 x 3).'''
+    __tracer = None
+
+    def __init__(self, debug=False, solved=False, seed=None, history_depth=HISTORY_DEPTH,
+                 size=3):
+        '''Do all initializations and set the current view to side 0.
+        The cube is shuffled unless solved is True. Giving a seed makes the
+        shuffle reproducible. history_depth is how many moves can be undone.
+        debug is True to print the moves made, or a cube_trace.Tracer.
+        size is the number of rows / columns on a side.'''
+        self.__tables = tables = cube_tables(size)
+        tables.need_view(0, 0)
+        self.__side = 0
+        self.__orientation = 0
+        self.__state = bytearray(tables.solved_state)
+        self.__init_counts()
+        self.__init_faces()
+        self.__init_history(history_depth)
+        self.set_tracer(_debug_tracer(debug))
+        if not solved:
+            self.scramble(SHUFFLE_LENGTH, seed)
+        else:
+            self.__count_all()
+
+    def __init_counts(self):
+        '''Per side state for check_matched() and the progress metrics, redone
+        only for the sides a shift moved stickers on since it was last asked
+        for. A shift only marks its sides in __moved, which __take_moved()
+        hands on to __dirty, __count_dirty and the face cache's __stale.
+        __unmatched is a bit mask of the sides that are not all one color,
+        checked again for the sides in __dirty. __counts[side * 6 + code] and
+        __out, the stickers not of the side's most common color, are counted
+        again for the sides in __count_dirty.'''
+        self.__counts = [0] * (6 * len(COLORS))
+        self.__out = [0] * 6
+        self.__unmatched = 0
+        self.__moved = 0
+        self.__dirty = 0
+        self.__count_dirty = 0
+
+    def __count_all(self):
+        '''Count the colors of every side again when next asked for.'''
+        self.__moved = ALL_FACES
+
+    def __take_moved(self):
+        '''Mark the sides moved on since last time for each of their users.'''
+        moved = self.__moved
+        self.__moved = 0
+        self.__dirty |= moved
+        self.__count_dirty |= moved
+        self.__stale |= moved
+
+    def __match_faces(self):
+        '''Find which of the sides marked dirty are all one color.'''
+        state = self.__state
+        cells = self.__tables.cells
+        unmatched = self.__unmatched
+        for side in MASK_SIDES[self.__dirty]:
+            start = side * cells
+            if state.count(state[start], start, start + cells) == cells:
+                unmatched &= ~(1 << side)
+            else:
+                unmatched |= 1 << side
+        self.__unmatched = unmatched
+        self.__dirty = 0
+
+    def __count_faces(self):
+        '''Count the colors of the sides marked in __count_dirty.'''
+        state = self.__state
+        counts = self.__counts
+        out = self.__out
+        cells = self.__tables.cells
+        codes = range(len(COLORS))
+        for side in MASK_SIDES[self.__count_dirty]:
+            face = state[side * cells:(side + 1) * cells]
+            counts[side * 6:side * 6 + 6] = map(face.count, codes)
+            out[side] = cells - max(counts[side * 6:side * 6 + 6])
+        self.__count_dirty = 0
+
+    def __init_faces(self):
+        '''size x size color name tuples seen so far, __faces[side][top_left]. The
+        sides whose stickers moved since are marked in __stale and dropped on
+        the next lookup.'''
+        self.__faces = [{} for _ in range(6)]
+        self.__stale = 0
+
+    def __face(self, side, top_left):
+        '''The colors of side seen with top_left in the top left corner.'''
+        if self.__moved:
+            self.__take_moved()
+        if self.__stale:
+            for stale_side in MASK_SIDES[self.__stale]:
+                self.__faces[stale_side].clear()
+            self.__stale = 0
+        face = self.__faces[side].get(top_left)
+        if face is None:
+            state = self.__state
+            base = side * self.__tables.cells
+            face = tuple(tuple(COLORS[state[base + cell]] for cell in cells)
+                         for cells in self.__tables.views[top_left])
+            self.__faces[side][top_left] = face
+        return face
+
+    def __shift(self, step):
+        '''Make a row / column shift given as CubeTables.steps[key], marking
+        the sides it moved stickers on. Returns its move code.'''
+        apply_step(self.__state, step)
+        self.__moved |= step[2]
+        return step[3]
+
+    def __init_history(self, depth):
+        '''Move history: a ring buffer of move codes. The last __history_len
+        codes before __history_end can be undone, the __redo_len codes from
+        __history_end on can be redone.'''
+        self.__history = bytearray(max(1, depth))
+        self.__history_end = 0
+        self.__history_len = 0
+        self.__redo_len = 0
+
+    def __record(self, code):
+        '''Add a move to the history, dropping the oldest when full and anything
+        that could have been redone.'''
+        self.__history[self.__history_end] = code
+        self.__history_end = (self.__history_end + 1) % len(self.__history)
+        if self.__history_len < len(self.__history):
+            self.__history_len += 1
+        self.__redo_len = 0
+
+    def __apply_code(self, code):
+        '''Make a move by code without recording it.'''
+        move = self.__tables.move_list[code]
+        if move[0].startswith('shift'):
+            self.__shift(self.__tables.steps[(self.__side, self.__orientation) + move[1:]])
+        else:
+            self.__view_after(move[0][5:])
+
+    def __view_after(self, direction):
+        '''Move the view up, down, left or right.'''
+        self.__side, self.__orientation = view = self.__tables.view_after[
+            (self.__side, self.__orientation, direction)]
+        self.__tables.need_view(*view)
+
+    def scramble(self, n_moves=SHUFFLE_LENGTH, seed=None, rng=None):
+        '''Make n_moves random shifts from the current view, alternating a row
+        and a column. Moves are drawn from rng (a random.Random), or from a new
+        random.Random(seed), or else from the global random generator.
+        Returns the list of moves made, in the form apply_moves() takes.'''
+        if rng is not None:
+            choices = rng.choices
+        else:
+            import random
+            choices = random.Random(seed).choices if seed is not None else random.choices
+        tables = self.__tables
+        rows = choices(tables.scramble_rows, k=(n_moves + 1) // 2)
+        columns = choices(tables.scramble_columns, k=n_moves // 2)
+        moves = [None] * n_moves
+        moves[::2] = rows
+        moves[1::2] = columns
+        view = (self.__side, self.__orientation)
+        state = self.__state
+        for _, direction, index in moves:
+            apply_step(state, tables.steps[view + (direction, index)])
+        self.__count_all()
+        self.clear_history()
+        return moves
 
     def shift_h(self, direction, row):
         '''Shift the cells horizontally for the direction and row given'''
         # If not valid entries for either, ignore.
-        if direction not in ['left','right'] or row not in [0,1,2]:
+        if direction not in ('left', 'right') or row not in self.__tables.indexes:
             return None
-        current_side = self.__side
-        current_top_left = self.__orientation
-        if self.__DEBUG:
-            print('{} Move horizontal {}, Row {} {}'.format('=' * 5, direction, row, '=' * 5))
-            print('Start: Side = {}\tTop Left = {}'.format(current_side, current_top_left))
-
-        current_values = [] # To hold the three colors to use on the next side
-        for col in range(3):
-            color = self.__get_color(current_side, current_top_left, row, col)
-            #color = self.__sides[current_side][(row, col)]
-            if self.__DEBUG:
-                print('({:d}, {:d}) - {:s}'.format(row, col, color))
-            current_values.append(color)
-
-        # Shift the given row around the cube.
-        for _ in range(4):
-            side = self.__sides[current_side][current_top_left][direction]
-            top_left = self.__sides[current_side][current_top_left][side]
-            if self.__DEBUG:
-                print('Next Side: {}, Next TopLeft: {}'.format(side, top_left))
-                print('Current colors:', current_values)
-            new_values = []
-            for col in range(3):
-                color = self.__get_color(side, top_left, row, col)
-                if self.__DEBUG:
-                    print('({:d}, {:d}) - {:s}'.format(row, col, color))
-                new_values.append(color)
-                if self.__DEBUG:
-                    print('Replace {} with {}'.format(color, current_values[col]))
-                self.__sides[side][self.__views[top_left][row][col]] = current_values[col]
-            current_side = side
-            current_top_left = top_left
-            current_values = new_values.copy()
-        if row != 1:
-            # Row is either 0 or 2, which require a bottom or top shift
-            if row == 0:
-                side = self.__sides[current_side][current_top_left]['up']
-                if direction == 'right': direction = 'left'
-                else: direction = 'right'
-            else:
-                side = self.__sides[current_side][current_top_left]['down']
-            self.__shift_side(side, direction)
+        self.__record(self.__shift(
+            self.__tables.steps[(self.__side, self.__orientation, direction, row)]))
 
 
     def shift_v(self, direction, col):
         '''Shift the cells vertically for the direction and column given'''
         # If not valid entries for either, ignore.
-        if direction not in ['up','down'] or col not in [0,1,2]:
+        if direction not in ('up', 'down') or col not in self.__tables.indexes:
             return None
-        current_side = self.__side
-        current_top_left = self.__orientation
-        if self.__DEBUG:
-            print('{} Move vertical {}, Column {} {}'.format('=' * 5, direction, col, '=' * 5))
-            print('Start: Side = {}\tColumn = {}\tTop Left = {}'.format(current_side, col, current_top_left))
-
-        current_values = [] # Hold the 3 colors to use on the next side.
-        for row in range(3):
-            color = self.__get_color(current_side, current_top_left, row, col)
-            #color = self.__sides[current_side][(row, col)]
-            if self.__DEBUG:
-                print('({:d}, {:d}) - {:s}'.format(row, col, color))
-            current_values.append(color)
-
-        # Shift the given column around the cube
-        for _ in range(4):
-            side = self.__sides[current_side][current_top_left][direction]
-            top_left = self.__sides[current_side][current_top_left][side]
-            if self.__DEBUG:
-                print('Next Side: {}, Next TopLeft: {}'.format(side, top_left))
-                print('Current colors:', current_values)
-            new_values = []
-            for row in range(3):
-                color = self.__get_color(side, top_left, row, col)
-                if self.__DEBUG:
-                    print('({:d}, {:d}) - {:s}'.format(row, col, color))
-                new_values.append(color)
-                if self.__DEBUG:
-                    print('Replace {} with {}'.format(color, current_values[row]))
-                self.__sides[side][self.__views[top_left][row][col]] = current_values[row]
-            current_side = side
-            current_top_left = top_left
-            current_values = new_values.copy()
-
-        if col != 1:
-            # Either column 0 or 2, requiring a shift on the left or right
-            # For the sides, there is only a left or right shift, not up or down.
-            if col == 0:
-                side = self.__sides[current_side][current_top_left]['left']
-                if direction == 'up': direction = 'left'
-                else: direction = 'right'
-            else:
-                side = self.__sides[current_side][current_top_left]['right']
-                if direction == 'up': direction = 'right'
-                else: direction = 'left'
-            self.__shift_side(side, direction)
+        self.__record(self.__shift(
+            self.__tables.steps[(self.__side, self.__orientation, direction, col)]))
 
 
     def get_adjacent(self, direction):
-        '''Used to get the 3 x 3 colors of the up, left, right, or bottom
-        direction based on the current view side and orientatin (top left)'''
-        side = self.__side
-        orientation = self.__orientation
-        return_list = [['', '', ''], ['', '', ''], ['', '', '']]
-        if direction == 'back':
-            tmp_side = self.__sides[side][orientation]['right']
-            tmp_orientation = self.__sides[side][orientation][tmp_side]
-            adjacent_side = self.__sides[tmp_side][tmp_orientation]['right']
-            adjacent_orientation = self.__sides[tmp_side][tmp_orientation][adjacent_side]
-        else:
-            adjacent_side = self.__sides[side][orientation][direction]
-            adjacent_orientation = self.__sides[side][orientation][adjacent_side]
-
-        for row in range(3):
-            for col in range(3):
-                current_row, current_col = self.__views[adjacent_orientation][row][col]
-                return_list[row][col] = self.__sides[adjacent_side][(current_row, current_col)]
-        return return_list
+        '''Used to get the colors of the up, left, right, bottom or back
+        direction based on the current view side and orientatin (top left).
+        Returns a size tuple of size tuples of color names.'''
+        return self.__face(*self.__tables.adjacent_views[
+            (self.__side, self.__orientation, direction)])
 
 
     def check_matched(self):
         '''See if all cells on a side are the same color.'''
-        for side in (0, 1, 2, 3, 4, 5):
-            match_color = self.__sides[side][(0, 0)]
-            for row in range(3):
-                for col in range(3):
-                    if row == 0:
-                        col = 1
-                    if self.__sides[side][(row, col)] != match_color:
-                        return False
-        return True
+        if self.__moved:
+            self.__take_moved()
+        if self.__unmatched & ~self.__dirty:
+            # A side no stickers were moved onto since is still mixed.
+            return False
+        if self.__dirty:
+            self.__match_faces()
+        return not self.__unmatched
+
+
+    def solved_faces(self):
+        '''Returns how many sides are all one color.'''
+        if self.__moved:
+            self.__take_moved()
+        if self.__dirty:
+            self.__match_faces()
+        return 6 - len(MASK_SIDES[self.__unmatched])
+
+
+    def out_of_place(self):
+        '''Returns how many stickers differ from the most common color of
+        their side, 0 when solved.'''
+        if self.__moved:
+            self.__take_moved()
+        if self.__count_dirty:
+            self.__count_faces()
+        return sum(self.__out)
+
+
+    def color_counts(self, side):
+        '''Returns how many stickers of each color code side has.'''
+        if self.__moved:
+            self.__take_moved()
+        if self.__count_dirty:
+            self.__count_faces()
+        return tuple(self.__counts[side * 6:side * 6 + 6])
 
 
     def move_right(self):
         '''Move the current side in view to the next gong right.'''
-        new_side = self.__sides[self.__side][self.__orientation]['right']
-        self.__orientation = self.__sides[self.__side][self.__orientation][new_side]
-        self.__side = new_side
+        self.__view_after('right')
+        self.__record(self.__tables.move_codes[('move_right',)])
 
 
     def move_left(self):
         '''Move the current side in view to the next gong left.'''
-        new_side = self.__sides[self.__side][self.__orientation]['left']
-        self.__orientation = self.__sides[self.__side][self.__orientation][new_side]
-        self.__side = new_side
+        self.__view_after('left')
+        self.__record(self.__tables.move_codes[('move_left',)])
 
 
     def move_up(self):
         '''Move the current side in view to the next gong up.'''
-        new_side = self.__sides[self.__side][self.__orientation]['up']
-        self.__orientation = self.__sides[self.__side][self.__orientation][new_side]
-        self.__side = new_side
+        self.__view_after('up')
+        self.__record(self.__tables.move_codes[('move_up',)])
 
 
     def move_down(self):
         '''Move the current side in view to the next gong down.'''
-        new_side = self.__sides[self.__side][self.__orientation]['down']
-        self.__orientation = self.__sides[self.__side][self.__orientation][new_side]
-        self.__side = new_side
+        self.__view_after('down')
+        self.__record(self.__tables.move_codes[('move_down',)])
 
 
     def get_view(self):
-        '''Returns the 3x3 list of colors for the rows / columns'''
-        side = self.__side
-        return_list = [['','',''],['','',''],['','','']]
-        current_view = self.__views[self.__orientation]
-        for i in range(3):
-            for j in range(3):
-                current_row, current_col = current_view[i][j]
-                return_list[i][j] = self.__sides[side][(current_row, current_col)]
-        return side, self.__orientation, return_list
+        '''Returns the side, top left and the size x size colors for the rows /
+        columns (tuples of color names).'''
+        return self.__side, self.__orientation, self.__face(self.__side, self.__orientation)
+
+
+    def solve(self, max_length=30):
+        '''Returns a move list that solves the cube from the current view,
+        or None if no solution within max_length face turns was found.
+        Only for the 3 x 3 x 3.'''
+        self.__need_3x3('solve()')
+        from cube_solver import solve
+        return solve(self, max_length)
+
+
+    def apply_codes(self, codes):
+        '''Make each move in an iterable of move codes (see MOVE_LIST), such as
+        bytes read from a move log.'''
+        count = len(self.__tables.move_list)
+        for code in codes:
+            if code >= count:
+                raise ValueError('unknown move code {}'.format(code))
+            self.__apply_code(code)
+            self.__record(code)
+
+
+    def apply_moves(self, moves):
+        '''Make each (method name, *arguments) move in the list, as returned by solve().'''
+        for name, *args in moves:
+            if name not in MOVE_METHODS:
+                raise ValueError('unknown move {}'.format(name))
+            getattr(self, name)(*args)
+
+
+    def undo(self):
+        '''Undo the last recorded move by making its inverse.
+        Returns the move undone, or None if there is nothing to undo.'''
+        if not self.__history_len:
+            return None
+        self.__history_end = (self.__history_end - 1) % len(self.__history)
+        code = self.__history[self.__history_end]
+        self.__history_len -= 1
+        self.__redo_len += 1
+        self.__apply_code(self.__tables.inverse_codes[code])
+        return self.__tables.move_list[code]
+
+
+    def redo(self):
+        '''Make the last undone move again.
+        Returns the move redone, or None if there is nothing to redo.'''
+        if not self.__redo_len:
+            return None
+        code = self.__history[self.__history_end]
+        self.__history_end = (self.__history_end + 1) % len(self.__history)
+        self.__history_len += 1
+        self.__redo_len -= 1
+        self.__apply_code(code)
+        return self.__tables.move_list[code]
+
+
+    def get_history(self):
+        '''Returns the moves that can be undone, oldest first.'''
+        depth = len(self.__history)
+        start = self.__history_end - self.__history_len
+        move_list = self.__tables.move_list
+        return [move_list[self.__history[(start + i) % depth]]
+                for i in range(self.__history_len)]
+
+
+    def clear_history(self):
+        '''Forget all moves, so there is nothing to undo or redo.'''
+        self.__history_len = 0
+        self.__redo_len = 0
+
+
+    def state_key(self, symmetry=False):
+        '''Returns a 64 bit key of the stickers, ignoring the view. With symmetry,
+        whole-cube rotations of the same state share a key. Only for the 3 x 3 x 3.'''
+        self.__need_3x3('state_key()')
+        from cube_hash import state_key
+        return state_key(self.__state, symmetry)
+
+
+    def same_state(self, other, symmetry=False):
+        '''True if other has the same stickers (whatever the view), or with
+        symmetry, the same stickers after some whole-cube rotation.'''
+        if not symmetry:
+            return self.__state == other.get_state()
+        self.__need_3x3('same_state() with symmetry')
+        from cube_hash import canonical_state
+        return canonical_state(self.__state) == canonical_state(other.get_state())
+
+
+    def get_state(self):
+        '''Returns the 54 color codes as bytes, indexed side * 9 + row * 3 + col
+        (6 * size * size, side * size * size + row * size + col, in general).'''
+        return bytes(self.__state)
+
+
+    def get_size(self):
+        '''Returns the number of rows / columns on a side.'''
+        return self.__tables.size
+
+
+    def to_bytes(self):
+        '''Returns the stickers and view packed into STATE_BYTES bytes, or for
+        other sizes than 3 x 3 x 3, SIZED_FORMAT, the size and then the packed
+        stickers and view.'''
+        tables = self.__tables
+        value = 0
+        for code in reversed(self.__state):
+            value = (value << 3) | code
+        bits = 3 * tables.stickers
+        value |= self.__side << bits | tables.top_lefts.index(self.__orientation) << bits + 3
+        if tables.size == 3:
+            return bytes((STATE_FORMAT,)) + value.to_bytes(STATE_BYTES - 1, 'little')
+        return bytes((SIZED_FORMAT, tables.size)) + value.to_bytes((bits + 12) // 8, 'little')
+
+
+    @classmethod
+    def from_bytes(cls, data, debug=False):
+        '''Returns a cube from the output of to_bytes().'''
+        if len(data) == STATE_BYTES and data[0] == STATE_FORMAT:
+            size, packed = 3, data[1:]
+        elif len(data) > 2 and data[0] == SIZED_FORMAT and data[1] not in (0, 1, 3):
+            size, packed = data[1], data[2:]
+        else:
+            raise ValueError('not a packed cube state')
+        if len(data) != state_bytes(size):
+            raise ValueError('not a packed cube state')
+        stickers = 6 * size * size
+        value = int.from_bytes(packed, 'little')
+        state = bytes((value >> (3 * i)) & 7 for i in range(stickers))
+        side = (value >> 3 * stickers) & 7
+        top_left = cube_tables(size).top_lefts[(value >> 3 * stickers + 3) & 3]
+        return cls.from_state(state, side, top_left, debug)
+
+
+    def copy(self):
+        '''Returns a new cube with the same stickers and view, without shuffling.'''
+        clone = RubiksCube.__new__(RubiksCube)
+        clone.__tables = self.__tables
+        clone.__side = self.__side
+        clone.__orientation = self.__orientation
+        clone.__state = self.__state[:]
+        clone.__counts = self.__counts[:]
+        clone.__out = self.__out[:]
+        clone.__unmatched = self.__unmatched
+        clone.__moved = self.__moved
+        clone.__dirty = self.__dirty
+        clone.__count_dirty = self.__count_dirty
+        clone.__faces = [dict(faces) for faces in self.__faces]
+        clone.__stale = self.__stale
+        clone.__history = self.__history[:]
+        clone.__history_end = self.__history_end
+        clone.__history_len = self.__history_len
+        clone.__redo_len = self.__redo_len
+        clone.set_tracer(self.__tracer)
+        return clone
+
+
+    def set_state(self, state):
+        '''Replace the 54 color codes, indexed side * 9 + row * 3 + col
+        (6 * size * size for other sizes). This clears the move history.'''
+        state = bytearray(state)
+        stickers = self.__tables.stickers
+        if len(state) != stickers or max(state) >= len(COLORS):
+            raise ValueError('state must be {} color codes in range 0 - 5'.format(stickers))
+        self.__state = state
+        self.__count_all()
+        self.clear_history()
+
+
+    @classmethod
+    def from_state(cls, state, side=0, orientation=0, debug=False,
+                   history_depth=HISTORY_DEPTH):
+        '''Returns a cube with the given stickers and view, without shuffling.
+        The size comes from the number of stickers, 6 * size * size.'''
+        size = isqrt(len(state) // 6)
+        if size < 2 or 6 * size * size != len(state):
+            raise ValueError('{} stickers is not a cube'.format(len(state)))
+        tables = cube_tables(size)
+        if side not in ADJACENCY or orientation not in tables.views:
+            raise ValueError('invalid side {} or top left {}'.format(side, orientation))
+        tables.need_view(side, orientation)
+        cube = cls.__new__(cls)
+        cube.__tables = tables
+        cube.__side = side
+        cube.__orientation = orientation
+        cube.__init_counts()
+        cube.__init_faces()
+        cube.__init_history(history_depth)
+        cube.set_state(state)
+        cube.set_tracer(_debug_tracer(debug))
+        return cube
+
+
+    def set_tracer(self, tracer):
+        '''Report moves to a cube_trace.Tracer, or stop with None.
+        The traced methods are wrapped on this instance only, so an untraced
+        cube runs the plain methods.'''
+        # Only a cube that was traced is unwrapped. Just reading __dict__ would
+        # slow down every attribute lookup on the cube from then on (CPython).
+        if self.__tracer is not None:
+            for name in TRACED_METHODS:
+                delattr(self, name)
+        self.__tracer = tracer
+        if tracer is None:
+            return
+        view = lambda: (self.__side, self.__orientation)
+        for name in TRACED_METHODS:
+            setattr(self, name, tracer.traced_move(getattr(self, name), name, view,
+                                                   self.__tables.size))
+
+
+    def get_tracer(self):
+        '''Returns the Tracer set by set_tracer() or debug, or None.'''
+        return self.__tracer
+
+
+    def __need_3x3(self, what):
+        if self.__tables.size != 3:
+            raise ValueError('{} needs a 3 x 3 x 3 cube, not {} x {} x {}'.format(
+                what, *(self.__tables.size,) * 3))
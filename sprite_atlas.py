@@ -0,0 +1,99 @@
+'''
+sprite_atlas.py
+
+Author: John Kinder
+Requirements: PyGame
+Description: One texture per sticker size holding all six colors side by side,
+scaled once and converted to the display's pixel format so blits are plain
+copies. Draw a sticker with surface.blits(), giving atlas.surface and
+atlas.areas[color] as the source area.
+Built atlases are cached as raw pixels in CACHE_DIR, so later launches skip
+decoding and scaling the PNGs. The cache file names the size, and its header
+records the size and modification time of every PNG, so editing an image
+rebuilds it.
+
+Externally available:
+- Atlas(size, image_dir='.', cache_dir=CACHE_DIR) .surface, .areas, .size
+- CACHE_DIR Where the files go (env RUBIKS_CUBE_CACHE overrides).
+'''
+
+import hashlib
+import os
+import struct
+
+import pygame
+
+from rubiks_cube import COLORS
+
+CACHE_DIR = os.environ.get('RUBIKS_CUBE_CACHE',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'rubiks_cube'))
+MAGIC = b'RCATLAS\0'
+FORMAT_VERSION = 1
+# magic, format version, sticker size, hash of the source images
+HEADER = struct.Struct('<8sHH16s')
+
+
+def _sources_hash(image_dir):
+    '''Hash of the name, size and modification time of every color PNG.'''
+    digest = hashlib.sha256()
+    for color in COLORS:
+        info = os.stat(os.path.join(image_dir, '{}.png'.format(color)))
+        digest.update('{}:{}:{};'.format(color, info.st_size, info.st_mtime_ns).encode())
+    return digest.digest()[:16]
+
+
+def _build(size, image_dir):
+    '''Load and scale the color PNGs into one size * 6 by size surface,
+    COLORS[code] at x = code * size.'''
+    surface = pygame.Surface((size * len(COLORS), size))
+    for code, color in enumerate(COLORS):
+        image = pygame.image.load(os.path.join(image_dir, '{}.png'.format(color)))
+        if image.get_size() != (size, size):
+            image = pygame.transform.scale(image, (size, size))
+        surface.blit(image, (code * size, 0))
+    return surface
+
+
+def _read(path, size, sources):
+    '''The cached atlas at path, or None if missing or out of date.'''
+    try:
+        with open(path, 'rb') as source:
+            data = source.read()
+    except OSError:
+        return None
+    pixels = size * len(COLORS) * size * 3
+    if len(data) != HEADER.size + pixels or \
+            HEADER.unpack_from(data) != (MAGIC, FORMAT_VERSION, size, sources):
+        return None
+    return pygame.image.fromstring(data[HEADER.size:], (size * len(COLORS), size), 'RGB')
+
+
+def _write(path, size, sources, surface):
+    '''Save surface as raw RGB after a header, renamed into place when complete.'''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, size, sources))
+        out.write(pygame.image.tostring(surface, 'RGB'))
+    os.replace(tmp_path, path)
+
+
+class Atlas:
+    '''The six sticker colors at one size. Converted to the display format
+    when a display mode has been set, so make it after set_mode().'''
+    def __init__(self, size, image_dir='.', cache_dir=CACHE_DIR):
+        self.size = size
+        sources = _sources_hash(image_dir)
+        path = os.path.join(cache_dir, 'atlas-{}.rgb'.format(size))
+        surface = _read(path, size, sources)
+        if surface is None:
+            surface = _build(size, image_dir)
+            try:
+                _write(path, size, sources, surface)
+            except OSError:
+                pass        # No cache then, just build it again next time.
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        self.surface = surface
+        self.areas = {color: pygame.Rect(code * size, 0, size, size)
+                      for code, color in enumerate(COLORS)}
@@ -0,0 +1,121 @@
+'''
+Table Cache
+Author: John Kinder
+
+Requirements: NumPy
+
+Description: On-disk cache for large lookup tables (pruning tables, move
+tables) so they are built once and memory-mapped on later runs.
+Each table set is one binary file:
+- Header: magic, format version, table set version, hash of the move
+  definitions in rubiks_cube.py, table count and directory offset.
+- Table data, each aligned to 64 bytes.
+- Directory: name, dtype, shape, offset and size of each table.
+Tables are returned as read-only NumPy views straight into the mapped file.
+A file written by another version, or for different move tables, is rebuilt.
+
+Externally available:
+- load(name, version, generate) Returns {table name: array}.
+- CACHE_DIR Where the files go (env RUBIKS_CUBE_CACHE overrides).
+- MOVES_HASH Hash of rubiks_cube.PERMUTATIONS recorded in every file.
+'''
+
+import hashlib
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from rubiks_cube import PERMUTATIONS
+
+CACHE_DIR = os.environ.get('RUBIKS_CUBE_CACHE',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'rubiks_cube'))
+MAGIC = b'RCTABLES'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+MAX_DIMENSIONS = 4
+# magic, format version, table set version, moves hash, table count, directory offset
+HEADER = struct.Struct('<8sHH16sIQ')
+# name, dtype, number of dimensions, shape, offset, size in bytes
+ENTRY = struct.Struct('<32s8sB{}QQQ'.format(MAX_DIMENSIONS))
+MOVES_HASH = hashlib.sha256(repr(sorted(PERMUTATIONS.items())).encode()).digest()[:16]
+
+
+def _path(name, directory):
+    return os.path.join(directory or CACHE_DIR, '{}.tables'.format(name))
+
+
+def _write(path, version, generate):
+    '''Stream the (name, array) pairs from generate() into a new file at path.'''
+    entries = []
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as out:
+        out.write(bytes(HEADER.size))
+        for name, table in generate():
+            table = np.ascontiguousarray(table)
+            if table.ndim > MAX_DIMENSIONS:
+                raise ValueError('table {} has more than {} dimensions'.format(
+                    name, MAX_DIMENSIONS))
+            out.write(bytes(-out.tell() % ALIGNMENT))
+            shape = table.shape + (0,) * (MAX_DIMENSIONS - table.ndim)
+            entries.append(ENTRY.pack(name.encode(), table.dtype.str.encode(), table.ndim,
+                                      *shape, out.tell(), table.nbytes))
+            out.write(table.tobytes())
+        directory = out.tell()
+        out.write(b''.join(entries))
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, version, MOVES_HASH,
+                              len(entries), directory))
+    # Rename into place, so readers never see half a file.
+    os.replace(tmp_path, path)
+
+
+def _read(path, version):
+    '''Map the file at path. Returns {name: array}, or None if it is missing,
+    damaged or out of date.'''
+    try:
+        with open(path, 'rb') as source:
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mapped) < HEADER.size:
+        return None
+    magic, file_format, file_version, moves_hash, count, directory = \
+        HEADER.unpack_from(mapped, 0)
+    if (magic, file_format, file_version, moves_hash) != \
+            (MAGIC, FORMAT_VERSION, version, MOVES_HASH):
+        return None
+    if directory + count * ENTRY.size > len(mapped):
+        return None
+    tables = {}
+    try:
+        for i in range(count):
+            name, dtype, ndim, *rest = ENTRY.unpack_from(mapped, directory + i * ENTRY.size)
+            shape = tuple(rest[:ndim])
+            offset, nbytes = rest[MAX_DIMENSIONS:]
+            dtype = np.dtype(dtype.rstrip(b'\0').decode())
+            if offset + nbytes > len(mapped):
+                return None
+            table = np.frombuffer(mapped, dtype=dtype, count=nbytes // dtype.itemsize,
+                                  offset=offset)
+            tables[name.rstrip(b'\0').decode()] = table.reshape(shape)
+    # A damaged entry: an unknown dtype, a shape that does not fit the data
+    # or a name that is not text.
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    return tables
+
+
+def load(name, version, generate, directory=None):
+    '''Returns the tables named name as {table name: read-only array}, mapped
+    from the cache directory. generate() yields (table name, array) pairs and
+    is only called when the file is missing, or was written for another
+    version or other move tables.'''
+    path = _path(name, directory)
+    tables = _read(path, version)
+    if tables is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write(path, version, generate)
+        tables = _read(path, version)
+    return tables
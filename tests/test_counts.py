@@ -0,0 +1,78 @@
+'''
+check_matched(), solved_faces(), out_of_place() and color_counts() against a
+full rescan of the stickers, over random sequences of moves.
+'''
+
+import random
+
+import pytest
+
+from rubiks_cube import COLORS, RubiksCube
+
+
+def rescan(cube):
+    '''(check_matched, solved_faces, out_of_place, color_counts per side)
+    counted from scratch.'''
+    state = cube.get_state()
+    cells = cube.get_size() ** 2
+    counts = [tuple(state[side * cells:(side + 1) * cells].count(code)
+                    for code in range(len(COLORS))) for side in range(6)]
+    out = [cells - max(side_counts) for side_counts in counts]
+    return sum(out) == 0, out.count(0), sum(out), counts
+
+
+def measured(cube):
+    return (cube.check_matched(), cube.solved_faces(), cube.out_of_place(),
+            [cube.color_counts(side) for side in range(6)])
+
+
+def random_step(cube, rng):
+    '''Make a random move, undo, redo or state change.'''
+    size = cube.get_size()
+    kind = rng.randrange(10)
+    if kind < 3:
+        cube.shift_h(rng.choice(('left', 'right')), rng.randrange(size))
+    elif kind < 6:
+        cube.shift_v(rng.choice(('up', 'down')), rng.randrange(size))
+    elif kind == 6:
+        getattr(cube, rng.choice(('move_up', 'move_down', 'move_left', 'move_right')))()
+    elif kind == 7:
+        cube.undo() if rng.random() < 0.7 else cube.redo()
+    elif kind == 8:
+        cube.apply_codes(bytes(rng.randrange(4 * size) for _ in range(3)))
+    elif rng.random() < 0.5:
+        cube.scramble(rng.randrange(5), rng=rng)
+    else:
+        cube.set_state(RubiksCube(solved=True, size=size).get_state())
+
+
+@pytest.mark.parametrize('size', (2, 3, 4, 5))
+@pytest.mark.parametrize('seed', range(40))
+def test_counts_match_rescan(seed, size):
+    rng = random.Random(seed)
+    cube = RubiksCube(seed=seed, size=size)
+    for _ in range(60):
+        random_step(cube, rng)
+        # Ask for some metrics only now and then, so several moves are
+        # counted at once as well.
+        if rng.random() < 0.6:
+            assert cube.check_matched() == rescan(cube)[0]
+        if rng.random() < 0.4:
+            assert measured(cube) == rescan(cube)
+        if rng.random() < 0.1:
+            clone = cube.copy()
+            random_step(clone, rng)
+            assert measured(clone) == rescan(clone)
+    assert measured(cube) == rescan(cube)
+
+
+def test_solved_and_undone():
+    cube = RubiksCube(solved=True)
+    assert measured(cube) == (True, 6, 0, [tuple(9 if code == side else 0 for code in range(6))
+                                          for side in range(6)])
+    cube.shift_h('left', 1)
+    assert (cube.check_matched(), cube.solved_faces(), cube.out_of_place()) == (False, 2, 12)
+    cube.shift_v('up', 0)
+    cube.undo()
+    cube.undo()
+    assert measured(cube) == rescan(cube) and cube.check_matched()
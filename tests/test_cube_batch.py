@@ -0,0 +1,81 @@
+'''CubeBatch moves against the same moves made on single RubiksCubes.'''
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from cube_batch import CubeBatch, move_code
+from rubiks_cube import RubiksCube
+
+VIEW_MOVES = ('move_up', 'move_down', 'move_left', 'move_right')
+COUNT = 6
+
+
+def single_cubes(seed):
+    '''Scrambled cubes, all viewing side 0 with top left 0.'''
+    return [RubiksCube.from_state(RubiksCube(seed=seed * COUNT + i).get_state())
+            for i in range(COUNT)]
+
+
+def random_shift(rng):
+    if rng.random() < 0.5:
+        return 'shift_h', rng.choice(('left', 'right')), rng.randrange(3)
+    return 'shift_v', rng.choice(('up', 'down')), rng.randrange(3)
+
+
+def assert_same(batch, cubes):
+    for i, cube in enumerate(cubes):
+        assert batch.states[i].tobytes() == cube.get_state()
+        assert batch.export_cube(i).get_state() == cube.get_state()
+    assert batch.check_matched().tolist() == [cube.check_matched() for cube in cubes]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_same_moves_as_single_cubes(seed):
+    rng = random.Random(seed)
+    cubes = single_cubes(seed)
+    batch = CubeBatch.from_cubes(cubes)
+    sequence = []
+    for _ in range(60):
+        # View moves only change which codes the shifts have.
+        if rng.random() < 0.3:
+            view_move = rng.choice(VIEW_MOVES)
+            for cube in cubes:
+                getattr(cube, view_move)()
+            continue
+        method, direction, index = random_shift(rng)
+        side, top_left, _ = cubes[0].get_view()
+        code = move_code(side, top_left, direction, index)
+        batch.apply(code)
+        sequence.append(code)
+        for cube in cubes:
+            getattr(cube, method)(direction, index)
+        assert_same(batch, cubes)
+    composed = CubeBatch.from_cubes(single_cubes(seed))
+    composed.apply_sequence(sequence)
+    assert_same(composed, cubes)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_one_move_per_cube(seed):
+    rng = random.Random(seed)
+    cubes = single_cubes(seed)
+    batch = CubeBatch.from_cubes(cubes)
+    columns = []
+    for _ in range(30):
+        column = []
+        for cube in cubes:
+            if rng.random() < 0.3:
+                getattr(cube, rng.choice(VIEW_MOVES))()
+            method, direction, index = random_shift(rng)
+            side, top_left, _ = cube.get_view()
+            column.append(move_code(side, top_left, direction, index))
+            getattr(cube, method)(direction, index)
+        batch.apply(np.array(column))
+        columns.append(column)
+    assert_same(batch, cubes)
+    sequences = CubeBatch.from_cubes(single_cubes(seed))
+    sequences.apply_sequence(np.array(columns).T)
+    assert_same(sequences, cubes)
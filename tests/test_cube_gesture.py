@@ -0,0 +1,76 @@
+'''DragGesture fed synthetic drags over a 3 x 3 grid of 100 px cells at (150, 100).'''
+
+import pytest
+
+from cube_gesture import MIN_DRAG, DragGesture
+
+LEFT, TOP, CELL = 150, 100, 100
+
+
+def drag(points, cells=3, cell_size=CELL):
+    '''The move for a drag through points: pressed at the first, released at the last.'''
+    gesture = DragGesture(LEFT, TOP, cell_size, cells)
+    gesture.start(*points[0])
+    for point in points[1:-1]:
+        gesture.add(*point)
+    return gesture.finish(*points[-1])
+
+
+def line(start, end, samples):
+    (x0, y0), (x1, y1) = start, end
+    return [(x0 + (x1 - x0) * i / (samples - 1), y0 + (y1 - y0) * i / (samples - 1))
+            for i in range(samples)]
+
+
+@pytest.mark.parametrize('samples', (2, 3, 25, 400))
+def test_speed_does_not_matter(samples):
+    # A fast drag gives a few positions, a slow one hundreds.
+    assert drag(line((160, 250), (440, 250), samples)) == ('shift_h', 'right', 1)
+    assert drag(line((420, 130), (170, 130), samples)) == ('shift_h', 'left', 0)
+    assert drag(line((380, 110), (380, 390), samples)) == ('shift_v', 'down', 2)
+    assert drag(line((300, 390), (300, 110), samples)) == ('shift_v', 'up', 1)
+
+
+def test_drag_across_any_number_of_cells():
+    assert drag(line((210, 350), (290, 350), 10)) == ('shift_h', 'right', 2)
+    assert drag(line((210, 350), (390, 350), 10)) == ('shift_h', 'right', 2)
+    # A 5 x 5 grid of 60 px cells, from the first to the last column.
+    assert drag(line((170, 105), (170, 395), 30), 5, 60) == ('shift_v', 'down', 0)
+    assert drag(line((155, 335), (290, 335), 30), 5, 60) == ('shift_h', 'right', 3)
+
+
+def test_wobble_is_averaged():
+    points = [(160 + 10 * i, 250 + (-20 if i % 2 else 30)) for i in range(29)]
+    assert drag(points) == ('shift_h', 'right', 1)
+
+
+def test_too_short_is_ignored():
+    short = MIN_DRAG * CELL
+    assert drag([(200, 250), (200 + short - 1, 250)]) is None
+    assert drag([(200, 250), (200 + short, 250)]) == ('shift_h', 'right', 1)
+    assert drag([(200, 250), (200, 250)]) is None
+
+
+def test_border_and_diagonal_are_ignored():
+    # Averaging exactly on the line between rows 0 and 1.
+    assert drag(line((160, 200), (440, 200), 10)) is None
+    assert drag([(160, 180), (300, 200), (440, 220)]) is None
+    assert drag([(160, 110), (260, 210)]) is None
+
+
+def test_leaving_the_cube_is_ignored():
+    assert drag(line((160, 250), (460, 250), 10)) is None
+    assert drag([(160, 250), (300, 250), (500, 250), (420, 250), (440, 250)]) is None
+    assert drag([(300, 110), (300, 50), (300, 390)]) is None
+    # On the outer edge itself is still on the cube.
+    assert drag(line((150, 250), (450, 250), 10)) == ('shift_h', 'right', 1)
+
+
+def test_only_a_started_drag_counts():
+    gesture = DragGesture(LEFT, TOP, CELL)
+    gesture.add(200, 250)
+    assert not gesture.active and gesture.finish(400, 250) is None
+    gesture.start(160, 250)
+    gesture.add(300, 250)
+    assert gesture.count == 2 and gesture.finish(440, 250) == ('shift_h', 'right', 1)
+    assert not gesture.active and gesture.finish() is None
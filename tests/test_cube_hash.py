@@ -0,0 +1,25 @@
+'''TranspositionTable slots and replacement.'''
+
+from cube_hash import TranspositionTable
+
+
+def test_key_zero_is_its_own_key():
+    table = TranspositionTable(16)
+    table.put(0, 7)
+    assert table.get(0) == 7
+    assert table.get(1) is None
+    assert 1 not in table
+    table.put(1, 8)
+    assert (table.get(0), table.get(1), len(table)) == (7, 8, 2)
+
+
+def test_put_replaces_and_clear_empties():
+    table = TranspositionTable(16, probe=2)
+    for key in (3, 19, 35):         # all home to slot 3
+        table.put(key, key, depth=key)
+    assert len(table) == 2
+    assert 35 in table and 19 in table and 3 not in table
+    table.put(19, -1)
+    assert table.get(19) == -1 and len(table) == 2
+    table.clear()
+    assert len(table) == 0 and table.get(0) is None and 19 not in table
@@ -0,0 +1,73 @@
+'''CubeServer requests, directly through handle() and over a socket.'''
+
+import asyncio
+import json
+
+from cube_server import MAX_APPLY, CubeServer, start_server
+
+
+def create(server, owned=None, **options):
+    return server.handle(dict(op='create', **options), owned)['session']
+
+
+def test_apply_checks_the_whole_batch_first():
+    server = CubeServer()
+    session = create(server, seed=1)
+    state = server.sessions[session].get_state()
+    for bad in ({'moves': [['shift_h', 'left', 0], ['bogus']]},
+                {'moves': [['shift_h', 'left', 3]]},
+                {'moves': [['shift_h', 'left', True]]},
+                {'moves': [['move_up', 1]]},
+                {'moves': 'shift_h'},
+                {'codes': 3000000},
+                {'codes': [0, 1, 16]},
+                {'codes': [0, -1]},
+                {'codes': [0] * (MAX_APPLY + 1)},
+                {'codes': 'abc'}):
+        reply = server.handle(dict(bad, id=7, op='apply', session=session))
+        assert reply['ok'] is False and reply['id'] == 7, bad
+        assert server.sessions[session].get_state() == state, bad
+    reply = server.handle({'op': 'apply', 'session': session,
+                           'moves': [['shift_h', 'left', 0], ['move_up']]})
+    assert reply['ok'] and reply['moves'] == 2
+    reply = server.handle({'op': 'apply', 'session': session, 'codes': [0, 15]})
+    assert reply['ok'] and reply['moves'] == 2
+    assert len(server.sessions[session].get_history()) == 4
+
+
+def test_sessions_belong_to_their_connection():
+    server = CubeServer()
+    mine, theirs = set(), set()
+    session = create(server, mine)
+    for op in ('apply', 'view', 'matched', 'scramble', 'close'):
+        reply = server.handle({'op': op, 'session': session, 'moves': []}, theirs)
+        assert reply == {'id': None, 'ok': False,
+                         'error': 'no session {}'.format(session)}, op
+    assert server.handle({'op': 'view', 'session': session}, mine)['ok']
+    assert server.handle({'op': 'close', 'session': session}, mine)['ok']
+    assert session not in server.sessions and not mine
+
+
+def test_a_bad_line_only_fails_its_own_reply():
+    async def exchange():
+        server = CubeServer()
+        listener = await start_server(server, port=0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            bad_reader, bad_writer = await asyncio.open_connection('127.0.0.1', port)
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            # Both lines reach the server within the same tick.
+            bad_writer.write(b'[' * 100000 + b'\n' + b'{"id": 1, "op": "view"}\n')
+            writer.write(b'{"id": 2, "op": "create", "seed": 3}\n')
+            await asyncio.gather(bad_writer.drain(), writer.drain())
+            replies = [json.loads(await bad_reader.readline()),
+                       json.loads(await bad_reader.readline()),
+                       json.loads(await reader.readline())]
+            for stream in (bad_writer, writer):
+                stream.close()
+            return replies
+
+    not_json, no_session, created = asyncio.run(asyncio.wait_for(exchange(), 10))
+    assert not_json == {'id': None, 'ok': False, 'error': 'not JSON'}
+    assert no_session['id'] == 1 and no_session['ok'] is False
+    assert created['id'] == 2 and created['ok'] is True
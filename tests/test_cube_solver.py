@@ -0,0 +1,47 @@
+'''solve() followed by apply_moves() solves seeded scrambles from any view
+and hands the cube back in the view it was solved from.'''
+
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+import table_cache
+from rubiks_cube import RubiksCube
+
+
+@pytest.fixture(scope='module', autouse=True)
+def cache_dir(tmp_path_factory):
+    '''Build the solver tables once, away from the user's cache.'''
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(table_cache, 'CACHE_DIR', str(tmp_path_factory.mktemp('tables')))
+        yield
+
+
+def solve_and_apply(cube):
+    view = cube.get_view()[:2]
+    moves = cube.solve()
+    assert moves is not None
+    cube.apply_moves(moves)
+    assert cube.check_matched()
+    assert cube.get_view()[:2] == view
+    return moves
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_scrambles_are_solved(seed):
+    rng = random.Random(seed)
+    cube = RubiksCube(solved=True)
+    for _ in range(rng.randrange(4)):
+        getattr(cube, rng.choice(('move_up', 'move_down', 'move_left', 'move_right')))()
+    cube.scramble(rng=rng)
+    solve_and_apply(cube)
+
+
+def test_solved_cube_needs_no_moves():
+    cube = RubiksCube(solved=True)
+    cube.move_left()
+    state = cube.get_state()
+    assert solve_and_apply(cube) == []
+    assert cube.get_state() == state
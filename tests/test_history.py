@@ -0,0 +1,77 @@
+'''undo() and redo() put back the exact stickers and view, also after the
+history ring buffer has wrapped past its depth.'''
+
+import random
+
+import pytest
+
+from rubiks_cube import RubiksCube
+
+VIEW_MOVES = ('move_up', 'move_down', 'move_left', 'move_right')
+
+
+def snapshot(cube):
+    return cube.get_state(), cube.get_view()
+
+
+def random_move(cube, rng):
+    size = cube.get_size()
+    kind = rng.randrange(3)
+    if kind == 0:
+        cube.shift_h(rng.choice(('left', 'right')), rng.randrange(size))
+    elif kind == 1:
+        cube.shift_v(rng.choice(('up', 'down')), rng.randrange(size))
+    else:
+        getattr(cube, rng.choice(VIEW_MOVES))()
+
+
+def moved(cube, rng, count):
+    '''Make count random moves. Returns the snapshots before the first and
+    after each one.'''
+    snapshots = [snapshot(cube)]
+    for _ in range(count):
+        random_move(cube, rng)
+        snapshots.append(snapshot(cube))
+    return snapshots
+
+
+@pytest.mark.parametrize('size', (2, 3, 4, 5))
+@pytest.mark.parametrize('seed', range(5))
+def test_undo_and_redo_restore_exactly(seed, size):
+    rng = random.Random(seed)
+    cube = RubiksCube(seed=seed, size=size)
+    snapshots = moved(cube, rng, 40)
+    for expected in reversed(snapshots[:-1]):
+        assert cube.undo() is not None
+        assert snapshot(cube) == expected
+    assert cube.undo() is None and snapshot(cube) == snapshots[0]
+    for expected in snapshots[1:]:
+        assert cube.redo() is not None
+        assert snapshot(cube) == expected
+    assert cube.redo() is None and snapshot(cube) == snapshots[-1]
+    assert cube.check_matched() == RubiksCube.from_state(cube.get_state()).check_matched()
+
+
+@pytest.mark.parametrize('size', (2, 3, 4))
+def test_wrapped_history_keeps_the_last_depth_moves(size):
+    depth = 8
+    rng = random.Random(size)
+    cube = RubiksCube(seed=size, size=size, history_depth=depth)
+    snapshots = moved(cube, rng, 3 * depth + 5)
+    assert len(cube.get_history()) == depth
+    for expected in reversed(snapshots[-depth - 1:-1]):
+        cube.undo()
+        assert snapshot(cube) == expected
+    assert cube.undo() is None and snapshot(cube) == snapshots[-depth - 1]
+    for expected in snapshots[-depth:]:
+        cube.redo()
+        assert snapshot(cube) == expected
+    assert cube.redo() is None
+    # A new move after some undos drops what could have been redone.
+    cube.undo()
+    cube.undo()
+    random_move(cube, rng)
+    assert cube.redo() is None and len(cube.get_history()) == depth - 1
+    cube.undo()
+    assert snapshot(cube) == snapshots[-3]
+
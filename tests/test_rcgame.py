@@ -0,0 +1,69 @@
+'''RCGame event handling, driven by synthetic pygame events.'''
+
+import os
+
+import pytest
+
+pygame = pytest.importorskip('pygame')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import RCGame   # noqa: E402
+
+
+def button(kind, pos, which):
+    return pygame.event.Event(kind, pos=pos, button=which)
+
+
+def motion(pos):
+    return pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 1))
+
+
+def right_drag(points):
+    return ([button(pygame.MOUSEBUTTONDOWN, points[0], 3)]
+            + [motion(point) for point in points[1:-1]]
+            + [button(pygame.MOUSEBUTTONUP, points[-1], 3)])
+
+
+def handle_all(app, events):
+    return [app.handle_event(event) for event in RCGame.coalesce(events, app.drag.active)]
+
+
+def test_right_drag_shifts_a_row():
+    app = RCGame.App()
+    expected = app.cube.copy()
+    expected.shift_h('right', 1)
+    redraws = handle_all(app, right_drag([(160 + 10 * i, 250) for i in range(29)]))
+    assert redraws[-1] is True
+    assert app.cube.get_state() == expected.get_state()
+
+
+def test_drag_leaving_the_cube_in_one_batch_is_ignored():
+    app = RCGame.App()
+    state = app.cube.get_state()
+    # Out past the right edge and back again, all queued together.
+    points = [(160, 250), (300, 250), (500, 250), (560, 250), (420, 250), (440, 250)]
+    assert handle_all(app, right_drag(points))[-1] is False
+    assert app.cube.get_state() == state
+
+
+def test_button_comes_from_the_event():
+    # The mouse is not pressed when these are handled, as when a click was
+    # queued and released before the loop got to it.
+    app = RCGame.App()
+    side, top_left, _ = app.cube.get_view()
+    assert app.handle_event(button(pygame.MOUSEBUTTONDOWN, (300, 50), 1)) is True
+    assert app.cube.get_view()[:2] != (side, top_left)
+    assert app.cube.get_history() == [('move_up',)]
+    app.handle_event(button(pygame.MOUSEBUTTONDOWN, (300, 50), 3))
+    assert app.drag.active
+
+
+def test_coalesce_keeps_positions_only_while_dragging():
+    idle = [motion((x, 10)) for x in range(5)]
+    assert [event.pos for event in RCGame.coalesce(idle)] == [(4, 10)]
+    assert len(RCGame.coalesce(idle, dragging=True)) == 5
+    events = idle + right_drag([(160, 250), (200, 250), (260, 250), (300, 250)]) + idle
+    kept = RCGame.coalesce(events)
+    assert [event.type for event in kept] == [
+        pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION, pygame.MOUSEMOTION,
+        pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION]
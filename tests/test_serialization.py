@@ -0,0 +1,101 @@
+'''to_bytes() / from_bytes() and move logs written with MoveWriter and read
+back with MoveReader, for several sizes, and rejection of broken input.'''
+
+import random
+
+import pytest
+
+from move_log import MAGIC, MoveReader, MoveWriter
+from rubiks_cube import STATE_BYTES, RubiksCube, cube_tables, state_bytes
+
+SIZES = (2, 3, 4, 7)
+
+
+def random_moves(cube, rng, count):
+    '''count random shifts and view moves, made on cube as well.'''
+    size = cube.get_size()
+    moves = []
+    for _ in range(count):
+        kind = rng.randrange(3)
+        if kind == 0:
+            move = ('shift_h', rng.choice(('left', 'right')), rng.randrange(size))
+        elif kind == 1:
+            move = ('shift_v', rng.choice(('up', 'down')), rng.randrange(size))
+        else:
+            move = (rng.choice(('move_up', 'move_down', 'move_left', 'move_right')),)
+        cube.apply_moves([move])
+        moves.append(move)
+    return moves
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_bytes_round_trip(size):
+    rng = random.Random(size)
+    cube = RubiksCube(seed=size, size=size)
+    for _ in range(20):
+        random_moves(cube, rng, 5)
+        data = cube.to_bytes()
+        assert len(data) == state_bytes(size)
+        copy = RubiksCube.from_bytes(data)
+        assert copy.get_state() == cube.get_state()
+        assert copy.get_view() == cube.get_view()
+        assert copy.to_bytes() == data
+    assert state_bytes() == STATE_BYTES
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_move_log_round_trip(size, tmp_path):
+    rng = random.Random(size)
+    path = str(tmp_path / 'moves.log')
+    cube = RubiksCube(seed=size, size=size)
+    start = cube.copy()
+    first = random_moves(cube, rng, 50)
+    with MoveWriter(path, start) as writer:
+        writer.append(first)
+    # Appending to the existing file, as codes this time.
+    middle = cube.copy()
+    second = random_moves(cube, rng, 50)
+    with MoveWriter(path) as writer:
+        writer.append(bytes(cube_tables(size).move_codes[move] for move in second))
+    with MoveReader(path) as reader:
+        assert len(reader) == 100
+        assert list(reader.moves()) == first + second
+        assert reader.start_cube().to_bytes() == start.to_bytes()
+        replayed = reader.replay()
+        assert replayed.get_state() == cube.get_state()
+        assert replayed.get_view() == cube.get_view()
+        assert reader.replay(start.copy(), 0, 50).to_bytes() == middle.to_bytes()
+        assert reader.replay(middle, 50).to_bytes() == cube.to_bytes()
+
+
+def test_broken_bytes_are_rejected():
+    data = RubiksCube(seed=1).to_bytes()
+    sized = RubiksCube(seed=1, size=4).to_bytes()
+    for bad in (b'', data[:-1], data + b'\0', bytes((9,)) + data[1:], sized[:-1],
+                sized + b'\0', sized[:1] + bytes((1,)) + sized[2:],
+                sized[:1] + bytes((3,)) + sized[2:]):
+        with pytest.raises(ValueError):
+            RubiksCube.from_bytes(bad)
+
+
+def test_broken_logs_are_rejected(tmp_path):
+    path = tmp_path / 'moves.log'
+    with MoveWriter(str(path), RubiksCube(seed=1, size=4)) as writer:
+        writer.append([('shift_h', 'left', 3)])
+    data = path.read_bytes()
+    header = len(data) - 1
+    for bad in (data[:len(MAGIC)], data[:header - 1], b'RCMOVEZ\0' + data[len(MAGIC):],
+                data[:len(MAGIC)] + b'\2' + data[len(MAGIC) + 1:],
+                data[:len(MAGIC) + 2] + b'\377' + data[len(MAGIC) + 3:]):
+        path.write_bytes(bad)
+        with pytest.raises(ValueError):
+            MoveReader(str(path))
+        with pytest.raises(ValueError):
+            MoveWriter(str(path))
+    path.write_bytes(data)
+    with MoveWriter(str(path)) as writer:
+        for bad in ([('shift_h', 'left', 4)], [20], bytes((20,))):
+            with pytest.raises((ValueError, KeyError)):
+                writer.append(bad)
+    with MoveReader(str(path)) as reader:
+        assert len(reader) == 1
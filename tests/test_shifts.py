@@ -0,0 +1,157 @@
+'''
+The compiled shift_h / shift_v permutations against the original walk of a
+row / column around the cube, kept here as ReferenceCube.
+'''
+
+import random
+
+import pytest
+
+from rubiks_cube import (ADJACENCY, COLORS, LINE_STEP_SIZE, RubiksCube, apply_step,
+                         cube_tables)
+
+# The original views and side turns, as (row, col) cells.
+VIEWS = {
+    0: [[(0, 0), (0, 1), (0, 2)], [(1, 0), (1, 1), (1, 2)], [(2, 0), (2, 1), (2, 2)]],
+    2: [[(0, 2), (1, 2), (2, 2)], [(0, 1), (1, 1), (2, 1)], [(0, 0), (1, 0), (2, 0)]],
+    6: [[(2, 0), (1, 0), (0, 0)], [(2, 1), (1, 1), (0, 1)], [(2, 2), (1, 2), (0, 2)]],
+    8: [[(2, 2), (2, 1), (2, 0)], [(1, 2), (1, 1), (1, 0)], [(0, 2), (0, 1), (0, 0)]],
+}
+RIGHT_SHIFT = (((0, 0), (0, 2)), ((0, 1), (1, 2)), ((0, 2), (2, 2)), ((1, 0), (0, 1)),
+               ((1, 2), (2, 1)), ((2, 0), (0, 0)), ((2, 1), (1, 0)), ((2, 2), (2, 0)))
+LEFT_SHIFT = (((0, 0), (2, 0)), ((0, 1), (1, 0)), ((0, 2), (0, 0)), ((1, 0), (2, 1)),
+              ((1, 2), (0, 1)), ((2, 0), (2, 2)), ((2, 1), (1, 2)), ((2, 2), (0, 2)))
+
+
+class ReferenceCube:
+    '''The 3 x 3 x 3 cube as it was before the shifts were compiled: a dict of
+    (row, col) colors per side, and the row / column walked around the cube
+    one side at a time.'''
+    def __init__(self, state, side=0, orientation=0):
+        self.side = side
+        self.orientation = orientation
+        self.sides = {s: {(row, col): COLORS[state[s * 9 + row * 3 + col]]
+                          for row in range(3) for col in range(3)} for s in range(6)}
+
+    def get_state(self):
+        return bytes(COLORS.index(self.sides[s][(row, col)])
+                     for s in range(6) for row in range(3) for col in range(3))
+
+    def __color(self, side, top_left, row, col):
+        return self.sides[side][VIEWS[top_left][row][col]]
+
+    def __shift_side(self, side, direction):
+        shift_tup = LEFT_SHIFT if direction == 'left' else RIGHT_SHIFT
+        current = dict(self.sides[side])
+        for from_cell, to_cell in shift_tup:
+            self.sides[side][to_cell] = current[from_cell]
+
+    def __walk(self, direction, cells):
+        '''Move the colors of cells(top_left) around the cube.
+        Returns ADJACENCY of the side and top left the walk ends on.'''
+        side, top_left = self.side, self.orientation
+        values = [self.sides[side][cell] for cell in cells(top_left)]
+        for _ in range(4):
+            next_side = ADJACENCY[side][top_left][direction]
+            top_left = ADJACENCY[side][top_left][next_side]
+            side = next_side
+            new_values = [self.sides[side][cell] for cell in cells(top_left)]
+            for cell, value in zip(cells(top_left), values):
+                self.sides[side][cell] = value
+            values = new_values
+        return ADJACENCY[side][top_left]
+
+    def shift_h(self, direction, row):
+        adjacent = self.__walk(direction, lambda top_left: VIEWS[top_left][row])
+        if row == 0:
+            self.__shift_side(adjacent['up'], 'left' if direction == 'right' else 'right')
+        elif row == 2:
+            self.__shift_side(adjacent['down'], direction)
+
+    def shift_v(self, direction, col):
+        adjacent = self.__walk(direction, lambda top_left: [r[col] for r in VIEWS[top_left]])
+        if col == 0:
+            self.__shift_side(adjacent['left'], 'left' if direction == 'up' else 'right')
+        elif col == 2:
+            self.__shift_side(adjacent['right'], 'right' if direction == 'up' else 'left')
+
+    def move(self, direction):
+        new_side = ADJACENCY[self.side][self.orientation][direction]
+        self.orientation = ADJACENCY[self.side][self.orientation][new_side]
+        self.side = new_side
+
+    def get_adjacent(self, direction):
+        side, top_left = self.side, self.orientation
+        if direction == 'back':
+            right = ADJACENCY[side][top_left]['right']
+            side, top_left = right, ADJACENCY[side][top_left][right]
+            direction = 'right'
+        adjacent = ADJACENCY[side][top_left][direction]
+        top_left = ADJACENCY[side][top_left][adjacent]
+        return tuple(tuple(self.__color(adjacent, top_left, row, col) for col in range(3))
+                     for row in range(3))
+
+    def check_matched(self):
+        return all(len(set(cells.values())) == 1 for cells in self.sides.values())
+
+
+def random_move(rng):
+    kind = rng.randrange(3)
+    if kind == 0:
+        return ('shift_h', rng.choice(('left', 'right')), rng.randrange(3))
+    if kind == 1:
+        return ('shift_v', rng.choice(('up', 'down')), rng.randrange(3))
+    return ('move', rng.choice(('up', 'down', 'left', 'right')))
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_shifts_match_reference_walk(seed):
+    rng = random.Random(seed)
+    cube = RubiksCube(seed=seed)
+    reference = ReferenceCube(cube.get_state())
+    for _ in range(80):
+        move = random_move(rng)
+        if move[0] == 'move':
+            getattr(cube, 'move_' + move[1])()
+            reference.move(move[1])
+        else:
+            getattr(cube, move[0])(*move[1:])
+            getattr(reference, move[0])(*move[1:])
+        assert cube.get_state() == reference.get_state()
+        side, top_left, _ = cube.get_view()
+        assert (side, top_left) == (reference.side, reference.orientation)
+        for direction in ('up', 'down', 'left', 'right', 'back'):
+            assert cube.get_adjacent(direction) == reference.get_adjacent(direction)
+        assert cube.check_matched() == reference.check_matched()
+
+
+def test_every_shift_from_every_view():
+    state = RubiksCube(seed=7).get_state()
+    for side in range(6):
+        for top_left in (0, 2, 6, 8):
+            for shift, directions in (('shift_h', ('left', 'right')), ('shift_v', ('up', 'down'))):
+                for direction in directions:
+                    for index in range(3):
+                        cube = RubiksCube.from_state(state, side, top_left)
+                        reference = ReferenceCube(state, side, top_left)
+                        getattr(cube, shift)(direction, index)
+                        getattr(reference, shift)(direction, index)
+                        assert cube.get_state() == reference.get_state()
+
+
+@pytest.mark.parametrize('size', (2, 3, 4, 5, 7))
+def test_in_place_moves_match_permutations(size):
+    tables = cube_tables(size)
+    state = bytearray(RubiksCube(seed=size, size=size).get_state())
+    for side in range(6):
+        for top_left in tables.top_lefts:
+            tables.need_view(side, top_left)
+            for direction in ('left', 'right', 'up', 'down'):
+                for index in range(size):
+                    key = (side, top_left, direction, index)
+                    moved = bytearray(state)
+                    apply_step(moved, tables.steps[key])
+                    assert moved == bytearray(tables.gathers[key](state))
+                    if size >= LINE_STEP_SIZE:
+                        assert len(tables.steps[key][0]) == 4 + (
+                            size if index in (0, size - 1) else 0)
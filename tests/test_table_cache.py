@@ -0,0 +1,54 @@
+'''table_cache.load(): tables come back from the mapped file, and a damaged
+or out of date file is rebuilt.'''
+
+import numpy as np
+import pytest
+
+import table_cache
+from table_cache import HEADER
+
+
+def generator(calls):
+    def generate():
+        calls.append(1)
+        yield 'counts', np.arange(12, dtype=np.uint16).reshape(3, 4)
+        yield 'flags', np.ones(5, dtype=np.int8)
+    return generate
+
+
+def check(tables):
+    assert tables['counts'].tolist() == np.arange(12).reshape(3, 4).tolist()
+    assert tables['counts'].dtype == np.uint16
+    assert tables['flags'].tolist() == [1] * 5
+
+
+def test_built_once_then_mapped(tmp_path):
+    calls = []
+    check(table_cache.load('test', 1, generator(calls), str(tmp_path)))
+    check(table_cache.load('test', 1, generator(calls), str(tmp_path)))
+    assert len(calls) == 1
+
+
+def damage_entry(path):
+    '''Overwrite the dtype of the first directory entry.'''
+    data = bytearray(path.read_bytes())
+    directory = HEADER.unpack_from(data, 0)[-1]
+    data[directory + 32:directory + 40] = b'garbage!'
+    path.write_bytes(bytes(data))
+
+
+@pytest.mark.parametrize('change', ('damaged entry', 'version', 'moves hash'))
+def test_rebuilt(tmp_path, monkeypatch, change):
+    calls = []
+    table_cache.load('test', 1, generator(calls), str(tmp_path))
+    version = 1
+    if change == 'damaged entry':
+        damage_entry(tmp_path / 'test.tables')
+    elif change == 'version':
+        version = 2
+    else:
+        monkeypatch.setattr(table_cache, 'MOVES_HASH', bytes(16))
+    check(table_cache.load('test', version, generator(calls), str(tmp_path)))
+    assert len(calls) == 2
+    check(table_cache.load('test', version, generator(calls), str(tmp_path)))
+    assert len(calls) == 2